@@ -0,0 +1,426 @@
+"""Micro-benchmarks for Cosmic Voyage hot paths.
+
+Run a single benchmark with ``python bench.py <name>``; ``python bench.py -h``
+lists them. Nothing here talks to Telegram - network calls go to fakes.
+"""
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from config import MAX_PLAYERS
+from simulator import FakeBot
+
+
+def bench_fanout(args):
+    """Time sequential vs concurrent DM fan-out to MAX_PLAYERS recipients"""
+    from utils import broadcast_messages
+
+    recipients = list(range(1, args.recipients + 1))
+
+    async def sequential(context):
+        for uid in recipients:
+            await context.bot.send_message(uid, "⚡ CHOOSE YOUR ACTION!")
+
+    async def concurrent(context):
+        await broadcast_messages(context, [(uid, "⚡ CHOOSE YOUR ACTION!", {}) for uid in recipients])
+
+    for name, fn in (("sequential", sequential), ("broadcast", concurrent)):
+        context = SimpleNamespace(bot=FakeBot(args.latency))
+        start = time.perf_counter()
+        asyncio.run(fn(context))
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {len(recipients)} DMs in {elapsed * 1000:7.1f} ms "
+              f"(last recipient waits {elapsed:.2f}s)")
+
+
+def make_game(players: int, chat_id: int = -100):
+    """Build a started CosmicVoyage with ``players`` players and roles assigned"""
+    from models import CosmicVoyage
+    from config import GamePhase
+
+    game = CosmicVoyage(chat_id)
+    for uid in range(1, players + 1):
+        game.add_player(uid, f"voyager_{uid}")
+    game.assign_roles()
+    game.assign_secret_objectives()
+    game.phase = GamePhase.VOYAGE
+    game.current_day = 5
+    return game
+
+
+def bench_render(args):
+    """Status images rendered per second"""
+    from utils import generate_status_image
+
+    game = make_game(args.players)
+    generate_status_image(game)  # warm-up
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        game.players[1].hp = 100 - i % 100
+        generate_status_image(game)
+    elapsed = time.perf_counter() - start
+    print(f"render: {args.iterations / elapsed:7.1f} images/s "
+          f"({elapsed / args.iterations * 1000:.2f} ms each, {args.players} players)")
+
+
+def bench_keyboards(args):
+    """Building the day's action keyboards for every player"""
+    import tracemalloc
+    from utils import create_action_keyboard, _action_keyboard
+
+    game = make_game(args.players)
+    players = game.get_living_players()
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for player in players:
+            create_action_keyboard(player, game)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    keyboards = [create_action_keyboard(player, game) for player in players]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"keyboards {args.players} players: {elapsed / args.iterations * 1e6:7.1f} us per fan-out, "
+          f"{retained:,} bytes held by {len(keyboards)} keyboards ({_action_keyboard.cache_info().currsize} layouts cached)")
+
+
+def bench_snapshot(args):
+    """Cost of serialising, queueing and writing one game snapshot"""
+    import os
+    import tempfile
+    from persistence import GameStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GameStore(os.path.join(tmp, "bench.db"))
+        for players in args.players:
+            game = make_game(players)
+            for uid in list(game.players)[: players // 2]:
+                game.submit_action(uid, "heal")
+
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                blob = GameStore.dumps(game)
+            dump_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+            store.flush()
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                store.save(game)  # what the event loop pays
+            queue_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                store.save(game)
+                store.flush()
+            save_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+            print(f"snapshot {players:>2} players: {len(blob):>5} bytes, serialise {dump_us:6.1f} us, "
+                  f"queue {queue_us:6.1f} us, serialise+write {save_us:6.1f} us")
+        store.close()
+
+
+def bench_resolve(args):
+    """Cost of resolving one day (all actions, objectives, hazards, monster)"""
+    import random
+    from models import CosmicVoyage
+    from rules import resolve_day
+    from simulator import random_policy, pick_target
+
+    rng = random.Random(args.seed)
+    game = make_game(args.players)
+    game.monster_revealed = True
+    for player in game.get_living_players():
+        action = random_policy(player, game, rng)
+        player.pending_target = pick_target(action, player, game, rng)
+        game.pending_actions[player.user_id] = action
+    template = game.to_dict()
+
+    runs = []
+    for _ in range(args.repeat):
+        total = 0.0
+        for i in range(args.iterations):
+            day = CosmicVoyage.from_dict(template)
+            day.rng = random.Random(i)
+            start = time.perf_counter()
+            resolve_day(day)
+            total += time.perf_counter() - start
+        runs.append(total)
+    best = min(runs)
+    print(f"resolve {args.players} players: {best / args.iterations * 1e6:7.1f} us/day "
+          f"({args.iterations / best:,.0f} days/s, best of {args.repeat})")
+
+
+def bench_memory(args):
+    """Resident bytes per started game (players, ship, game state, event log)"""
+    import gc
+    import tracemalloc
+
+    for players in args.players:
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        games = [make_game(players, chat_id=-i) for i in range(args.games)]
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        per_game = total / len(games)
+        print(f"memory {players:>2} players: {per_game:8,.0f} bytes/game "
+              f"({per_game / players:6,.0f} per player)")
+        del games
+
+
+def _synthetic_update(update_id: int, chat_id: int) -> dict:
+    """A /status message from one of a spread of group chats, as Telegram would post it"""
+    user = {"id": 1000 + update_id % 500, "is_bot": False, "first_name": "voyager"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 1700000000, "from": user,
+            "chat": {"id": chat_id, "type": "supergroup", "title": "bench"},
+            "text": "/status", "entities": [{"type": "bot_command", "offset": 0, "length": 7}],
+        },
+    }
+
+
+def bench_webhook(args):
+    """Synthetic updates POSTed to a local webhook server, through to the handlers"""
+    import aiohttp
+    from telegram import Bot, Update, User
+    from telegram.ext import Application, TypeHandler
+    from webhook import SECRET_HEADER, WebhookServer, make_secret_token
+
+    class OfflineBot(Bot):
+        async def get_me(self, *args, **kwargs):  # initialize() calls this; skip the network
+            self._bot_user = User(1, "bench", True, username="bench_bot")
+            return self._bot_user
+
+    async def run():
+        application = Application.builder().bot(OfflineBot("1:bench")).updater(None).build()
+        handled = 0
+        done = asyncio.Event()
+
+        async def count(update, context):
+            nonlocal handled
+            handled += 1
+            if handled == args.updates:
+                done.set()
+
+        application.add_handler(TypeHandler(Update, count))
+        await application.initialize()
+        await application.start()
+
+        secret = make_secret_token()
+        server = WebhookServer(application, secret, "127.0.0.1", args.port)
+        await server.start()
+        url = f"http://127.0.0.1:{args.port}{server.path}"
+        bodies = [json.dumps(_synthetic_update(i, -(i % 200) - 1)) for i in range(args.updates)]
+        latencies = []
+
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            headers = {SECRET_HEADER: secret, "Content-Type": "application/json"}
+            async with session.post(url, data="{}", headers={SECRET_HEADER: "wrong"}) as resp:
+                assert resp.status == 403, resp.status
+
+            pending = iter(bodies)
+
+            async def client():
+                for body in pending:
+                    sent = time.perf_counter()
+                    async with session.post(url, data=body, headers=headers) as resp:
+                        assert resp.status == 200, resp.status
+                    latencies.append(time.perf_counter() - sent)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(args.concurrency)))
+            posted = time.perf_counter() - start
+            await asyncio.wait_for(done.wait(), 60)
+            elapsed = time.perf_counter() - start
+
+        await server.stop()
+        await application.stop()
+        await application.shutdown()
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"webhook: {args.updates} updates, {args.concurrency} connections: "
+              f"{args.updates / posted:,.0f} posts/s accepted, {args.updates / elapsed:,.0f} updates/s "
+              f"handled (POST p50 {p50:.2f} ms, p99 {p99:.2f} ms), stats {server.stats}")
+
+    asyncio.run(run())
+
+
+def _bench_shard_worker(index, workers, inbox, index_queue, done):
+    """Shard worker doing a day's resolution per update, without a bot"""
+    from models import CosmicVoyage
+    from rules import resolve_day
+    from telegram import Update
+
+    games = {}
+    handled = 0
+    done.put(("ready", index))
+    while True:
+        data = inbox.get()
+        if data is None:
+            break
+        update = Update.de_json(data, None)
+        chat_id = update.effective_chat.id
+        if chat_id not in games:
+            games[chat_id] = make_game(10, chat_id).to_dict()
+        resolve_day(CosmicVoyage.from_dict(games[chat_id]))
+        handled += 1
+    done.put(("done", handled))
+
+
+def bench_shards(args):
+    """Update throughput through the shard router by worker count"""
+    import multiprocessing
+    import os
+    from telegram import Update
+    from sharding import ShardRouter
+
+    updates = [Update.de_json(_synthetic_update(i, -(i % args.chats) - 1), None)
+               for i in range(args.updates)]
+    print(f"shards: {args.updates} updates over {args.chats} chats, {os.cpu_count()} CPU(s)")
+    for workers in args.workers:
+        done = multiprocessing.get_context("spawn").Queue()
+        router = ShardRouter(workers, _bench_shard_worker, (done,))
+        router.start()
+        for _ in range(workers):
+            done.get()  # wait for every worker to come up
+
+        start = time.perf_counter()
+        for update in updates:
+            router.dispatch(update)
+        for inbox in router.inboxes:
+            inbox.put(None)
+        handled = sum(done.get()[1] for _ in range(workers))
+        elapsed = time.perf_counter() - start
+        for process in router.processes:
+            process.join()
+
+        print(f"  {workers:>2} worker(s): {handled / elapsed:8,.0f} updates/s  routed {router.routed}")
+
+
+def bench_timers(args):
+    """Schedule, extend, tick and cancel on the timer wheel at many concurrent deadlines"""
+    import random
+    from timers import TimerWheel
+
+    async def noop():
+        pass
+
+    rng = random.Random(args.seed)
+    now = [0.0]
+    wheel = TimerWheel(clock=lambda: now[0])
+    n = args.deadlines
+    # Lobby (120 s), action/vote (90 s) and day-step (2-6 s) deadlines, spread out
+    delays = [rng.choice((120, 90, 6, 2)) * rng.uniform(0.1, 1.0) for _ in range(n)]
+
+    start = time.perf_counter()
+    timers = [wheel.call_later(delay, noop) for delay in delays]
+    scheduled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    timers = [wheel.reschedule(timer, delay + 60) for timer, delay in zip(timers, delays)]
+    extended = time.perf_counter() - start
+
+    # Finding a deadline by name, as a job queue's get_jobs_by_name does, scans them all
+    names = [f"lobby_{-i}" for i in range(n)]
+    lookups = min(n, 1000)
+    start = time.perf_counter()
+    for i in range(lookups):
+        wanted = names[rng.randrange(n)]
+        [name for name in names if name == wanted]
+    scanned = (time.perf_counter() - start) / lookups
+
+    ticks = fired = 0
+    start = time.perf_counter()
+    while len(wheel) > n // 2:
+        now[0] += wheel.tick
+        fired += len(wheel.advance())
+        ticks += 1
+    ticking = time.perf_counter() - start
+
+    pending = [timer for timer in timers if timer.active]
+    start = time.perf_counter()
+    for timer in pending:
+        timer.cancel()
+    cancelled = time.perf_counter() - start
+
+    print(f"timers: {n:,} concurrent deadlines")
+    print(f"  schedule     {scheduled / n * 1e6:7.2f} us each")
+    print(f"  extend       {extended / n * 1e6:7.2f} us each (by handle)")
+    print(f"  name scan    {scanned * 1e6:7.2f} us per lookup (what extending by name costs)")
+    print(f"  tick         {ticking / ticks * 1e6:7.2f} us per {wheel.tick}s tick "
+          f"({fired:,} fired over {ticks:,} ticks)")
+    print(f"  cancel       {cancelled / len(pending) * 1e6:7.2f} us each ({len(pending):,} pending)")
+
+
+BENCHMARKS = {
+    "fanout": bench_fanout,
+    "render": bench_render,
+    "keyboards": bench_keyboards,
+    "snapshot": bench_snapshot,
+    "resolve": bench_resolve,
+    "memory": bench_memory,
+    "webhook": bench_webhook,
+    "shards": bench_shards,
+    "timers": bench_timers,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="name", required=True)
+
+    p = sub.add_parser("fanout", help="DM fan-out for action/vote prompts")
+    p.add_argument("--recipients", type=int, default=MAX_PLAYERS)
+    p.add_argument("--latency", type=float, default=0.05, help="fake round trip, seconds")
+
+    p = sub.add_parser("render", help="status image rendering")
+    p.add_argument("--players", type=int, default=10)
+    p.add_argument("--iterations", type=int, default=200)
+
+    p = sub.add_parser("keyboards", help="action keyboards for a full day's prompts")
+    p.add_argument("--players", type=int, default=MAX_PLAYERS)
+    p.add_argument("--iterations", type=int, default=2000)
+
+    p = sub.add_parser("snapshot", help="game snapshot serialise + SQLite write")
+    p.add_argument("--players", type=int, nargs="+", default=[4, 10, 21])
+    p.add_argument("--iterations", type=int, default=1000)
+
+    p = sub.add_parser("resolve", help="day resolution with a random action mix")
+    p.add_argument("--players", type=int, default=MAX_PLAYERS)
+    p.add_argument("--iterations", type=int, default=5000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--seed", type=int, default=1)
+
+    p = sub.add_parser("memory", help="bytes per resident game")
+    p.add_argument("--players", type=int, nargs="+", default=[4, 10, 21])
+    p.add_argument("--games", type=int, default=500)
+
+    p = sub.add_parser("webhook", help="webhook intake: local HTTP server to handlers")
+    p.add_argument("--updates", type=int, default=5000)
+    p.add_argument("--concurrency", type=int, default=50, help="client connections")
+    p.add_argument("--port", type=int, default=8765)
+
+    p = sub.add_parser("shards", help="update throughput by shard worker count")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--updates", type=int, default=5000)
+    p.add_argument("--chats", type=int, default=200)
+
+    p = sub.add_parser("timers", help="timer wheel operations at many concurrent deadlines")
+    p.add_argument("--deadlines", type=int, default=10_000)
+    p.add_argument("--seed", type=int, default=1)
+
+    args = parser.parse_args()
+    BENCHMARKS[args.name](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Compact callback_data for inline buttons, and the router that dispatches them.
+
+Telegram gives a button at most 64 bytes of callback_data. Every button here
+is a ButtonKind: an op code plus a few fields, joined by '.', e.g.
+``v.1n3kq8.3lkgxw`` (vote, game token, target user id). Integers travel in
+base 36. Names from a fixed table - actions, shop items, relics, upgrades,
+help sections - travel as their index in it, so no name is ever rebuilt from
+its button text.
+
+Buttons that belong to one game carry its token, a random id drawn when the
+game is created (never its seed, which would give away the roles). Buttons
+of a day prompt - actions and what follows from them, votes - also carry the
+day, and their kind names the stage they belong to. So (game, day, phase) is
+the nonce of a prompt. A press on a button left over from an earlier game,
+day or phase is refused by comparing it with the presser's current game,
+before any handler runs. A second identical press from the same user within
+DUPLICATE_WINDOW (a double tap) is dropped too.
+
+CallbackRouter maps op codes to handlers, so dispatch is one split and one
+dict lookup.
+"""
+import logging
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config import HELP_TEXTS, RELIC_EFFECTS, SHIP_UPGRADES, SHOP_ITEMS, STAGE_ACTIONS, STAGE_VOTING
+from models import CosmicVoyage
+
+logger = logging.getLogger(__name__)
+
+SEP = "."
+
+# Seconds in which a repeat of the same press by the same user counts as a double tap
+DUPLICATE_WINDOW = 2.0
+
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def encode_int(value: int) -> str:
+    if value < 0:
+        return "-" + encode_int(-value)
+    digits = ""
+    while True:
+        value, digit = divmod(value, 36)
+        digits = _DIGITS[digit] + digits
+        if not value:
+            return digits
+
+
+def decode_int(text: str) -> int:
+    return int(text, 36)
+
+
+class Codec(NamedTuple):
+    encode: Callable[[object], str]
+    decode: Callable[[str], object]
+
+
+INT = Codec(encode_int, decode_int)
+
+
+def choice(options: Sequence[str]) -> Codec:
+    """Codec sending one of ``options`` as its index; only ever append to the table"""
+    options = tuple(options)
+    index = {option: i for i, option in enumerate(options)}
+
+    def decode_option(text: str) -> str:
+        i = decode_int(text)
+        if not 0 <= i < len(options):
+            raise IndexError(i)
+        return options[i]
+    return Codec(lambda value: encode_int(index[value]), decode_option)
+
+
+# Every action a DM action keyboard offers
+ACTIONS = (
+    "basic_attack", "repair", "heal", "rally", "predict", "protect", "protect_potion",
+    "relic", "dodge", "premium_weapon", "deliver", "sabotage", "frame_job", "false_intel",
+    "monster_attack", "boost_allies", "block", "boost", "use_relic", "skip",
+)
+
+
+def game_token(game: CosmicVoyage) -> str:
+    return _encode_token(game.token)
+
+
+@lru_cache(maxsize=4096)
+def _encode_token(token: int) -> str:
+    return encode_int(token)
+
+
+class ButtonKind(NamedTuple):
+    op: str
+    fields: Tuple[Codec, ...] = ()
+    game_bound: bool = False
+    stage: Optional[str] = None  # only valid during this stage of the day it was sent on
+
+    def data(self, *values, game: Optional[CosmicVoyage] = None,
+             token: Optional[str] = None, day: Optional[int] = None) -> str:
+        """callback_data for a button of this kind; game-bound kinds need ``game`` (or its token and day)"""
+        parts = [self.op]
+        if self.game_bound:
+            parts.append(token or game_token(game))
+        if self.stage:
+            parts.append(encode_int(game.current_day if day is None else day))
+        parts.extend(codec.encode(value) for codec, value in zip(self.fields, values))
+        return SEP.join(parts)
+
+
+JOIN = ButtonKind("j")
+LEAVE = ButtonKind("l")
+EXTEND = ButtonKind("x")
+RULES = ButtonKind("r")
+HELP = ButtonKind("h", (choice(HELP_TEXTS),))
+BUY = ButtonKind("b", (choice(SHOP_ITEMS),))
+UPGRADE = ButtonKind("u", (choice(SHIP_UPGRADES),), game_bound=True)
+ACTION = ButtonKind("a", (choice(ACTIONS),), True, STAGE_ACTIONS)
+ATTACK = ButtonKind("k", (INT,), True, STAGE_ACTIONS)     # basic attack target
+TARGET = ButtonKind("t", (INT,), True, STAGE_ACTIONS)     # heal/block/frame/intel target
+RELIC = ButtonKind("e", (choice(RELIC_EFFECTS),), True, STAGE_ACTIONS)
+VOTE = ButtonKind("v", (INT,), True, STAGE_VOTING)
+
+KINDS: Dict[str, ButtonKind] = {kind.op: kind for kind in (
+    JOIN, LEAVE, EXTEND, RULES, HELP, BUY, UPGRADE, ACTION, ATTACK, TARGET, VOTE, RELIC
+)}
+
+
+class Press(NamedTuple):
+    kind: ButtonKind
+    token: Optional[str]  # game token of a game-bound button
+    day: Optional[int]    # day of a stage button
+    args: tuple
+
+
+def decode(data: Optional[str]) -> Optional[Press]:
+    """Parse callback_data; None if it is not a button of ours (or is malformed)"""
+    op, _, rest = (data or "").partition(SEP)
+    kind = KINDS.get(op)
+    if kind is None:
+        return None
+    parts = rest.split(SEP) if rest else []
+    scope = int(kind.game_bound) + int(kind.stage is not None)
+    if len(parts) != scope + len(kind.fields):
+        return None
+    try:
+        token = parts[0] if kind.game_bound else None
+        day = decode_int(parts[1]) if kind.stage else None
+        args = tuple(codec.decode(part) for codec, part in zip(kind.fields, parts[scope:]))
+    except (ValueError, IndexError):
+        return None
+    return Press(kind, token, day, args)
+
+
+class CallbackRouter:
+    """Dispatches button presses to ``handler(update, context, *args)`` by op code"""
+
+    def __init__(self, duplicate_window: float = DUPLICATE_WINDOW):
+        self.handlers: Dict[str, Callable] = {}
+        self.duplicate_window = duplicate_window
+        # (user_id, callback_data) -> monotonic time of the press, oldest first
+        self.recent: Dict[Tuple[int, str], float] = {}
+        self.stats: Counter = Counter()  # routed, unknown, stale, duplicate
+
+    def on(self, kind: ButtonKind):
+        def register(handler):
+            self.handlers[kind.op] = handler
+            return handler
+        return register
+
+    def _is_duplicate(self, user_id: int, data: str) -> bool:
+        now = time.monotonic()
+        horizon = now - self.duplicate_window
+        while self.recent:
+            oldest = next(iter(self.recent))
+            if self.recent[oldest] > horizon:
+                break
+            del self.recent[oldest]
+        key = (user_id, data)
+        if key in self.recent:
+            return True
+        self.recent[key] = now
+        return False
+
+    def _refusal(self, press: Optional[Press], user_id: int) -> Optional[str]:
+        """Why a press must be dropped ('unknown', 'stale', 'duplicate'), or None to route it"""
+        from context import game_manager
+
+        if press is None or press.kind.op not in self.handlers:
+            return "unknown"
+        if press.kind.game_bound:
+            game = game_manager.get_user_game(user_id)
+            if game is None or game_token(game) != press.token:
+                return "stale"
+            if press.kind.stage and (press.day != game.current_day or game.stage != press.kind.stage):
+                return "stale"
+        return None
+
+    async def accept(self, update: Update) -> Optional[Tuple[Callable, tuple]]:
+        """The handler and decoded arguments for a press; refused presses are answered and counted"""
+        query = update.callback_query
+        if self._is_duplicate(query.from_user.id, query.data or ""):
+            self.stats["duplicate"] += 1
+            await query.answer()
+            return None
+        press = decode(query.data)
+        refusal = self._refusal(press, query.from_user.id)
+        if refusal:
+            self.stats[refusal] += 1
+            await query.answer("⌛ This button has expired.", show_alert=True)
+            return None
+        self.stats["routed"] += 1
+        return self.handlers[press.kind.op], press.args
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                       handler: Callable, args: tuple):
+        try:
+            await handler(update, context, *args)
+        except Exception as e:
+            logger.error(f"Error in button callback: {e}")
+            await update.callback_query.answer("An error occurred.", show_alert=True)
+
+
+router = CallbackRouter()
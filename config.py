@@ -20,6 +20,56 @@ RANDOM_EVENT_CHANCE = 0.25
 VOTING_START_DAY = 2
 VOTING_TIMER = 45
 
+# Updates handled at once; each game's changes are still serialised by its lock
+UPDATE_CONCURRENCY = 64
+
+# Outbound DM fan-out
+BROADCAST_CONCURRENCY = 8
+
+# Spectators get major events as one digest DM per day instead of one DM each
+# (see spectators.py); a spectator is dropped after this many failed sends in a row
+SPECTATOR_DIGEST = os.getenv("SPECTATOR_DIGEST", "0") == "1"
+SPECTATOR_MAX_FAILURES = 3
+
+# How updates arrive: "polling" (getUpdates) or "webhook" (see webhook.py).
+# WEBHOOK_URL is the public HTTPS base URL Telegram posts to; the local server
+# listens on WEBHOOK_LISTEN:WEBHOOK_PORT. WEBHOOK_SECRET is generated per run
+# when unset.
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Game worker processes; above 1 the main process only routes updates to them
+# by chat (see sharding.py)
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "1"))
+
+# SQLite file game snapshots are kept in so games survive restarts (e.g.
+# "cosmic_voyage.db"); persistence is off unless it is set
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "")
+
+# Joins and leaves within this many seconds share one lobby message edit
+LOBBY_EDIT_INTERVAL = 0.5
+
+# Status image rendering threads
+RENDER_WORKERS = 2
+
+# Outbound queue flow control (Telegram: ~30 msg/s bot-wide, 20 msg/min per group)
+OUTBOX_GLOBAL_RATE = 30
+OUTBOX_GROUP_RATE = 20 / 60
+OUTBOX_GROUP_BURST = 20
+OUTBOX_PRIVATE_RATE = 1
+OUTBOX_PRIVATE_BURST = 3
+OUTBOX_MAX_RETRIES = 3
+
+# Bot messages tracked per game for the end-of-game cleanup: how long they stay
+# tracked (seconds), how many at most, and how long after the result to delete them
+RECENT_MESSAGE_WINDOW = 15 * 60
+RECENT_MESSAGE_CAP = 200
+CLEANUP_DELAY = 60
+
 # HP Values
 INITIAL_SHIP_HP = 100
 INITIAL_PLAYER_HP = 100
@@ -202,6 +252,9 @@ class Role(Enum):
     SHADOW_SABOTEUR = "Shadow Saboteur"
     DEVIL_HUNTER = "Devil Hunter"
 
+# Roles on the shadow side; everyone else (including no role yet) is light
+SHADOW_ROLES = frozenset({Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER})
+
 
 class GamePhase(Enum):
     LOBBY = "lobby"
@@ -213,16 +266,26 @@ class GamePhase(Enum):
     VOTING = "voting"
     ENDED = "ended"
 
+# Steps of a running day (CosmicVoyage.stage), each run by a game_logic timer
+# callback. Buttons of a day prompt (see callbacks.py) only work in their stage.
+STAGE_DAWN = "dawn"          # next: day_start_callback
+STAGE_BRIEFING = "briefing"  # day announced; next: open_actions_callback
+STAGE_ACTIONS = "actions"    # collecting actions; next: action_deadline_callback
+STAGE_VOTING = "voting"      # collecting votes; next: vote_deadline_callback
+
 # --- NEW FEATURES ---
 
 # 1. SECRET OBJECTIVES
 SECRET_OBJECTIVES = {
-    Role.HEALER: {"desc": "Heal 3 different players.", "reward_type": "heal_boost", "value": 1.5, "target_count": 3},
-    Role.EXPLORER: {"desc": "Find 2 relics.", "reward_type": "item", "value": "Shield", "target_count": 2},
-    Role.CAPTAIN: {"desc": "Successfully use Rally Team twice.", "reward_type": "coins", "value": 50, "target_count": 2},
-    Role.BETRAYER: {"desc": "Successfully sabotage the ship for a total of 50 damage.", "reward_type": "hp_boost", "value": 20, "target_count": 50},
-    "default": {"desc": "Survive until Day 8.", "reward_type": "coins", "value": 30, "target_count": 8}
+    Role.HEALER: {"id": "heal_three", "desc": "Heal 3 different players.", "reward_type": "heal_boost", "value": 1.5, "target_count": 3},
+    Role.EXPLORER: {"id": "find_relics", "desc": "Find 2 relics.", "reward_type": "item", "value": "Shield", "target_count": 2},
+    Role.CAPTAIN: {"id": "double_rally", "desc": "Successfully use Rally Team twice.", "reward_type": "coins", "value": 50, "target_count": 2},
+    Role.BETRAYER: {"id": "sabotage_50", "desc": "Successfully sabotage the ship for a total of 50 damage.", "reward_type": "hp_boost", "value": 20, "target_count": 50},
+    "default": {"id": "survive_day_8", "desc": "Survive until Day 8.", "reward_type": "coins", "value": 30, "target_count": 8, "track": "day"}
 }
+# Objectives by their stable id ("track": "day" objectives complete on a day number,
+# all others when objective_progress reaches target_count)
+OBJECTIVES_BY_ID = {obj["id"]: obj for obj in SECRET_OBJECTIVES.values()}
 
 # 2. SHIP UPGRADES
 SHIP_UPGRADES = {
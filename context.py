@@ -1,4 +1,14 @@
+from config import STATE_DB_PATH, SPECTATOR_DIGEST, SPECTATOR_MAX_FAILURES
 from models import GameManager
+from persistence import GameStore
+from spectators import SpectatorRelay
+from timers import TimerWheel
 
 # Shared game manager instance
-game_manager = GameManager()
\ No newline at end of file
+game_manager = GameManager(store=GameStore(STATE_DB_PATH) if STATE_DB_PATH else None)
+
+# Per-game deadlines (lobby, reminders, the day loop), started with the bot
+timer_wheel = TimerWheel()
+
+# Spectator copies of major events, delivered in the background
+spectator_relay = SpectatorRelay(SPECTATOR_DIGEST, max_failures=SPECTATOR_MAX_FAILURES)
@@ -0,0 +1,270 @@
+"""Replay of the per-game event log.
+
+Every state change of a running CosmicVoyage is appended to ``game.event_log``
+as a compact record ``[kind, day, *fields]`` (see the recording helpers on
+CosmicVoyage). Random outcomes - dodges, hazards, relic finds, vote ties - are
+stored as results rather than re-rolled, so ``replay`` rebuilds the exact game
+from the seed and its records without depending on RNG call order.
+
+Usage: ``python eventlog.py <db path> <chat_id>`` prints a replayed game.
+"""
+import random
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from config import GamePhase
+from models import CosmicVoyage
+
+_APPLY: Dict[str, Callable[..., None]] = {}
+
+
+def _applies(kind: str):
+    def register(fn):
+        _APPLY[kind] = fn
+        return fn
+    return register
+
+
+@_applies("seed")
+def _seed(game: CosmicVoyage, seed: int, token: Optional[int] = None):
+    pass  # the seed and token are consumed when the game is constructed
+
+
+@_applies("join")
+def _join(game, user_id, username):
+    game.add_player(user_id, username)
+
+
+@_applies("leave")
+def _leave(game, user_id):
+    game.remove_player(user_id)
+
+
+@_applies("launch")
+def _launch(game, ship_max_hp, ship_hp, started=None):
+    game.launch(ship_max_hp, ship_hp, datetime.fromisoformat(started) if started else None)
+
+
+@_applies("roles")
+def _roles(game, assignments):
+    game.apply_roles(assignments)
+
+
+@_applies("objectives")
+def _objectives(game):
+    game.assign_secret_objectives()
+
+
+@_applies("day")
+def _day(game, phase):
+    game.start_day(GamePhase(phase))
+
+
+@_applies("collect")
+def _collect(game):
+    game.begin_action_collection()
+
+
+@_applies("action")
+def _action(game, user_id, action, target):
+    game.players[user_id].pending_target = target
+    game.submit_action(user_id, action)
+
+
+@_applies("damage")
+def _damage(game, user_id, dealt, shields_used, is_collateral):
+    player = game.players[user_id]
+    player.shields -= shields_used
+    player.apply_damage(dealt, is_collateral, game.current_day)
+    game._refile(player)
+
+
+@_applies("heal")
+def _heal(game, user_id, amount):
+    game.players[user_id].heal(amount)
+
+
+@_applies("hp")
+def _hp(game, user_id, amount):
+    game.players[user_id].hp += amount
+
+
+@_applies("death")
+def _death(game, user_id, cause):
+    game.kill_player(game.players[user_id], cause)
+
+
+@_applies("ship")
+def _ship(game, delta):
+    # Damage is recorded after hull reductions, so apply it raw
+    if delta >= 0:
+        game.ship.repair(delta)
+    else:
+        game.ship.hp = max(0, game.ship.hp + delta)
+
+
+@_applies("hazard")
+def _hazard(game, name, dealt):
+    _ship(game, -dealt)
+
+
+@_applies("spectate")
+def _spectate(game, user_id):
+    game.spectators.add(user_id)
+
+
+@_applies("unspectate")
+def _unspectate(game, user_id):
+    game.spectators.discard(user_id)
+
+
+@_applies("coins")
+def _coins(game, user_id, amount):
+    game.players[user_id].coins += amount
+
+
+@_applies("income")
+def _income(game, amount):
+    game.earn_coins(amount)
+
+
+@_applies("shields")
+def _shields(game, user_id, amount):
+    game.players[user_id].shields += amount
+
+
+@_applies("relic")
+def _relic(game, user_id, relic, delta):
+    player = game.players[user_id]
+    if delta > 0:
+        player.add_relic(relic)
+    else:
+        player.remove_relic(relic)
+
+
+@_applies("potion")
+def _potion(game, user_id):
+    game.players[user_id].has_potion = True
+
+
+@_applies("transform")
+def _transform(game, user_id):
+    game.transform_monster(game.players[user_id])
+
+
+@_applies("deliver")
+def _deliver(game, user_id):
+    game.potion_delivered = True
+
+
+@_applies("upgrade")
+def _upgrade(game, upgrade_key, amount):
+    game.contribute_upgrade(upgrade_key, amount)
+
+
+@_applies("set")
+def _set(game, user_id, name, value):
+    player = game.players[user_id]
+    if isinstance(getattr(player, name), (set, frozenset)):
+        value = set(value)
+    setattr(player, name, value)
+
+
+@_applies("flag")
+def _flag(game, name, value):
+    setattr(game, name, value)
+
+
+@_applies("voting")
+def _voting(game):
+    game.start_voting()
+
+
+@_applies("vote")
+def _vote(game, voter_id, target_id):
+    game.process_vote(voter_id, target_id)
+
+
+@_applies("eliminate")
+def _eliminate(game, user_id):
+    game.eliminate(user_id)
+
+
+@_applies("stage")
+def _stage(game, stage, deadline):
+    game.set_stage(stage, deadline)
+
+
+@_applies("dusk")
+def _dusk(game):
+    game.end_day()
+
+
+@_applies("next")
+def _next(game):
+    game.advance_day()
+
+
+@_applies("end")
+def _end(game, winner):
+    game.finish(winner)
+
+
+def replay(chat_id: int, records: Iterable[list]) -> CosmicVoyage:
+    """Rebuild a game from its event log.
+
+    The first record must be the ``seed`` record every game starts with. The
+    rebuilt game keeps the original records as its log, and its RNG is
+    re-seeded from the seed and log length so play after a recovery is
+    reproducible too.
+    """
+    records = [list(r) for r in records]
+    if not records or records[0][0] != "seed":
+        raise ValueError(f"Event log for {chat_id} does not start with a seed record")
+
+    seed, token = records[0][2], (records[0][3:] or [None])[0]
+    game = CosmicVoyage(chat_id, seed=seed, token=token)
+    for kind, day, *fields in records[1:]:
+        apply = _APPLY.get(kind)
+        if apply is None:
+            raise ValueError(f"Unknown event kind {kind!r} in log for {chat_id}")
+        game.current_day = day
+        apply(game, *fields)
+
+    game.event_log = records
+    game.event_log_flushed = len(records)
+    game.rng = random.Random(f"{seed}:{len(records)}")
+    return game
+
+
+def describe(game: CosmicVoyage) -> List[str]:
+    """Human-readable summary of a (replayed) game for offline debugging"""
+    lines = [f"chat {game.chat_id} seed {game.seed}: day {game.current_day}, "
+             f"phase {game.phase.value}, ship {game.ship.hp}/{game.ship.max_hp}, "
+             f"{len(game.event_log)} events"]
+    for player in game.players.values():
+        role = player.role.value if player.role else "-"
+        status = "alive" if player.is_alive else "dead"
+        lines.append(f"  {player.username:<20} {role:<18} {player.hp:>4} HP "
+                     f"{player.coins:>4} coins  {status}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    from persistence import GameStore
+
+    parser = argparse.ArgumentParser(description="Replay a game from its stored event log")
+    parser.add_argument("db", help="path to the state database")
+    parser.add_argument("chat_id", type=int)
+    parser.add_argument("--until", type=int, help="stop after this many events")
+    args = parser.parse_args(argv)
+
+    records = GameStore(args.db).load_events(args.chat_id)
+    if args.until is not None:
+        records = records[:args.until]
+    print("\n".join(describe(replay(args.chat_id, records))))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,30 @@
-import asyncio
-import random
 import logging
-from datetime import datetime, timedelta
-from typing import List
-from config import RANDOM_EVENTS, RANDOM_EVENT_CHANCE, SECRET_OBJECTIVES, SHIP_UPGRADES
-from utils import format_game_message, create_progress_bar, create_player_status_card
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from telegram.ext import ContextTypes
 
 from config import (
-    Role, GamePhase, GIFS, POTION_DAY, ACTION_TIMER, TOTAL_DAYS,
-    DIVINE_INTERVENTION_PROB, DIVINE_HEAL_AMOUNT, HEAL_SELF_AMOUNT,
-    REPAIR_SHIP_AMOUNT
+    Role, GamePhase, GIFS, POTION_DAY, ACTION_TIMER, TOTAL_DAYS, SHADOW_ROLES, CLEANUP_DELAY,
+    STAGE_DAWN, STAGE_BRIEFING, STAGE_ACTIONS, STAGE_VOTING
+)
+from models import CosmicVoyage, Player
+from outbox import PRIORITY_GAME
+from rules import (
+    resolve_day, starting_ship_hp, day_phase, resolve_collateral_deaths,
+    roll_divine_intervention, roll_random_event, apply_daily_upgrades, distribute_potion
 )
-from models import CosmicVoyage, GameManager
 from utils import (
-    send_message_wrapper, send_animation_wrapper, get_day_gif,
-    generate_status_image, create_action_keyboard, get_role_description,
-    create_vote_keyboard
+    format_game_message, send_message_wrapper, send_animation_wrapper, get_day_gif,
+    send_status_image, create_action_keyboard, get_role_description,
+    create_vote_keyboard, broadcast_messages, schedule_message_cleanup,
+    set_game_timer, cancel_game_timers
 )
 
 logger = logging.getLogger(__name__)
 
-from context import game_manager
+from context import game_manager, spectator_relay
 
 
 def get_role_abilities_highlight(role):
@@ -45,36 +47,26 @@ async def start_game(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
     """Start the game after lobby ends"""
     logger.info(f"=== START_GAME CALLED for chat {chat_id} ===")
     
-    game = game_manager.get_game(chat_id)
-    if not game:
-        logger.error(f"No game found for chat {chat_id}")
-        return
-    
-    logger.info(f"Game found with {len(game.players)} players")
-    
-    # Scale ship HP based on player count - STARTING AT HALF
-    player_count = len(game.players)
-    if player_count <= 4:
-        game.ship.max_hp = 80
-        game.ship.hp = 56  # Half of max
-    elif player_count <= 6:
-        game.ship.max_hp = 100
-        game.ship.hp = 70  # Half of max
-    elif player_count <= 10:
-        game.ship.max_hp = 120
-        game.ship.hp = 84  # Half of max
-    else:
-        game.ship.max_hp = 140
-        game.ship.hp = 98  # Half of max
-    
-    logger.info(f"Ship HP set to {game.ship.hp}/{game.ship.max_hp} (starting at 70%)")
-    
-    # Assign roles
-    game.assign_roles()
-    game.phase = GamePhase.HEALING
-    game.current_day = 1
-    game.game_start_time = datetime.now()
-    game.assign_secret_objectives()
+    async with game_manager.lock(chat_id):
+        game = game_manager.get_game(chat_id)
+        if not game:
+            logger.error(f"No game found for chat {chat_id}")
+            return
+        if game.phase != GamePhase.LOBBY:
+            return  # already started by the lobby timer or /startvoyage
+        
+        logger.info(f"Game found with {len(game.players)} players")
+        
+        # Scale ship HP based on player count - STARTING AT HALF
+        game.launch(*starting_ship_hp(len(game.players)))
+        
+        logger.info(f"Ship HP set to {game.ship.hp}/{game.ship.max_hp} (starting at 70%)")
+        
+        # Assign roles
+        game.assign_roles()
+        game.assign_secret_objectives()
+        game.set_stage(STAGE_DAWN)
+        game_manager.save_game(game)
     
     logger.info("Roles assigned, phase set to HEALING")
     
@@ -107,11 +99,10 @@ async def start_game(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
         if player.role in [Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER] and player.role != Role.BETRAYER:
             revealed_villains.append(player)
     
-    # FIXED: Proper indentation for this loop
+    role_messages = []
     for player in game.players.values():
         try:
-            negative_roles = [Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER]
-            is_villain = player.role in negative_roles
+            is_villain = player.role in SHADOW_ROLES
             
             alignment_display = "🔴 **DARK SIDE**" if is_villain else "🔵 **LIGHT SIDE**"
             
@@ -153,474 +144,331 @@ Use /myrole to review anytime""",
                 style="special"
             )
             
-            await context.bot.send_message(player.user_id, role_message, parse_mode='Markdown')
-            logger.info(f"Role DM sent to {player.username}")
+            role_messages.append((player.user_id, role_message, {'parse_mode': 'Markdown'}))
         except Exception as e:
-            logger.error(f"Failed to send role to {player.username}: {e}")
+            logger.error(f"Failed to build role message for {player.username}: {e}")
+    
+    delivered = await broadcast_messages(context, role_messages)
+    unreachable = [game.players[uid].username for uid, ok in delivered.items() if not ok]
+    if unreachable:
+        logger.warning(f"Role DM failed for: {', '.join(unreachable)}")
+        await send_message_wrapper(
+            context, chat_id,
+            "⚠️ **Couldn't DM:** " + ", ".join(unreachable) + "\n"
+            "Open a private chat with the bot and use /myrole to see your role!",
+            parse_mode='Markdown'
+        )
     
-    # Schedule the first day to start
+    # Schedule the first day to start, giving players a moment to read their roles
     logger.info("Scheduling first day...")
-    await asyncio.sleep(5)  # Give players a moment to read their roles
-    context.job_queue.run_once(
-        next_day_callback, 1,
-        data={'chat_id': chat_id},
-        name=f'day_{chat_id}'
-    )
+    _schedule(context, day_start_callback, NEXT_DAY_DELAY, chat_id)
 
 
-async def run_day_phase(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
-    """Run a single day phase"""
-    logger.info(f"=== RUN_DAY_PHASE STARTED for chat {chat_id} ===")
-    
+# The day runs as a chain of short timer callbacks rather than one coroutine
+# per game: dawn -> briefing -> actions -> (voting) -> next dawn. Each step
+# changes the game under its lock, records the next stage and snapshots, then
+# sends its messages and schedules the next step as the game's 'day' timer. A
+# game waiting on players costs one timer-wheel entry, and a restarted bot
+# resumes at the recorded stage (resume_game_callback). The stages are
+# config.STAGE_*.
+
+NEXT_DAY_DELAY = 6   # seconds between days (and after the role DMs)
+BRIEFING_DELAY = 2   # seconds between the day announcement and the action prompts
+RESUME_GRACE = 15    # minimum seconds left on a deadline after a restart
+
+
+def _schedule(context: ContextTypes.DEFAULT_TYPE, callback, delay: float, chat_id: int):
     game = game_manager.get_game(chat_id)
-    if not game:
-        logger.error(f"No game found in run_day_phase for chat {chat_id}")
-        return
-    
-    if game.phase == GamePhase.ENDED:
-        logger.warning(f"Game already ended for chat {chat_id}")
+    if game:
+        set_game_timer(context.application, game, 'day', delay, callback)
+
+
+def _game_at(chat_id: int, *stages: str) -> Optional[CosmicVoyage]:
+    """The chat's running game if its day is at one of ``stages``; None means a stale timer"""
+    game = game_manager.get_game(chat_id)
+    if game and game.phase != GamePhase.ENDED and game.stage in stages:
+        return game
+    return None
+
+
+def hurry_stage(context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage):
+    """Run the pending deadline now if every living player has already acted or voted"""
+    if game.stage == STAGE_ACTIONS and game.actions_complete:
+        callback = action_deadline_callback
+    elif game.stage == STAGE_VOTING and game.votes_complete:
+        callback = vote_deadline_callback
+    else:
         return
+    _schedule(context, callback, 0, game.chat_id)
+
+
+async def day_start_callback(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    """Dawn: collateral deaths, the win check and the day announcement"""
+    async with game_manager.lock(chat_id):
+        game = _game_at(chat_id, None, STAGE_DAWN)
+        if not game:
+            return
+        logger.info(f"Day {game.current_day} starting for chat {chat_id}")
+        collateral_deaths = resolve_collateral_deaths(game)
+        winner = game.check_win_condition()
+        if not winner:
+            phase, phase_name = day_phase(game.current_day)
+            game.start_day(phase)
+            game.set_stage(STAGE_BRIEFING)
+        game_manager.save_game(game)
+    
+    for player in collateral_deaths:
+        await send_message_wrapper(
+            context, chat_id,
+            f"💀 **{player.username}** succumbed to untreated collateral damage!",
+            is_major=True
+        )
     
-    logger.info(f"Current day: {game.current_day}, Phase: {game.phase}")
-    
-    # Check collateral damage deaths - FASTER NOW
-    logger.info("Checking collateral damage deaths...")
-    for player in list(game.players.values()):
-        if player.collateral_damage > 0 and game.current_day - player.collateral_day >= 4:
-            player.is_alive = False
-            await send_message_wrapper(
-                context, chat_id,
-                f"💀 **{player.username}** succumbed to untreated collateral damage!",
-                is_major=True
-            )
-            game.spectators.add(player.user_id)
-            logger.info(f"{player.username} died from collateral damage")
-    
-    # Check win conditions
-    logger.info("Checking win conditions...")
-    winner = game.check_win_condition()
     if winner:
         logger.info(f"Win condition met: {winner}")
         await end_game_victory(context, chat_id, winner)
         return
     
-    # Determine phase
-    if game.current_day <= 3:
-        game.phase = GamePhase.HEALING
-        phase_name = "Healing Phase"
-    elif game.current_day <= 9:
-        game.phase = GamePhase.VOYAGE
-        phase_name = "Cosmic Voyage"
-    elif game.current_day == 10:
-        game.phase = GamePhase.POTION_QUEST
-        phase_name = "Potion Quest"
-    elif game.current_day <= 12:
-        game.phase = GamePhase.SHOWDOWN
-        phase_name = "Monster Showdown"
-    else:
-        game.phase = GamePhase.DELIVERY
-        phase_name = "Final Delivery"
-    
-    logger.info(f"Phase determined: {phase_name}")
-    
-    # Day start message
-    logger.info("Sending day start message...")
     try:
         await send_animation_wrapper(
             context, chat_id, get_day_gif(game.current_day),
             caption=(
                 f"🌅 **DAY {game.current_day} - {phase_name.upper()}** 🌅\n\n"
                 f"🚢 **Ship HP:** {game.ship.hp}/{game.ship.max_hp}\n"
-                f"👥 **Crew Alive:** {len(game.get_living_players())}/{len(game.players)}\n"
+                f"👥 **Crew Alive:** {len(game.living)}/{len(game.players)}\n"
                 f"🌌 **Mission Progress:** {game.current_day}/{TOTAL_DAYS} days\n\n"
                 "⚡ **Actions will be requested via DM shortly...**"
             ),
             parse_mode='Markdown'
         )
-        logger.info("Day start message sent")
     except Exception as e:
         logger.error(f"Failed to send day start message: {e}")
     
-    # Send status image
-    logger.info("Generating status image...")
-    try:
-        buf = generate_status_image(game)
-        if buf:
-            await context.bot.send_photo(chat_id, photo=buf)
-            logger.info("Status image sent")
-    except Exception as e:
-        logger.error(f"Failed to send status image: {e}")
-    
-    await asyncio.sleep(2)
+    await send_status_image(context, game, chat_id)
+    _schedule(context, open_actions_callback, BRIEFING_DELAY, chat_id)
+
+
+async def open_actions_callback(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    """Divine intervention, the potion on POTION_DAY, then the action prompts"""
+    async with game_manager.lock(chat_id):
+        game = _game_at(chat_id, STAGE_BRIEFING)
+        if not game:
+            return
+        blessed = roll_divine_intervention(game)
+        potion_bearer = distribute_potion(game) if game.current_day == POTION_DAY else None
+        prompts = _action_prompts(game)
+        game.set_stage(STAGE_ACTIONS, time.time() + ACTION_TIMER)
+        game_manager.save_game(game)
     
-    # Divine intervention
-    if random.random() < DIVINE_INTERVENTION_PROB and game.current_day > 3:
-        logger.info("Divine intervention triggered!")
-        negative_roles = [Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER]
-        positive_players = [p for p in game.get_living_players() if p.role not in negative_roles]
-        for p in positive_players:
-            p.heal(DIVINE_HEAL_AMOUNT)
+    if blessed:
         await send_message_wrapper(
             context, chat_id,
             "✨ **Divine Intervention!** All heroes healed +20 HP!",
             is_major=True
         )
     
-    # Special events
-    if game.current_day == POTION_DAY:
-        logger.info("Potion day event triggered")
-        await handle_potion_day(context, chat_id)
-    
-    # Request actions
-    logger.info("Requesting player actions...")
-    await request_player_actions(context, chat_id)
-    
-    # Wait for actions
-    logger.info(f"Waiting {ACTION_TIMER} seconds for player actions...")
-    start_time = datetime.now()
-    while datetime.now() - start_time < timedelta(seconds=ACTION_TIMER):
-        if len(game.pending_actions) >= len(game.get_living_players()):
-            logger.info("All players have submitted actions early")
-            break
-        await asyncio.sleep(1)
-    
-    logger.info(f"Actions received: {len(game.pending_actions)}/{len(game.get_living_players())}")
-    
-    # Process events
-    logger.info("Processing day events...")
-    await process_day_events(context, chat_id)
-    
-    # Voting phase
-    if game.current_day >= 4 and not game.betrayer_caught:
-        logger.info("Starting voting phase...")
-        await send_message_wrapper(
-            context, chat_id,
-            "🗳️ **VOTING PHASE** 🗳️\n\nVote for who you suspect is the betrayer!\nCheck your DMs to cast your vote.",
-            is_major=True
-        )
-        
-        game.start_voting()
-        for player in game.get_living_players():
-            try:
-                await context.bot.send_message(
-                    player.user_id,
-                    "🗳️ **TIME TO VOTE!**\n\nWho do you suspect?\nChoose wisely:",
-                    reply_markup=create_vote_keyboard(game)
-                )
-            except Exception as e:
-                logger.error(f"Could not send vote request to {player.username}: {e}")
-        
-        # Wait for votes
-        logger.info("Waiting for votes...")
-        start_time = datetime.now()
-        while datetime.now() - start_time < timedelta(seconds=ACTION_TIMER):
-            if len(game.voted) >= len(game.get_living_players()):
-                break
-            await asyncio.sleep(1)
-        
-        # Process votes
-        logger.info("Processing votes...")
+    if potion_bearer:
+        await announce_potion(context, chat_id, potion_bearer)
+    
+    delivered = await broadcast_messages(context, prompts)
+    failed = [game.players[uid].username for uid, ok in delivered.items() if not ok]
+    if failed:
+        logger.warning(f"Action request failed for: {', '.join(failed)}")
+    
+    _schedule(context, action_deadline_callback, ACTION_TIMER, chat_id)
+
+
+async def action_deadline_callback(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    """Actions are in (or time is up): resolve the day, then open voting or close the day"""
+    async with game_manager.lock(chat_id):
+        game = _game_at(chat_id, STAGE_ACTIONS)
+        if not game:
+            return
+        logger.info(f"Actions received: {len(game.pending_actions)}/{len(game.living)}")
+        result = resolve_day(game)
+        summary = _day_summary(game, result.events)
+        voting = game.current_day >= 4 and not game.betrayer_caught
+        if voting:
+            game.start_voting()
+            vote_keyboard = create_vote_keyboard(game)
+            voters = [player.user_id for player in game.get_living_players()]
+            game.set_stage(STAGE_VOTING, time.time() + ACTION_TIMER)
+        else:
+            winner, random_event = _close_day(game)
+        game_manager.save_game(game)
+    
+    if result.monster_attacked:
+        await send_animation_wrapper(context, chat_id, GIFS['monster_attack'],
+                                     caption="👹 **EPIC MONSTER ATTACK!** 👹")
+    
+    # False intel tips and secret mission rewards
+    if result.notifications:
+        await broadcast_messages(context, result.notifications, priority=PRIORITY_GAME)
+    
+    if summary:
+        await send_message_wrapper(context, chat_id, summary, is_major=True, parse_mode='Markdown')
+    
+    if not voting:
+        await _after_close(context, chat_id, winner, random_event)
+        return
+    
+    await send_message_wrapper(
+        context, chat_id,
+        "🗳️ **VOTING PHASE** 🗳️\n\nVote for who you suspect is the betrayer!\nCheck your DMs to cast your vote.",
+        is_major=True
+    )
+    await broadcast_messages(context, [
+        (user_id,
+         "🗳️ **TIME TO VOTE!**\n\nWho do you suspect?\nChoose wisely:",
+         {'reply_markup': vote_keyboard})
+        for user_id in voters
+    ])
+    _schedule(context, vote_deadline_callback, ACTION_TIMER, chat_id)
+
+
+async def vote_deadline_callback(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    """Votes are in (or time is up): eliminate and close the day"""
+    async with game_manager.lock(chat_id):
+        game = _game_at(chat_id, STAGE_VOTING)
+        if not game:
+            return
         eliminated_id = game.end_voting()
-        if eliminated_id:
-            eliminated_player = game.players[eliminated_id]
-            if eliminated_id == game.betrayer_id and not game.monster_revealed:
-                await send_message_wrapper(
-                    context, chat_id,
-                    f"❌ **THE CREW HAS SPOKEN!**\n\n**{eliminated_player.username}** is the Betrayer!\nThey transform into **Epic Monster**!",
-                    is_major=True
-                )
-            else:
-                await send_message_wrapper(
-                    context, chat_id,
-                    f"❌ **THE CREW HAS SPOKEN!**\n\n**{eliminated_player.username}** has been voted out!\nTheir role was: **{eliminated_player.role.value}**",
-                    is_major=True
-                )
-                game.spectators.add(eliminated_id)
-    
-    # Check win conditions again
+        unmasked = eliminated_id == game.betrayer_id and not game.monster_revealed
+        if eliminated_id and not unmasked:
+            game.add_spectator(eliminated_id)
+        winner, random_event = _close_day(game)
+        game_manager.save_game(game)
+    
+    if eliminated_id:
+        eliminated_player = game.players[eliminated_id]
+        if unmasked:
+            await send_message_wrapper(
+                context, chat_id,
+                f"❌ **THE CREW HAS SPOKEN!**\n\n**{eliminated_player.username}** is the Betrayer!\nThey transform into **Epic Monster**!",
+                is_major=True
+            )
+        else:
+            await send_message_wrapper(
+                context, chat_id,
+                f"❌ **THE CREW HAS SPOKEN!**\n\n**{eliminated_player.username}** has been voted out!\nTheir role was: **{eliminated_player.role.value}**",
+                is_major=True
+            )
+    
+    await _after_close(context, chat_id, winner, random_event)
+
+
+def _close_day(game: CosmicVoyage) -> Tuple[Optional[str], Optional[Dict]]:
+    """End-of-day state changes, under the game's lock; returns (winner, tomorrow's random event)"""
     winner = game.check_win_condition()
     if winner:
-        logger.info(f"Win condition met after voting: {winner}")
+        return winner, None
+    
+    game.advance_day()
+    if game.current_day > TOTAL_DAYS:
+        return game.check_win_condition() or 'monster', None
+    
+    random_event = game.active_random_event if roll_random_event(game) else None
+    apply_daily_upgrades(game)
+    game.set_stage(STAGE_DAWN)
+    return None, random_event
+
+
+async def _after_close(context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+                       winner: Optional[str], random_event: Optional[Dict]):
+    if winner:
+        logger.info(f"Game in chat {chat_id} won by {winner}")
         await end_game_victory(context, chat_id, winner)
         return
     
-    # Next day
-    game.current_day += 1
-    logger.info(f"Day phase complete. Next day: {game.current_day}")
-    
-    if game.current_day <= TOTAL_DAYS:
-        logger.info("Scheduling next day...")
-        await asyncio.sleep(5)
-        context.job_queue.run_once(
-            next_day_callback, 1,
-            data={'chat_id': chat_id},
-            name=f'day_{chat_id}'
-        )
-    else:
-        logger.info("Game duration complete, checking final result...")
-        final_winner = game.check_win_condition() or 'monster'
-        await end_game_victory(context, chat_id, final_winner)
-
-    if random.random() < RANDOM_EVENT_CHANCE:
-        event_key = random.choice(list(RANDOM_EVENTS.keys()))
-        game.active_random_event = RANDOM_EVENTS[event_key]
+    if random_event:
         await send_message_wrapper(
             context, chat_id,
-            f"🌪️ **RANDOM EVENT: {game.active_random_event['name']}** 🌪️\n\n_{game.active_random_event['desc']}_",
+            f"🌪️ **RANDOM EVENT: {random_event['name']}** 🌪️\n\n_{random_event['desc']}_",
             is_major=True, parse_mode='Markdown'
         )
-
-    # AUTO-REPAIR FROM UPGRADE
-    if "auto_repair_system" in game.ship.upgrades:
-        game.ship.repair(5)
-
-
-async def next_day_callback(context: ContextTypes.DEFAULT_TYPE):
-    """Callback for scheduling next day"""
-    job = context.job
-    chat_id = job.data['chat_id']
-    logger.info(f"Next day callback triggered for chat {chat_id}")
-    await run_day_phase(context, chat_id)
+    
+    # The day is over: spectators on the digest get its events now
+    game = game_manager.get_game(chat_id)
+    if game:
+        spectator_relay.flush(context, game)
+    _schedule(context, day_start_callback, NEXT_DAY_DELAY, chat_id)
 
 
-async def request_player_actions(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
-    """Request actions from all living players"""
+async def resume_game_callback(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    """Resume a game restored from a snapshot after a bot restart"""
     game = game_manager.get_game(chat_id)
     if not game:
         return
     
-    game.pending_actions.clear()
+    logger.info(f"Resuming game in chat {chat_id} at day {game.current_day}, stage {game.stage}")
+    await send_message_wrapper(
+        context, chat_id,
+        f"♻️ **The ship's systems rebooted!** Resuming Day {game.current_day}...",
+        parse_mode='Markdown'
+    )
     
-    for player in game.get_living_players():
-        if player.action_blocked:
-            player.action_blocked = False
-            try:
-                await context.bot.send_message(
-                    player.user_id,
-                    "🚫 **ACTION BLOCKED!**\n\nThe Shadow Saboteur prevented you from taking action today."
-                )
-            except Exception as e:
-                logger.error(f"Could not send block message to {player.username}: {e}")
-            continue
-        
-        try:
-            await context.bot.send_message(
-                player.user_id,
-                f"⚡ **DAY {game.current_day} - CHOOSE YOUR ACTION!** ⚡\n\n"
-                f"📊 **Your Status:**\n"
-                f"❤️ HP: {player.hp}/100\n"
-                f"🪙 Coins: {player.coins}\n"
-                f"🛡 Shields: {player.shields}\n\n"
-                f"🚢 **Ship Status:** {game.ship.hp}/{game.ship.max_hp} HP\n\n"
-                f"⏰ **Time Limit:** {ACTION_TIMER} seconds\n\nChoose your action below:",
-                reply_markup=create_action_keyboard(player, game),
-                parse_mode='Markdown'
-            )
-            logger.info(f"Action request sent to {player.username}")
-        except Exception as e:
-            logger.error(f"Could not send action request to {player.username}: {e}")
+    if game.stage in (STAGE_ACTIONS, STAGE_VOTING):
+        # Players keep their open buttons; give them what was left of the window
+        remaining = max((game.stage_deadline or 0) - time.time(), RESUME_GRACE)
+        callback = action_deadline_callback if game.stage == STAGE_ACTIONS else vote_deadline_callback
+        _schedule(context, callback, remaining, chat_id)
+    elif game.stage == STAGE_BRIEFING:
+        _schedule(context, open_actions_callback, 0, chat_id)
+    else:
+        _schedule(context, day_start_callback, 0, chat_id)
 
 
-async def process_day_events(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
-    """Process all actions and events for the day"""
-    game = game_manager.get_game(chat_id)
-    if not game:
-        return
-        
-    events = []
+def _action_prompts(game: CosmicVoyage) -> List[Tuple[int, str, Dict]]:
+    """Open action collection and build each living player's action DM"""
+    game.begin_action_collection()
     
-    villain_multiplier = 1.0
-    if game.active_random_event and game.active_random_event['name'] == "Traitor's Moon":
-        villain_multiplier = 2.0
-    
-    is_anonymous = game.active_random_event and game.active_random_event['name'] == "Cosmic Flare"
-
-    # Process player actions
+    messages = []
     for player in game.get_living_players():
-        action = game.pending_actions.get(player.user_id, "skip")
-        player.basic_attack_used_today = False
-        
-        if not player.objective_completed and player.secret_objective:
-            if player.secret_objective['desc'] == "Heal 3 different players." and action == "heal" and player.pending_target:
-                player.objective_progress += 1
-            elif player.secret_objective['desc'] == "Find 2 relics." and action == "relic":
-                player.objective_progress += 1
-            elif player.secret_objective['desc'] == "Successfully use Rally Team twice." and action == "rally":
-                player.objective_progress += 1
-         
-        if action == "basic_attack" and player.pending_target:
-            target = game.players.get(player.pending_target)
-            if target and target.is_alive:
-                from config import DEFAULT_WEAPON
-                damage = DEFAULT_WEAPON["damage"]
-                target.take_damage(damage)
-                events.append(f"⚔️ {player.username} attacked {target.username} with Basic Strike! (-{damage} HP)")
-                
-                if not target.is_alive:
-                    events.append(f"💀 {target.username} has been slain!")
-                    game.spectators.add(target.user_id)
-        
-        # PREMIUM WEAPON ATTACK
-        elif action == "weapon_attack" and player.pending_target and hasattr(player, 'selected_weapon'):
-            target = game.players.get(player.pending_target)
-            weapon_name = player.selected_weapon
-            
-            if target and weapon_name in player.weapons and player.weapons[weapon_name] > 0:
-                from config import PREMIUM_WEAPONS
-                weapon_data = PREMIUM_WEAPONS[weapon_name]
-                damage = weapon_data["damage"]
-                
-                target.take_damage(damage)
-                player.weapons[weapon_name] -= 1
-                
-                events.append(f"🗡️ {player.username} attacked {target.username} with {weapon_name}! (-{damage} HP)")
-                
-                if not target.is_alive:
-                    events.append(f"💀 {target.username} has been eliminated!")
-                    game.spectators.add(target.user_id)
-        
-        player.pending_target = None
-        if hasattr(player, 'selected_weapon'):
-            delattr(player, 'selected_weapon')
-        
-        elif action == "heal":
-            if player.pending_target and player.role == Role.HEALER:
-                target = game.players.get(player.pending_target)
-                if target:
-                    target.heal(HEAL_SELF_AMOUNT)
-                    events.append(f"🩹  {player.username} healed {target.username} (+{HEAL_SELF_AMOUNT} HP)")
-                    player.healed_targets.add(player.pending_target)
-                    player.objective_progress = len(player.healed_targets)
-            else:
-                player.heal(HEAL_SELF_AMOUNT)
-                events.append(f"🩹  {player.username} healed themselves (+{HEAL_SELF_AMOUNT} HP)")
-        
-        elif action == "repair" and player.role in [Role.HEALER, Role.CAPTAIN]:
-            game.ship.repair(REPAIR_SHIP_AMOUNT)
-            events.append(f"🔧 {player.username} repaired the ship (+{REPAIR_SHIP_AMOUNT} HP)")
-        
-        elif action == "protect" and player.role == Role.DRAGON_RIDER:
-            events.append(f"🐉 {player.username} is protecting the team")
-        
-        elif action == "relic" and player.role == Role.EXPLORER:
-            from config import RELIC_EFFECTS
-            available_relics = [r for r in RELIC_EFFECTS.keys() if r not in player.relics]
-            if available_relics:
-                found_relic = random.choice(available_relics)
-                player.relics.append(found_relic)
-                events.append(f"🪶 {player.username} found the {found_relic}")
-        
-        elif action == "rally" and player.role == Role.CAPTAIN and player.rally_uses > 0:
-            for p in game.get_living_players():
-                p.heal(10)
-            player.rally_uses -= 1
-            events.append(f"🎖 {player.username} rallied the team! +10 HP to all")
-        
-        elif action == "sabotage" and player.role == Role.BETRAYER:
-            damage = int(random.randint(12, 22) * villain_multiplier)
-            damage = game.apply_captain_damage_reduction(damage)
-            game.ship.take_damage(damage)
-            events.append(f"🔪 Sabotage! Ship took {damage} damage (anonymous)")
-            if not player.objective_completed and player.secret_objective['desc'] == "Successfully sabotage the ship for a total of 50 damage.":
-                player.objective_progress += damage
-
-        elif action == "deliver" and player.has_potion:
-            game.potion_delivered = True
-            events.append(f"⚡ **{player.username} delivered the Cosmic Potion!** The team wins!")
-        
-        elif action == "block" and player.pending_target and player.role == Role.SHADOW_SABOTEUR:
-            target = game.players.get(player.pending_target)
-            if target:
-                target.action_blocked = True
-                game.shadow_saboteur_uses += 1
-                events.append(f"🚫 Someone's action was blocked (anonymous)")
-
-        elif action == "frame_job" and player.role == Role.BETRAYER and player.frame_job_uses > 0 and player.pending_target:
-            target = game.players.get(player.pending_target)
-            if target and target.role != Role.BETRAYER:
-                player.frame_job_uses -= 1
-                events.append(f"🎭 Someone's action caused minor damage! (Suspicious)")
-                game.ship.take_damage(5)
-        
-        elif action == "false_intel" and player.role == Role.BETRAYER and player.false_intel_uses > 0 and player.pending_target:
-            target = game.players.get(player.pending_target)
-            if target and target.role != Role.BETRAYER:
-                player.false_intel_uses -= 1
-                try:
-                    await context.bot.send_message(target.user_id, f"🤫 Anonymous tip: {random.choice(['Someone saw a crew member near the engine room...', 'Strange noises were heard from the cargo bay...', 'A player was acting suspiciously...'])}")
-                except Exception:
-                    pass
-
-        player.pending_target = None
-
-    # SECRET OBJECTIVE COMPLETION CHECK
-    for player in game.get_living_players():
-        if not player.objective_completed and player.secret_objective:
-            obj = player.secret_objective
-            is_complete = False
-            
-            if obj['desc'] == "Survive until Day 8." and game.current_day >= obj['target_count']:
-                is_complete = True
-            elif obj['desc'] == "Successfully sabotage the ship for a total of 50 damage." and player.objective_progress >= obj['target_count']:
-                is_complete = True
-            elif player.objective_progress >= obj['target_count']:
-                is_complete = True
-
-            if is_complete:
-                player.objective_completed = True
-                reward_msg = f"🎯 **Secret Mission Complete!** You completed: '{obj['desc']}'.\n"
-                if obj['reward_type'] == 'coins':
-                    player.coins += obj['value']
-                    reward_msg += f"💰 You have been awarded {obj['value']} coins!"
-                elif obj['reward_type'] == 'item':
-                    player.shields += 1
-                    reward_msg += f"🛡️ You have received a free Shield!"
-                elif obj['reward_type'] == 'hp_boost':
-                     player.hp += obj['value']
-                     reward_msg += f"❤️ Your HP has been boosted by {obj['value']}!"
-                
-                try:
-                    await context.bot.send_message(player.user_id, reward_msg)
-                except Exception:
-                    pass
-    
-    # Random hazards
-    if game.phase == GamePhase.VOYAGE and random.random() < 0.5:
-        hazard = random.choice(["Cosmic Storm", "Meteor Shower", "Solar Flare", "Dimensional Rift"])
-        damage = game.apply_captain_damage_reduction(random.randint(8, 18))
-        game.ship.take_damage(damage)
-        events.append(f"🌪️ {hazard} hit the ship! (-{damage} HP)")
-    
-    # Monster attack
-    if game.monster_revealed and game.monster_id and game.players[game.monster_id].is_alive:
-        await process_monster_attack(context, game, events)
-    
-    # Daily coins
-    game.earn_coins()
-
-    # Reset the active random event at the end of the day
-    game.active_random_event = None
-    game.villain_boost_active = False
-    
-    # Send events
-    if events:
-        event_summary = "\n".join([f"  ▸ {event}" for event in events[:8]])
-        if len(events) > 8:
-            event_summary += f"\n  ... +{len(events) - 8} more"
-        
-        alive_count = len(game.get_living_players())
-        ship_percent = int((game.ship.hp / game.ship.max_hp) * 100)
-        
-        if ship_percent > 70:
-            ship_status = "🟢 GOOD"
-        elif ship_percent > 40:
-            ship_status = "🟡 DAMAGED"
-        else:
-            ship_status = "🔴 CRITICAL"
+        if player.action_blocked:
+            game.set_player_stat(player, 'action_blocked', False)
+            messages.append((
+                player.user_id,
+                "🚫 **ACTION BLOCKED!**\n\nThe Shadow Saboteur prevented you from taking action today.",
+                {}
+            ))
+            continue
         
-        formatted_events = format_game_message(
-            f"DAY {game.current_day} EVENTS",
-            f"""**Mission Status**
+        messages.append((
+            player.user_id,
+            f"⚡ **DAY {game.current_day} - CHOOSE YOUR ACTION!** ⚡\n\n"
+            f"📊 **Your Status:**\n"
+            f"❤️ HP: {player.hp}/100\n"
+            f"🪙 Coins: {player.coins}\n"
+            f"🛡 Shields: {player.shields}\n\n"
+            f"🚢 **Ship Status:** {game.ship.hp}/{game.ship.max_hp} HP\n\n"
+            f"⏰ **Time Limit:** {ACTION_TIMER} seconds\n\nChoose your action below:",
+            {'reply_markup': create_action_keyboard(player, game), 'parse_mode': 'Markdown'}
+        ))
+    return messages
+
+
+def _day_summary(game: CosmicVoyage, events: List[str]) -> Optional[str]:
+    """The group's end-of-day report, or None on a quiet day"""
+    if not events:
+        return None
+    
+    event_summary = "\n".join([f"  ▸ {event}" for event in events[:8]])
+    if len(events) > 8:
+        event_summary += f"\n  ... +{len(events) - 8} more"
+    
+    alive_count = len(game.living)
+    ship_percent = int((game.ship.hp / game.ship.max_hp) * 100)
+    
+    if ship_percent > 70:
+        ship_status = "🟢 GOOD"
+    elif ship_percent > 40:
+        ship_status = "🟡 DAMAGED"
+    else:
+        ship_status = "🔴 CRITICAL"
+    
+    return format_game_message(
+        f"DAY {game.current_day} EVENTS",
+        f"""**Mission Status**
 └─ Phase: {game.phase.value.title()}
 
 **Ship Status**
@@ -632,68 +480,13 @@ async def process_day_events(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
 
 **Today's Events:**
 {event_summary}""",
-            emoji="📜",
-            style="info"
-        )
-        
-        await send_message_wrapper(context, chat_id, formatted_events, is_major=True, parse_mode='Markdown')
-
-
-async def process_monster_attack(context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage, events: List[str]):
-    """Process monster attack logic"""
-    monster = game.players.get(game.monster_id)
-    if not monster or not monster.is_alive:
-        return
-    
-    devil_boost = 1.5 if game.devil_hunter_boost_used else 1.0
-    villain_boost = 1.5 if game.villain_boost_active else 1.0
-    total_boost = devil_boost * villain_boost
-    
-    ship_damage = game.apply_captain_damage_reduction(int(random.randint(20, 35) * total_boost))
-    game.ship.take_damage(ship_damage)
-    events.append(f"👹 Monster attacked the ship! (-{ship_damage} HP)")
-    
-    targets = [p for p in game.get_living_players() if p.user_id != game.monster_id]
-    num_targets = min(len(targets), 2)
-    
-    if num_targets > 0:
-        for target in random.sample(targets, num_targets):
-            is_dragon_protected = any(
-                p.role == Role.DRAGON_RIDER and p.is_alive and 
-                game.pending_actions.get(p.user_id) == "protect" 
-                for p in game.players.values()
-            )
-            
-            damage = int(random.randint(25, 40) * total_boost)
-            if is_dragon_protected:
-                damage = int(damage * 0.6)
-            
-            target.take_damage(damage, is_collateral=True, current_day=game.current_day)
-            events.append(f"👹 {target.username} took {damage} collateral damage!")
-    
-    await send_animation_wrapper(context, game.chat_id, GIFS['monster_attack'], 
-                               caption="👹 **EPIC MONSTER ATTACK!** 👹")
+        emoji="📜",
+        style="info"
+    )
 
 
-async def handle_potion_day(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
-    """Handle day 10 potion appearance"""
-    game = game_manager.get_game(chat_id)
-    if not game:
-        return
-    
-    negative_roles = [Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER]
-    positive_players = [p for p in game.get_living_players() if p.role not in negative_roles]
-    
-    if not positive_players:
-        return
-    
-    potion_bearer = random.choice(positive_players)
-    potion_bearer.has_potion = True
-    
-    if game.betrayer_id in game.players and game.players[game.betrayer_id].is_alive and not game.monster_revealed:
-        game.players[game.betrayer_id].role = Role.EPIC_MONSTER
-        game.monster_revealed = True
-    
+async def announce_potion(context: ContextTypes.DEFAULT_TYPE, chat_id: int, potion_bearer: Player):
+    """Tell the group who carries the potion (day 10 potion appearance)"""
     await send_animation_wrapper(
         context, chat_id, GIFS['potion_found'],
         caption=(
@@ -711,19 +504,19 @@ async def handle_potion_day(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
 
 async def end_game_victory(context: ContextTypes.DEFAULT_TYPE, chat_id: int, winner: str):
     """End game and announce winner"""
-    game = game_manager.get_game(chat_id)
-    if not game or game.phase == GamePhase.ENDED:
-        return
+    async with game_manager.lock(chat_id):
+        game = game_manager.get_game(chat_id)
+        if not game or game.phase == GamePhase.ENDED:
+            return
+        game.finish(winner)
     
-    game.phase = GamePhase.ENDED
+    cancel_game_timers(game)
     
-    # Cancel jobs
-    jobs = context.job_queue.get_jobs_by_name(f'day_{chat_id}')
-    for job in jobs:
-        job.schedule_removal()
+    # Clear the game's chatter from the group a little after the result is in;
+    # taken before the result is sent so the final message stays
+    schedule_message_cleanup(context, game, CLEANUP_DELAY)
     
     # Determine winners/losers
-    villain_roles = [Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER]
     winners = []
     losers = []
     mvp_candidates = []
@@ -731,7 +524,7 @@ async def end_game_victory(context: ContextTypes.DEFAULT_TYPE, chat_id: int, win
     winning_team = 'team' if winner == 'team' else 'monster'
     
     for player in game.players.values():
-        is_villain = player.role in villain_roles
+        is_villain = player.role in SHADOW_ROLES
         mvp_candidates.append((player, player.coins))
         
         if (winning_team == 'team' and not is_villain) or \
@@ -744,7 +537,7 @@ async def end_game_victory(context: ContextTypes.DEFAULT_TYPE, chat_id: int, win
     mvp = mvp_candidates[0][0] if mvp_candidates else None
     
     duration = datetime.now() - game.game_start_time
-    survival_rate = (len(game.get_living_players()) / len(game.players)) * 100 if game.players else 0
+    survival_rate = (len(game.living) / len(game.players)) * 100 if game.players else 0
     
     if winner == 'team':
         title = "VICTORY - LIGHT TRIUMPHS!"
@@ -789,5 +582,8 @@ _Thanks for playing! Use /newgame again!_""",
         parse_mode='Markdown',
         is_major=True
     )
+    spectator_relay.flush(context, game)
     
-    game_manager.end_game(chat_id)
\ No newline at end of file
+    async with game_manager.lock(chat_id):
+        if game_manager.get_game(chat_id) is game:  # not already replaced by a /newgame
+            game_manager.end_game(chat_id)
\ No newline at end of file
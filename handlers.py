@@ -1,5 +1,7 @@
 import asyncio
 import logging
+from collections import Counter
+from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from utils import format_game_message, create_progress_bar, create_player_status_card
 from telegram.ext import ContextTypes
@@ -7,21 +9,38 @@ from telegram.ext import ContextTypes
 from config import (
     BOT_OWNER_ID, CO_OWNER_ID, SUPPORT_GROUP_ID, MIN_PLAYERS, MAX_PLAYERS,
     BASE_LOBBY_TIMER, HELP_PHOTO, HELP_TEXTS, SHOP_ITEMS, RELIC_EFFECTS,
-    Role,SHIP_UPGRADES   # ADD THIS LINE
+    Role, SHADOW_ROLES, SHIP_UPGRADES, CLEANUP_DELAY, LOBBY_EDIT_INTERVAL   # ADD THIS LINE
 )
 from models import GameManager, GamePhase
 from utils import (
     check_cooldown, create_lobby_keyboard, send_message_wrapper, 
     send_animation_wrapper, create_help_keyboard, create_shop_keyboard,
-    get_role_description, generate_status_image, create_target_keyboard,
-    create_relic_keyboard, is_owner_or_co_owner
+    get_role_description, send_status_image, create_target_keyboard,
+    create_relic_keyboard, is_owner_or_co_owner, schedule_message_cleanup,
+    set_game_timer, cancel_game_timers
 )
-from game_logic import start_game
+from callbacks import (
+    ACTION, ATTACK, BUY, EXTEND, HELP, JOIN, LEAVE, RELIC, RULES, TARGET, UPGRADE, VOTE, router
+)
+from game_logic import start_game, hurry_stage
 from config import GIFS
-import random
 
 logger = logging.getLogger(__name__)
-from context import game_manager
+from context import game_manager, spectator_relay, timer_wheel
+
+
+# Updates are handled concurrently. Handlers that change a game do so under
+# game_manager.lock(chat_id), checking and changing it in one locked block, and
+# make their Telegram calls after releasing it, so a slow request never holds
+# up the chat's other updates or its day loop.
+
+def _game_chat_id(update: Update) -> Optional[int]:
+    """The chat whose game an update concerns: the group itself, or the sender's game for DMs"""
+    chat = update.effective_chat
+    if chat and chat.type != 'private':
+        return chat.id
+    user = update.effective_user
+    return game_manager.user_games.get(user.id) if user else None
 
 
 # ============================================================================
@@ -118,8 +137,12 @@ async def newgame_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
     chat_id = update.effective_chat.id
     
-    existing_game = game_manager.get_game(chat_id)
-    if existing_game and existing_game.phase != GamePhase.ENDED:
+    async with game_manager.lock(chat_id):
+        existing_game = game_manager.get_game(chat_id)
+        in_progress = existing_game is not None and existing_game.phase != GamePhase.ENDED
+        game = None if in_progress else game_manager.create_game(chat_id)
+    
+    if in_progress:
         await update.message.reply_text(
             "🚫 Game already in progress!\n"
             "Use `/status` to check progress or `/endgame` to stop it.",
@@ -127,7 +150,6 @@ async def newgame_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    game = game_manager.create_game(chat_id)
     if not game:
         await update.message.reply_text("❌ Failed to create game. Please try again.")
         return
@@ -147,50 +169,41 @@ async def newgame_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ),
         reply_markup=InlineKeyboardMarkup([
             [
-                InlineKeyboardButton("🛳 Join Battle", callback_data="join_game"),
-                InlineKeyboardButton("🚪 Leave Lobby", callback_data="leave_game")
+                InlineKeyboardButton("🛳 Join Battle", callback_data=JOIN.data()),
+                InlineKeyboardButton("🚪 Leave Lobby", callback_data=LEAVE.data())
             ],
             [
-                InlineKeyboardButton("⏳ Extend Time (+30s)", callback_data="extend_lobby"),
-                InlineKeyboardButton("📜 Rules & Roles", callback_data="show_rules")
+                InlineKeyboardButton("⏳ Extend Time (+30s)", callback_data=EXTEND.data()),
+                InlineKeyboardButton("📜 Rules & Roles", callback_data=RULES.data())
             ]
         ]),
         parse_mode='Markdown'
     )
     
-    if lobby_msg:
-        game.lobby_message_id = lobby_msg.message_id
-    
-    # Start lobby timer
-    context.job_queue.run_once(
-        lobby_timer_callback, 
-        BASE_LOBBY_TIMER,
-        data={'chat_id': chat_id}, 
-        name=f'lobby_{chat_id}'
-    )
-    
-    # Schedule reminder at 30 seconds before end
-    reminder_time = max(BASE_LOBBY_TIMER - 30, 10)
-    context.job_queue.run_once(
-        lobby_reminder_callback,
-        reminder_time,
-        data={'chat_id': chat_id},
-        name=f'reminder_{chat_id}'
-    )
+    async with game_manager.lock(chat_id):
+        if game_manager.get_game(chat_id) is not game:
+            return  # ended while the lobby message was being sent
+        if lobby_msg:
+            game.lobby_message_id = lobby_msg.message_id
+            game_manager.save_game(game)
+        
+        # Start lobby timer
+        set_game_timer(context.application, game, 'lobby', BASE_LOBBY_TIMER, lobby_timer_callback)
+        
+        # Schedule reminder at 30 seconds before end
+        reminder_time = max(BASE_LOBBY_TIMER - 30, 10)
+        set_game_timer(context.application, game, 'reminder', reminder_time, lobby_reminder_callback)
     
     logger.info(f"Lobby timer started: {BASE_LOBBY_TIMER}s for chat {chat_id}")
 
-async def lobby_reminder_callback(context: ContextTypes.DEFAULT_TYPE):
+async def lobby_reminder_callback(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
     """Remind players about lobby ending soon"""
-    job = context.job
-    chat_id = job.data['chat_id']
-    game = game_manager.get_game(chat_id)
-    
-    if not game or game.phase != GamePhase.LOBBY or game.lobby_reminder_sent:
-        return
-        
-    game.lobby_reminder_sent = True
-    current_players = len(game.players)
+    async with game_manager.lock(chat_id):
+        game = game_manager.get_game(chat_id)
+        if not game or game.phase != GamePhase.LOBBY or game.lobby_reminder_sent:
+            return
+        game.lobby_reminder_sent = True
+        current_players = len(game.players)
     
     reminder_text = (
         "⏰ **LOBBY REMINDER** ⏰\n\n"
@@ -207,25 +220,25 @@ async def lobby_reminder_callback(context: ContextTypes.DEFAULT_TYPE):
                              reply_markup=create_lobby_keyboard(), parse_mode='Markdown')
 
 
-async def lobby_timer_callback(context: ContextTypes.DEFAULT_TYPE):
+async def lobby_timer_callback(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
     """Handle lobby timer expiration"""
-    job = context.job
-    chat_id = job.data['chat_id']
-    game = game_manager.get_game(chat_id)
-    
-    if not game or game.phase != GamePhase.LOBBY:
-        return
+    async with game_manager.lock(chat_id):
+        game = game_manager.get_game(chat_id)
+        if not game or game.phase != GamePhase.LOBBY:
+            return
+        player_count = len(game.players)
+        if player_count < MIN_PLAYERS:
+            game_manager.end_game(chat_id)
     
-    if len(game.players) < MIN_PLAYERS:
+    if player_count < MIN_PLAYERS:
         await send_message_wrapper(
             context, chat_id,
             f"❌ **Lobby closed!**\n\n"
             f"Not enough players joined.\n"
-            f"Required: {MIN_PLAYERS} | Joined: {len(game.players)}\n\n"
+            f"Required: {MIN_PLAYERS} | Joined: {player_count}\n\n"
             "Use `/newgame` to try again!",
             parse_mode='Markdown'
         )
-        game_manager.end_game(chat_id)
         return
     
     await send_message_wrapper(context, chat_id, "🚀 **Lobby timer ended! Starting game...**")
@@ -252,39 +265,45 @@ async def join_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     user = update.effective_user
-    if game.add_player(user.id, user.username or user.first_name):
+    async with game_manager.lock(chat_id):
+        other_game = game_manager.get_user_game(user.id)
+        elsewhere = other_game is not None and other_game is not game
+        joined = (not elsewhere and game.phase == GamePhase.LOBBY
+                  and game_manager.add_player(chat_id, user.id, user.username or user.first_name))
+        if joined:
+            update_lobby_message(context, game)
+    
+    if elsewhere:
+        await update.message.reply_text("❌ You're already playing in another chat!")
+    elif joined:
         await update.message.reply_text(f"✅ **{user.first_name}** joined the cosmic voyage!")
-        await update_lobby_message(context, game)
     else:
         await update.message.reply_text("❌ Lobby is full or you've already joined!")
 
 
-# handlers.py - FIND AND REPLACE update_lobby_message
-
-async def update_lobby_message(context: ContextTypes.DEFAULT_TYPE, game):
+def render_lobby_caption(game) -> str:
     """Enhanced lobby display"""
-    try:
-        player_count = len(game.players)
-        progress = create_progress_bar(player_count, MAX_PLAYERS, 20, "👥", "⬜")
-        
-        player_grid = []
-        for i, player in enumerate(game.players.values(), 1):
-            player_grid.append(f"{i}. 🎮 {player.username}")
-        
-        player_display = "\n".join(player_grid) if player_grid else "⏳ _Waiting for players..._"
-        
-        if player_count < MIN_PLAYERS:
-            status_emoji = "🔴"
-            status_text = f"Need {MIN_PLAYERS - player_count} more"
-            can_start = "❌ Cannot start yet"
-        else:
-            status_emoji = "🟢"
-            status_text = "Ready to launch!"
-            can_start = "✅ Can start anytime"
-        
-        caption = format_game_message(
-            "COSMIC VOYAGE LOBBY",
-            f"""{status_emoji} **Status:** {status_text}
+    player_count = len(game.players)
+    progress = create_progress_bar(player_count, MAX_PLAYERS, 20, "👥", "⬜")
+    
+    player_grid = []
+    for i, player in enumerate(game.players.values(), 1):
+        player_grid.append(f"{i}. 🎮 {player.username}")
+    
+    player_display = "\n".join(player_grid) if player_grid else "⏳ _Waiting for players..._"
+    
+    if player_count < MIN_PLAYERS:
+        status_emoji = "🔴"
+        status_text = f"Need {MIN_PLAYERS - player_count} more"
+        can_start = "❌ Cannot start yet"
+    else:
+        status_emoji = "🟢"
+        status_text = "Ready to launch!"
+        can_start = "✅ Can start anytime"
+    
+    return format_game_message(
+        "COSMIC VOYAGE LOBBY",
+        f"""{status_emoji} **Status:** {status_text}
 {can_start}
 
 **Player Count**
@@ -296,18 +315,52 @@ async def update_lobby_message(context: ContextTypes.DEFAULT_TYPE, game):
 
 🕐 Extensions: {game.lobby_extensions}/2
 ⚔️ Required: {MIN_PLAYERS} players""",
-            emoji="🎮",
-            style="info"
-        )
-        
+        emoji="🎮",
+        style="info"
+    )
+
+
+# requested: lobby changes marked dirty; sent: edits made; unchanged: flushes
+# that found the caption already up to date
+lobby_edit_stats: Counter = Counter()
+
+
+def update_lobby_message(context: ContextTypes.DEFAULT_TYPE, game):
+    """Mark the lobby message stale.
+
+    Changes within LOBBY_EDIT_INTERVAL share one edit, made by
+    lobby_edit_callback from the lobby's state at that moment.
+    """
+    lobby_edit_stats['requested'] += 1
+    timer = game.timers.get('lobby_edit')
+    if not (timer and timer.active):
+        set_game_timer(context.application, game, 'lobby_edit', LOBBY_EDIT_INTERVAL, lobby_edit_callback)
+
+
+async def lobby_edit_callback(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    """Bring the lobby message up to date, unless it already is"""
+    async with game_manager.lock(chat_id):
+        game = game_manager.get_game(chat_id)
+        if not game or game.phase != GamePhase.LOBBY or not game.lobby_message_id:
+            return
+        caption = render_lobby_caption(game)
+        if caption == game.lobby_caption:
+            lobby_edit_stats['unchanged'] += 1
+            return
+        game.lobby_caption = caption
+        message_id = game.lobby_message_id
+    
+    try:
         await context.bot.edit_message_caption(
-            chat_id=game.chat_id,
-            message_id=game.lobby_message_id,
+            chat_id=chat_id,
+            message_id=message_id,
             caption=caption,
             reply_markup=create_lobby_keyboard(),
             parse_mode='Markdown'
         )
+        lobby_edit_stats['sent'] += 1
     except Exception as e:
+        game.lobby_caption = None  # let the next change try again
         logger.warning(f"Could not update lobby: {e}")
 
 
@@ -321,9 +374,13 @@ async def leave_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     user = update.effective_user
-    if game.remove_player(user.id):
+    async with game_manager.lock(chat_id):
+        left = game.phase == GamePhase.LOBBY and game_manager.remove_player(chat_id, user.id)
+        if left:
+            update_lobby_message(context, game)
+    
+    if left:
         await update.message.reply_text(f"👋 **{user.first_name}** left the lobby.")
-        await update_lobby_message(context, game)
     else:
         await update.message.reply_text("❌ You're not in the lobby!")
 
@@ -354,16 +411,18 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         await update.message.reply_text(status_text, parse_mode='Markdown')
     else:
-        buf = generate_status_image(game)
-        if buf:
-            caption = (
-                f"📊 **DAY {game.current_day} STATUS** 📊\n\n"
-                f"🚢 **Ship HP:** {game.ship.hp}/{game.ship.max_hp}\n"
-                f"👥 **Alive:** {len(game.get_living_players())}/{len(game.players)}\n"
-                f"🌌 **Phase:** {game.phase.value.title()}"
-            )
-            await update.message.reply_photo(photo=buf, caption=caption, parse_mode='Markdown')
-        else:
+        caption = (
+            f"📊 **DAY {game.current_day} STATUS** 📊\n\n"
+            f"🚢 **Ship HP:** {game.ship.hp}/{game.ship.max_hp}\n"
+            f"👥 **Alive:** {len(game.living)}/{len(game.players)}\n"
+            f"🌌 **Phase:** {game.phase.value.title()}"
+        )
+        msg = await send_status_image(
+            context, game, chat_id,
+            caption=caption, parse_mode='Markdown',
+            reply_to_message_id=update.message.message_id
+        )
+        if not msg:
             await update.message.reply_text("❌ Could not generate status image.")
 
 
@@ -410,19 +469,23 @@ async def startvoyage_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("❌ Could not verify admin privileges!")
         return
     
-    if len(game.players) < MIN_PLAYERS:
+    async with game_manager.lock(chat_id):
+        still_open = game_manager.get_game(chat_id) is game and game.phase == GamePhase.LOBBY
+        player_count = len(game.players)
+        if still_open and player_count >= MIN_PLAYERS:
+            cancel_game_timers(game, 'lobby', 'reminder')
+    
+    if not still_open:
+        await update.message.reply_text("❌ No active lobby to start!")
+        return
+    
+    if player_count < MIN_PLAYERS:
         await update.message.reply_text(
             f"❌ Need at least {MIN_PLAYERS} players to start!\n"
-            f"Current: {len(game.players)}/{MIN_PLAYERS}"
+            f"Current: {player_count}/{MIN_PLAYERS}"
         )
         return
     
-    # Cancel timers
-    for job in context.job_queue.get_jobs_by_name(f'lobby_{chat_id}'):
-        job.schedule_removal()
-    for job in context.job_queue.get_jobs_by_name(f'reminder_{chat_id}'):
-        job.schedule_removal()
-    
     await update.message.reply_text("🚀 **Game starting now!** Admin has forced start.")
     await start_game(context, chat_id)
 
@@ -448,10 +511,66 @@ async def endgame_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Could not verify permissions!")
         return
     
-    game_manager.end_game(chat_id)
+    async with game_manager.lock(chat_id):
+        if game_manager.get_game(chat_id) is game:
+            schedule_message_cleanup(context, game, CLEANUP_DELAY)
+            # As at a victory: the spectators get the digest so far, and the
+            # next game in this chat starts with an empty one
+            spectator_relay.flush(context, game)
+            game_manager.end_game(chat_id)
     await update.message.reply_text("🛑 **Game ended** by admin. Thanks for playing!")
 
 
+async def botstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /botstats command (owners only) - outbound queue and game lock metrics"""
+    if not is_owner_or_co_owner(update.effective_user.id):
+        return
+    
+    stats_text = f"📈 **BOT STATS** 📈\n\n🎮 Active games: {len(game_manager.games)}\n"
+    
+    rate_limiter = context.bot.rate_limiter
+    if rate_limiter and hasattr(rate_limiter, 'stats'):
+        stats = rate_limiter.stats()
+        stats_text += (
+            f"\n📤 **Outbound Queue:**\n"
+            f"└─ Depth: {stats['depth']}\n"
+            f"└─ Sent: {stats['sent']} | Retries: {stats['retries']} | Failed: {stats['failures']}\n"
+            f"└─ Flood pause: {stats['paused']:.1f}s\n"
+        )
+        for name, latency in stats['latency'].items():
+            stats_text += f"└─ {name}: avg {latency['avg_ms']:.0f}ms, max {latency['max_ms']:.0f}ms ({latency['count']})\n"
+    
+    locks = game_manager.lock_stats.as_dict()
+    stats_text += (
+        f"\n🔒 **Game Locks:**\n"
+        f"└─ Acquired: {locks['acquired']} | Contended: {locks['contended']}\n"
+        f"└─ Wait: avg {locks['avg_wait_ms']:.0f}ms, max {locks['max_wait_ms']:.0f}ms\n"
+        f"└─ Held now: {sum(lock.locked() for lock in game_manager.locks.values())}\n"
+    )
+    
+    stats_text += (
+        f"\n🎮 **Lobby Edits:**\n"
+        f"└─ Changes: {lobby_edit_stats['requested']} | Edits: {lobby_edit_stats['sent']} | "
+        f"Unchanged: {lobby_edit_stats['unchanged']}\n"
+    )
+    
+    spectators = spectator_relay.stats
+    stats_text += (
+        f"\n👁 **Spectator Feed{' (digest)' if spectator_relay.digest else ''}:**\n"
+        f"└─ Sent: {spectators['sent']} | Failed: {spectators['failed']}\n"
+        f"└─ Blocked: {spectators['blocked']} | Dropped: {spectators['dropped']}\n"
+    )
+    
+    buttons = router.stats
+    stats_text += (
+        f"\n🔘 **Buttons:**\n"
+        f"└─ Handled: {buttons['routed']} | Duplicate: {buttons['duplicate']}\n"
+        f"└─ Stale: {buttons['stale']} | Unknown: {buttons['unknown']}\n"
+    )
+    
+    await update.message.reply_text(stats_text, parse_mode='Markdown')
+
+
 async def myrole_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /myrole command"""
     if update.effective_chat.type != 'private':
@@ -460,11 +579,7 @@ async def myrole_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
     user_id = update.effective_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
     
     if not user_game or not user_game.players[user_id].role:
         await update.message.reply_text("❌ You're not in any active game or roles haven't been assigned yet!")
@@ -494,8 +609,7 @@ async def myrole_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if player.has_potion:
         role_info += f"\n⚡ **YOU HAVE THE COSMIC POTION!**\nDeliver it to win the game!\n"
     
-    negative_roles = [Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER]
-    if player.role in negative_roles:
+    if player.role in SHADOW_ROLES:
         role_info += f"\n🔴 **ALIGNMENT: DARK SIDE**\n"
     else:
         role_info += f"\n🔵 **ALIGNMENT: LIGHT SIDE**\n"
@@ -514,11 +628,7 @@ async def inventory_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
     user_id = update.effective_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
     
     if not user_game:
         await update.message.reply_text("❌ You're not in any active game!")
@@ -573,11 +683,7 @@ async def shop_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
     user_id = update.effective_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
     
     if not user_game or user_game.phase == GamePhase.LOBBY:
         await update.message.reply_text("❌ Game hasn't started yet!")
@@ -618,8 +724,12 @@ async def spectate_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     user_id = update.effective_user.id
-    if user_id not in game.players and user_id not in game.spectators:
-        game.spectators.add(user_id)
+    async with game_manager.lock(chat_id):
+        added = user_id not in game.players and user_id not in game.spectators
+        if added:
+            game.add_spectator(user_id)
+    
+    if added:
         await update.message.reply_text("👀 You are now spectating the game! You'll receive major updates.")
     else:
         await update.message.reply_text("❌ You're already in the game or spectating!")
@@ -661,18 +771,13 @@ async def commands_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text(commands_text, parse_mode='Markdown')
 
-async def handle_upgrade_contribution(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+@router.on(UPGRADE)
+async def handle_upgrade_contribution(update: Update, context: ContextTypes.DEFAULT_TYPE, upgrade_key: str):
     """Handle a player contributing to a ship upgrade."""
     query = update.callback_query
-    upgrade_key = data.replace("upgrade_", "")
     user_id = query.from_user.id
 
-    # Logic to find the user's game
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
             
     if not user_game:
         await query.answer("You are not in an active game!", show_alert=True)
@@ -681,16 +786,17 @@ async def handle_upgrade_contribution(update: Update, context: ContextTypes.DEFA
     player = user_game.players[user_id]
     upgrade = SHIP_UPGRADES[upgrade_key]
     
-    if player.coins > 0:
+    async with game_manager.lock(user_game.chat_id):
         contribution = player.coins
-        user_game.upgrade_contribution[upgrade_key] += contribution
-        player.coins = 0
-        
+        if contribution > 0:
+            user_game.give_coins(player, -contribution)
+            total_contribution = user_game.contribute_upgrade(upgrade_key, contribution)
+            game_manager.save_game(user_game)
+    
+    if contribution > 0:
         await query.answer(f"You contributed {contribution} coins to {upgrade['name']}!", show_alert=True)
 
-        total_contribution = user_game.upgrade_contribution[upgrade_key]
         if total_contribution >= upgrade['cost']:
-            user_game.ship.add_upgrade(upgrade_key)
             await send_message_wrapper(
                 context, user_game.chat_id, 
                 f"✅ **UPGRADE INSTALLED:** {upgrade['name']}!",
@@ -716,17 +822,13 @@ async def handle_upgrade_contribution(update: Update, context: ContextTypes.DEFA
     else:
         await query.answer("You have no coins to contribute!", show_alert=True)
 
-async def handle_basic_attack_target(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+@router.on(ATTACK)
+async def handle_basic_attack_target(update: Update, context: ContextTypes.DEFAULT_TYPE, target_id: int):
     """Handle basic attack target"""
     query = update.callback_query
-    target_id = int(data.replace("basic_attack_", ""))
     user_id = query.from_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
     
     if not user_game:
         await query.answer("Game not found!", show_alert=True)
@@ -735,9 +837,10 @@ async def handle_basic_attack_target(update: Update, context: ContextTypes.DEFAU
     player = user_game.players[user_id]
     target = user_game.players[target_id]
     
-    player.pending_target = target_id
-    user_game.pending_actions[user_id] = "basic_attack"
-    player.basic_attack_used_today = True
+    async with game_manager.lock(user_game.chat_id):
+        player.pending_target = target_id
+        user_game.submit_action(user_id, "basic_attack")
+        user_game.set_player_stat(player, 'basic_attack_used_today', True)
     
     formatted = format_game_message(
         "Attack Queued",
@@ -755,44 +858,33 @@ async def handle_basic_attack_target(update: Update, context: ContextTypes.DEFAU
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle all button callbacks"""
     query = update.callback_query
+    route = await router.accept(update)
+    if route is None:
+        return
     await query.answer()
-    data = query.data
-
-    try:
-        if data == "join_game":
-            await handle_join_game(update, context)
-        elif data.startswith("basic_attack_"):  # NEW
-            await handle_basic_attack_target(update, context, data)
-        elif data.startswith("upgrade_"):
-            await handle_upgrade_contribution(update, context, data)
-        elif data == "leave_game":
-            await handle_leave_game(update, context)
-        elif data == "extend_lobby":
-            await handle_extend_lobby(update, context)
-        elif data == "show_rules":
-            await query.edit_message_text(
-                HELP_TEXTS["roles"] + "\n\n" + HELP_TEXTS["flow"],
-                parse_mode='Markdown',
-                reply_markup=create_help_keyboard()
-            )
-        elif data.startswith("action_"):
-            await handle_player_action(update, context, data)
-        elif data.startswith("help_"):
-            await handle_help_section(update, context, data)
-        elif data.startswith("buy_"):
-            await handle_shop_purchase(update, context, data)
-        elif data.startswith("vote_"):
-            await handle_voting(update, context, data)
-        elif data.startswith("target_"):
-            await handle_target_selection(update, context, data)
-        elif data.startswith("use_relic_"):
-            await handle_relic_usage(update, context, data)
-    except Exception as e:
-        logger.error(f"Error in button callback: {e}")
-        await query.answer("An error occurred.", show_alert=True)
- 
+    handler, args = route
+    # Handlers take the game's lock themselves, only around their changes
+    await router.dispatch(update, context, handler, args)
+
+    # The press may have been the last action or vote the day was waiting for
+    chat_id = _game_chat_id(update)
+    game = game_manager.get_game(chat_id) if chat_id is not None else None
+    if game:
+        async with game_manager.lock(chat_id):
+            hurry_stage(context, game)
+
+
+@router.on(RULES)
+async def handle_show_rules(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle rules button"""
+    await update.callback_query.edit_message_text(
+        HELP_TEXTS["roles"] + "\n\n" + HELP_TEXTS["flow"],
+        parse_mode='Markdown',
+        reply_markup=create_help_keyboard()
+    )
 
 
+@router.on(JOIN)
 async def handle_join_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle join game button"""
     query = update.callback_query
@@ -804,11 +896,22 @@ async def handle_join_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     user = query.from_user
-    if game.add_player(user.id, user.username or user.first_name):
+    async with game_manager.lock(chat_id):
+        other_game = game_manager.get_user_game(user.id)
+        elsewhere = other_game is not None and other_game is not game
+        joined = (not elsewhere and game.phase == GamePhase.LOBBY
+                  and game_manager.add_player(chat_id, user.id, user.username or user.first_name))
+        if joined:
+            update_lobby_message(context, game)
+            player = game.players[user.id]
+    
+    if elsewhere:
+        await query.answer("You're already playing in another chat!", show_alert=True)
+        return
+    
+    if joined:
         await context.bot.send_message(chat_id, f"✅ **{user.first_name}** joined the cosmic voyage!")
-        await update_lobby_message(context, game)
         
-        player = game.players[user.id]
         if player.is_first_time:
             try:
                 welcome_dm = (
@@ -825,6 +928,7 @@ async def handle_join_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer("Lobby is full or you've already joined!", show_alert=True)
 
 
+@router.on(LEAVE)
 async def handle_leave_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle leave game button"""
     query = update.callback_query
@@ -836,13 +940,18 @@ async def handle_leave_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     user = query.from_user
-    if game.remove_player(user.id):
+    async with game_manager.lock(chat_id):
+        left = game.phase == GamePhase.LOBBY and game_manager.remove_player(chat_id, user.id)
+        if left:
+            update_lobby_message(context, game)
+    
+    if left:
         await context.bot.send_message(chat_id, f"👋 **{user.first_name}** left the lobby.")
-        await update_lobby_message(context, game)
     else:
         await query.answer("You're not in the lobby!", show_alert=True)
 
 
+@router.on(EXTEND)
 async def handle_extend_lobby(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle lobby extension button"""
     query = update.callback_query
@@ -862,46 +971,65 @@ async def handle_extend_lobby(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.answer("Could not verify admin status!", show_alert=True)
         return
     
-    if game.lobby_extensions >= 2:
+    async with game_manager.lock(chat_id):
+        still_open = game_manager.get_game(chat_id) is game and game.phase == GamePhase.LOBBY
+        extended = still_open and game.lobby_extensions < 2
+        if extended:
+            game.lobby_extensions += 1
+            game_manager.save_game(game)
+            update_lobby_message(context, game)
+            
+            # Push the running deadline (and the reminder, if still due) back rather than restarting it
+            for name, callback in (('lobby', lobby_timer_callback), ('reminder', lobby_reminder_callback)):
+                timer = game.timers.get(name)
+                if timer and timer.active:
+                    remaining = timer.deadline - timer_wheel.clock()
+                    set_game_timer(context.application, game, name, remaining + 60, callback)
+    
+    if not still_open:
+        await query.answer("No active lobby found!", show_alert=True)
+    elif not extended:
         await query.answer("Maximum extensions reached! (2 extensions allowed)", show_alert=True)
-        return
-    
-    game.lobby_extensions += 1
-    await query.answer("⏰ Lobby timer extended by 60 seconds!")
-    
-    for job in context.job_queue.get_jobs_by_name(f'lobby_{chat_id}'):
-        job.schedule_removal()
-    
-    context.job_queue.run_once(lobby_timer_callback, 60, 
-                              data={'chat_id': chat_id}, name=f'lobby_{chat_id}')
+    else:
+        await query.answer("⏰ Lobby timer extended by 60 seconds!")
 
 
 # handlers.py - FIND handle_player_action AND ADD THIS FEEDBACK
 
-async def handle_player_action(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str):
+@router.on(ACTION)
+async def handle_player_action(update: Update, context: ContextTypes.DEFAULT_TYPE, action_type: str):
     """Handle player action selection"""
     query = update.callback_query
     user_id = query.from_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
     
     if not user_game:
         await query.answer("You're not in any active game!", show_alert=True)
         return
     
     player = user_game.players[user_id]
-    action_type = action.replace("action_", "")
-    user_game.pending_actions[user_id] = action_type
+    
+    # Targeted actions only count as submitted once the target is picked,
+    # otherwise the day could close between the two clicks.
+    needs_target = (
+        action_type == "basic_attack" or
+        (action_type == "heal" and player.role == Role.HEALER) or
+        (action_type == "block" and player.role == Role.SHADOW_SABOTEUR) or
+        (action_type in ["frame_job", "false_intel"] and player.role == Role.BETRAYER)
+    )
+    async with game_manager.lock(user_game.chat_id):
+        user_game.submit_action(user_id, action_type, awaiting_target=needs_target)
+        if action_type == "basic_attack":
+            villain_targets = user_game.get_living_faction(shadow=True)
+            if not villain_targets:
+                user_game.submit_action(user_id, action_type)
+        elif not needs_target and action_type not in ("premium_weapon", "use_relic"):
+            # Apply immediate effects
+            user_game.apply_immediate_action(player, action_type)
     
 # BASIC ATTACK - Show villain targets
     if action_type == "basic_attack":
-        negative_roles = [Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER]
-        villain_targets = [p for p in user_game.get_living_players() if p.role in negative_roles]
-        
         if not villain_targets:
             await query.edit_message_text("❌ No villains available to attack!")
             return
@@ -909,7 +1037,7 @@ async def handle_player_action(update: Update, context: ContextTypes.DEFAULT_TYP
         keyboard = []
         for villain in villain_targets:
             keyboard.append([
-                InlineKeyboardButton(f"{villain.username}", callback_data=f"basic_attack_{villain.user_id}")
+                InlineKeyboardButton(f"{villain.username}", callback_data=ATTACK.data(villain.user_id, game=user_game))
             ])
         
         await query.edit_message_text(
@@ -929,7 +1057,7 @@ async def handle_player_action(update: Update, context: ContextTypes.DEFAULT_TYP
     if action_type == "use_relic":
         await query.edit_message_text(
             "💎 **Choose a relic to use:**",
-            reply_markup=create_relic_keyboard(player)
+            reply_markup=create_relic_keyboard(player, user_game)
         )
         return
     
@@ -977,37 +1105,25 @@ async def handle_player_action(update: Update, context: ContextTypes.DEFAULT_TYP
         ("✅", "Action Recorded", "Your action is queued!", "info")
     )
     
-    # Apply immediate effects
-    if action_type == "dodge":
-        player.has_dodge = True
-    elif action_type == "boost_allies" and player.role == Role.EPIC_MONSTER:
-        user_game.villain_boost_active = True
-    elif action_type == "boost" and player.role == Role.DEVIL_HUNTER:
-        user_game.devil_hunter_boost_used = True
-    
     formatted = format_game_message(title, message, emoji, style)
     await query.edit_message_text(formatted, parse_mode='Markdown')
 
 
-async def handle_help_section(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+@router.on(HELP)
+async def handle_help_section(update: Update, context: ContextTypes.DEFAULT_TYPE, section: str):
     """Handle help section selection"""
     query = update.callback_query
-    section = data.replace("help_", "")
     text = HELP_TEXTS.get(section, "Information not available.")
     await query.edit_message_text(text, parse_mode='Markdown', reply_markup=create_help_keyboard())
 
 
-async def handle_shop_purchase(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+@router.on(BUY)
+async def handle_shop_purchase(update: Update, context: ContextTypes.DEFAULT_TYPE, item_key: str):
     """Handle shop item purchase"""
     query = update.callback_query
-    item_key = data.replace("buy_", "").replace("_", " ")
     user_id = query.from_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
     
     if not user_game:
         await query.answer("You're not in any active game!", show_alert=True)
@@ -1020,41 +1136,46 @@ async def handle_shop_purchase(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.answer("Invalid item!", show_alert=True)
         return
     
-    if player.coins >= item["cost"]:
-        player.coins -= item["cost"]
-        
-        if item["effect"] == "heal":
-            player.heal(item["value"])
-            message = f"Restored {item['value']} HP!"
-        elif item["effect"] == "shield":
-            player.shields += 1
-            message = "Shield activated!"
-        elif item["effect"] == "reveal":
-            other_players = [p for p in user_game.players.values() if p.user_id != user_id and p.role]
-            if other_players:
-                target = random.choice(other_players)
-                message = f"Vision revealed: {target.username} is {target.role.value}"
-            else:
-                message = "No other players to reveal!"
-        
+    async with game_manager.lock(user_game.chat_id):
+        affordable = player.coins >= item["cost"]
+        if affordable:
+            user_game.give_coins(player, -item["cost"])
+            
+            if item["effect"] == "heal":
+                user_game.heal_player(player, item["value"])
+                message = f"Restored {item['value']} HP!"
+            elif item["effect"] == "shield":
+                user_game.give_shields(player, 1)
+                message = "Shield activated!"
+            elif item["effect"] == "reveal":
+                other_players = [p for p in user_game.players.values() if p.user_id != user_id and p.role]
+                if other_players:
+                    target = user_game.rng.choice(other_players)
+                    message = f"Vision revealed: {target.username} is {target.role.value}"
+                else:
+                    message = "No other players to reveal!"
+            
+            game_manager.save_game(user_game)
+    
+    if affordable:
         await query.answer(f"Purchased {item_key}! {message}")
     else:
         await query.answer("Not enough coins!", show_alert=True)
 
 
-async def handle_voting(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+@router.on(VOTE)
+async def handle_voting(update: Update, context: ContextTypes.DEFAULT_TYPE, target_id: int):
     """Handle vote submission"""
     query = update.callback_query
-    target_id = int(data.replace("vote_", ""))
     user_id = query.from_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
+    voted = False
+    if user_game:
+        async with game_manager.lock(user_game.chat_id):
+            voted = user_game.process_vote(user_id, target_id)
     
-    if user_game and user_game.process_vote(user_id, target_id):
+    if voted:
         target_name = user_game.players[target_id].username
         await query.answer(f"Voted for {target_name}!")
         await query.edit_message_text(f"✅ Your Vote has been cast for {target_name}/nThank You ")
@@ -1062,27 +1183,25 @@ async def handle_voting(update: Update, context: ContextTypes.DEFAULT_TYPE, data
         await query.answer("You cannot vote right now!", show_alert=True)
 
 
-async def handle_target_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+@router.on(TARGET)
+async def handle_target_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, target_id: int):
     """Handle target selection for abilities"""
     query = update.callback_query
-    target_id = int(data.replace("target_", ""))
     user_id = query.from_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
     
     if not user_game:
         await query.answer("Game not found!", show_alert=True)
         return
     
     player = user_game.players[user_id]
-    player.pending_target = target_id
-    
     target_player = user_game.players[target_id]
-    action = user_game.pending_actions.get(user_id)
+    async with game_manager.lock(user_game.chat_id):
+        player.pending_target = target_id
+        action = user_game.pending_actions.get(user_id)
+        if action:
+            user_game.submit_action(user_id, action)
     
     if action == "heal":
         await query.edit_message_text(f"🩹  Heal for {target_player.username} recorded!")
@@ -1114,37 +1233,38 @@ async def upgrades_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text(upgrade_text, parse_mode='Markdown', reply_markup=create_upgrades_keyboard(game))
 
-async def handle_relic_usage(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
+@router.on(RELIC)
+async def handle_relic_usage(update: Update, context: ContextTypes.DEFAULT_TYPE, relic_name: str):
     """Handle relic usage"""
     query = update.callback_query
-    relic_name = data.replace("use_relic_", "")
     user_id = query.from_user.id
     
-    user_game = None
-    for game in game_manager.games.values():
-        if user_id in game.players:
-            user_game = game
-            break
+    user_game = game_manager.get_user_game(user_id)
     
     if not user_game:
         await query.answer("Game not found!", show_alert=True)
         return
     
     player = user_game.players[user_id]
+    effect = RELIC_EFFECTS[relic_name]
     
-    if relic_name in player.relics:
-        effect = RELIC_EFFECTS[relic_name]
-        if effect["type"] == "one_time":
+    async with game_manager.lock(user_game.chat_id):
+        owned = relic_name in player.relics
+        used = owned and effect["type"] == "one_time"
+        if used:
             if effect["effect"] == "heal":
-                player.heal(effect["value"])
+                user_game.heal_player(player, effect["value"])
                 message = f"Restored {effect['value']} HP!"
             elif effect["effect"] == "coins":
-                player.coins += effect["value"]
+                user_game.give_coins(player, effect["value"])
                 message = f"Gained {effect['value']} coins!"
             
-            player.relics.remove(relic_name)
-            await query.edit_message_text(f"💎 Used {relic_name}!\n{message}")
-        else:
-            await query.answer("This relic is passive and doesn't need activation!", show_alert=True)
+            user_game.consume_relic(player, relic_name)
+            game_manager.save_game(user_game)
+    
+    if used:
+        await query.edit_message_text(f"💎 Used {relic_name}!\n{message}")
+    elif owned:
+        await query.answer("This relic is passive and doesn't need activation!", show_alert=True)
     else:
         await query.answer("You don't have this relic!", show_alert=True)
\ No newline at end of file
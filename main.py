@@ -1,16 +1,26 @@
 import logging
 import asyncio
+from typing import Optional
 from telegram import Update
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from telegram.ext import (
+    Application, BaseRateLimiter, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+)
 
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN, BASE_LOBBY_TIMER, GamePhase, BOT_MODE, SHARD_WORKERS, UPDATE_CONCURRENCY,
+    WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+)
+from context import game_manager, timer_wheel
+from game_logic import resume_game_callback
 from handlers import (
     start_command, help_command, newgame_command, join_command,
     leave_command, status_command, players_command, startvoyage_command,
     endgame_command, myrole_command, inventory_command, tutorial_command,
     shop_command, spectate_command, button_callback, added_to_group,
-    upgrades_command, commands_command # ADD THIS LINE
+    upgrades_command, commands_command, botstats_command, lobby_timer_callback
 )
+from outbox import OutboundQueue
+from utils import set_game_timer
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -19,15 +29,52 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Start the bot"""
-    if not BOT_TOKEN or BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-        logger.error("Bot token not configured!")
-        return
-
-    application = Application.builder().token(BOT_TOKEN).connect_timeout(30).read_timeout(30).build()
-
-    # Add handlers
+def rearm_restored_games(application: Application, owns=None):
+    """Reload snapshotted games (those ``owns`` accepts) and re-arm their lobby/day timers"""
+    restored = game_manager.restore_games(owns)
+    for game in restored:
+        if game.phase == GamePhase.LOBBY:
+            set_game_timer(application, game, 'lobby', BASE_LOBBY_TIMER, lobby_timer_callback)
+        else:
+            set_game_timer(application, game, 'day', 5, resume_game_callback)
+    if restored:
+        logger.info(f"Restored {len(restored)} game(s) from snapshots")
+
+
+async def start_webhook(application: Application):
+    """Serve updates over a webhook instead of long polling"""
+    from webhook import WebhookServer, make_secret_token
+
+    secret = WEBHOOK_SECRET or make_secret_token()
+    server = WebhookServer(application, secret, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH)
+    await server.start()
+    await application.bot.set_webhook(
+        WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+        secret_token=secret,
+        allowed_updates=Update.ALL_TYPES,
+    )
+    logger.info(f"Receiving updates by webhook at {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+    return server
+
+
+def build_application(rate_limiter: Optional[BaseRateLimiter] = None,
+                      updater: bool = True) -> Application:
+    """The bot's Application; shard workers build theirs without an updater"""
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .connect_timeout(30)
+        .read_timeout(30)
+        .rate_limiter(rate_limiter or OutboundQueue())
+        .concurrent_updates(UPDATE_CONCURRENCY)
+    )
+    if not updater:
+        builder = builder.updater(None)
+    return builder.build()
+
+
+def register_handlers(application: Application):
+    """Add the game's command, button and membership handlers"""
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("commands", commands_command)) 
@@ -44,26 +91,69 @@ async def main():
     application.add_handler(CommandHandler("spectate", spectate_command))
     application.add_handler(CommandHandler("startvoyage", startvoyage_command))
     application.add_handler(CommandHandler("endgame", endgame_command))
+    application.add_handler(CommandHandler("botstats", botstats_command))
     application.add_handler(CallbackQueryHandler(button_callback))
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, added_to_group))
 
+
+async def main():
+    """Start the bot"""
+    if not BOT_TOKEN or BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
+        logger.error("Bot token not configured!")
+        return
+    # Checked before startup: a SystemExit raised inside the run loop below
+    # would be taken for a normal shutdown
+    if BOT_MODE == "webhook" and not WEBHOOK_URL:
+        logger.error("BOT_MODE=webhook needs WEBHOOK_URL (the public HTTPS base URL)")
+        raise SystemExit(1)
+
+    application = build_application()
+
+    # Sharded, this process only receives updates and forwards them to the
+    # game workers (see sharding.py); otherwise it runs every game itself
+    router = None
+    if SHARD_WORKERS > 1:
+        from sharding import ShardRouter
+        router = ShardRouter(SHARD_WORKERS)
+        router.start()
+        router.install(application)
+    else:
+        register_handlers(application)
+
     logger.info("Cosmic Voyage Bot is running...")
 
+    webhook_server = None
+
     # Initialize and run
     try:
         await application.initialize()
-        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        if BOT_MODE == "webhook":
+            webhook_server = await start_webhook(application)
+        else:
+            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
         await application.start()
+        if router:
+            router.watch_index()
+        else:
+            timer_wheel.start()
+            rearm_restored_games(application)
         logger.info("Bot started successfully!")
         await asyncio.Event().wait()
     except (KeyboardInterrupt, SystemExit):
         logger.info("Bot stopping...")
     finally:
+        await timer_wheel.stop()
+        if webhook_server:
+            await webhook_server.stop()
         if application.updater.running:
             await application.updater.stop()
         if application.running:
             await application.stop()
         await application.shutdown()
+        if router:
+            router.stop()
+        if game_manager.store:
+            game_manager.store.close()
         logger.info("Bot stopped.")
 
 
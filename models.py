@@ -1,17 +1,24 @@
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Tuple
+from collections import deque
+from dataclasses import MISSING, dataclass, field, fields
+from datetime import datetime
+from typing import AbstractSet, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+import asyncio
 import random
+import secrets
+import time
 
 from config import (
     Role, GamePhase, INITIAL_PLAYER_HP, INITIAL_SHIP_HP,
     RELIC_EFFECTS, MIN_PLAYERS, MAX_PLAYERS, TOTAL_DAYS, SECRET_OBJECTIVES,
-    SHIP_UPGRADES
+    OBJECTIVES_BY_ID, SHIP_UPGRADES, SHADOW_ROLES, RECENT_MESSAGE_WINDOW, RECENT_MESSAGE_CAP
 )
+from timers import Timer
 
 # models.py - Player class
 
-@dataclass
+# Slotted, and the per-player containers default to shared immutable empties
+# (replaced on first write) so idle players cost as little memory as possible.
+@dataclass(slots=True)
 class Player:
     user_id: int
     username: str
@@ -20,7 +27,7 @@ class Player:
     collateral_damage: int = 0
     collateral_day: int = 0
     has_dodge: bool = False
-    relics: List[str] = field(default_factory=list)
+    relics: Sequence[str] = ()
     is_alive: bool = True
     has_potion: bool = False
     action_blocked: bool = False
@@ -34,35 +41,56 @@ class Player:
     objective_completed: bool = False
     frame_job_uses: int = 1
     false_intel_uses: int = 1
-    healed_targets: Set[int] = field(default_factory=set)
-    weapons: Dict[str, int] = field(default_factory=dict)
+    healed_targets: AbstractSet[int] = frozenset()
+    weapons: Optional[Dict[str, int]] = None
     basic_attack_used_today: bool = False  # NEW: Track daily basic attack
+    selected_weapon: Optional[str] = None  # premium weapon chosen for today's weapon_attack
+    # Passive relic modifiers, kept in step with ``relics`` by add_relic/remove_relic
+    damage_reduction: int = field(default=0, init=False)
+    dodge_bonus: float = field(default=0.0, init=False)
+    damage_bonus: int = field(default=0, init=False)
 
-    def take_damage(self, amount: int, is_collateral: bool = False, current_day: int = 0):
-        """Apply damage to player with reductions and dodge chances"""
-        reduction = 0
-        dodge_chance = 0.5 if self.has_dodge else 0
-        
-        # Apply relic effects
+    def __post_init__(self):
         for relic in self.relics:
-            if relic in RELIC_EFFECTS and RELIC_EFFECTS[relic]["type"] == "passive":
-                if RELIC_EFFECTS[relic]["effect"] == "damage_reduction":
-                    reduction += RELIC_EFFECTS[relic]["value"]
-                elif RELIC_EFFECTS[relic]["effect"] == "dodge_bonus":
-                    dodge_chance += RELIC_EFFECTS[relic]["value"]
+            self._apply_relic(relic, 1)
+
+    def _apply_relic(self, relic: str, sign: int):
+        effect = RELIC_EFFECTS.get(relic)
+        if effect and effect["type"] == "passive" and effect["effect"] in ("damage_reduction", "dodge_bonus", "damage_bonus"):
+            setattr(self, effect["effect"], getattr(self, effect["effect"]) + sign * effect["value"])
+
+    def add_relic(self, relic: str):
+        self.relics = [*self.relics, relic]
+        self._apply_relic(relic, 1)
+
+    def remove_relic(self, relic: str):
+        relics = list(self.relics)
+        relics.remove(relic)
+        self.relics = relics
+        self._apply_relic(relic, -1)
+
+    def take_damage(self, amount: int, is_collateral: bool = False, current_day: int = 0,
+                    rng: random.Random = random) -> int:
+        """Apply damage to player with reductions and dodge chances; returns the damage dealt"""
+        dodge_chance = (0.5 if self.has_dodge else 0) + self.dodge_bonus
         
         # Apply shield
         if self.shields > 0:
             amount = int(amount * 0.6)
             self.shields -= 1
         
-        # Apply damage reduction
-        amount -= reduction
+        # Apply relic damage reduction
+        amount -= self.damage_reduction
         
         # Apply dodge chance
-        if random.random() < dodge_chance:
+        if rng.random() < dodge_chance:
             amount = amount // 2  # FIXED: Added the divisor
         
+        self.apply_damage(amount, is_collateral, current_day)
+        return amount
+
+    def apply_damage(self, amount: int, is_collateral: bool = False, current_day: int = 0):
+        """Apply already-reduced damage (shared by take_damage and event replay)"""
         self.hp -= max(0, amount)
         
         if is_collateral:
@@ -79,20 +107,55 @@ class Player:
             heal_collateral = min(amount, self.collateral_damage)
             self.collateral_damage -= heal_collateral
 
+    def to_dict(self) -> Dict:
+        """Compact JSON-safe snapshot of the player (fields at their default are omitted)"""
+        data = {}
+        for f in fields(self):
+            if not f.init:
+                continue  # derived from other fields
+            value = getattr(self, f.name)
+            if isinstance(value, (list, tuple, set, frozenset, dict)):
+                if value:  # empty containers are omitted like defaults
+                    data[f.name] = value
+            elif f.default is MISSING or value != f.default:
+                data[f.name] = value
+        if self.role:
+            data['role'] = self.role.name
+        if self.relics:
+            data['relics'] = list(self.relics)
+        if self.healed_targets:
+            data['healed_targets'] = sorted(self.healed_targets)
+        if self.secret_objective:
+            data['secret_objective'] = self.secret_objective.get('id', self.secret_objective)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Player':
+        data = dict(data)
+        if data.get('role'):
+            data['role'] = Role[data['role']]
+        if 'healed_targets' in data:
+            data['healed_targets'] = set(data['healed_targets'])
+        if data.get('secret_objective'):
+            data['secret_objective'] = OBJECTIVES_BY_ID[data['secret_objective']]
+        known = {f.name for f in fields(cls) if f.init}
+        return cls(**{k: v for k, v in data.items() if k in known})
 
-@dataclass
+
+@dataclass(slots=True)
 class Ship:
     hp: int = INITIAL_SHIP_HP
     max_hp: int = INITIAL_SHIP_HP
     upgrades: Set[str] = field(default_factory=set)
     damage_reduction: float = 0.0
 
-    def take_damage(self, amount: int):
-        """Apply damage to ship, considering upgrades"""
+    def take_damage(self, amount: int) -> int:
+        """Apply damage to ship, considering upgrades; returns the damage dealt"""
         final_amount = int(amount * (1 - self.damage_reduction))
         self.hp -= final_amount
         if self.hp < 0:
             self.hp = 0
+        return final_amount
 
     def repair(self, amount: int):
         """Repair ship up to max HP"""
@@ -104,12 +167,50 @@ class Ship:
         if upgrade_key == "reinforced_hull":
             self.damage_reduction = 0.05  # FIXED: Changed from 0.5 to 0.05
 
+    def to_dict(self) -> Dict:
+        """JSON-safe snapshot of the ship"""
+        return {'hp': self.hp, 'max_hp': self.max_hp,
+                'upgrades': sorted(self.upgrades), 'damage_reduction': self.damage_reduction}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Ship':
+        return cls(hp=data['hp'], max_hp=data['max_hp'],
+                   upgrades=set(data.get('upgrades', ())),
+                   damage_reduction=data.get('damage_reduction', 0.0))
+
 class CosmicVoyage:
     """Main game state class"""
+
+    __slots__ = (
+        'chat_id', 'seed', 'token', 'rng', 'event_log', 'event_log_flushed', 'players',
+        'living', 'living_light', 'living_shadow', 'ship',
+        'phase', 'current_day', 'lobby_message_id', 'lobby_extensions', 'monster_revealed',
+        'betrayer_caught', 'potion_delivered', 'betrayer_id', 'monster_id', 'pending_actions',
+        'game_start_time', 'recent_messages', 'spectators', 'votes', 'voted', 'captain_id',
+        'lobby_reminder_sent', 'devil_hunter_boost_used', 'villain_boost_active',
+        'shadow_saboteur_uses', 'active_random_event', 'upgrade_contribution',
+        'awaiting_target', 'stage', 'stage_deadline', 'status_image_cache', 'timers',
+        'lobby_caption',
+    )
     
-    def __init__(self, chat_id: int):
+    def __init__(self, chat_id: int, seed: Optional[int] = None, token: Optional[int] = None):
         self.chat_id = chat_id
+        # All game randomness draws from this RNG so a game is reproducible from its seed
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        # Public id of the game, carried by its buttons (callbacks.game_token).
+        # Drawn independently of the seed, which must stay secret: anyone who
+        # knows it can replay the role shuffle.
+        self.token = token if token is not None else secrets.randbits(40)
+        # Append-only structured record of everything that changed state (see eventlog.py)
+        self.event_log: List[list] = [["seed", 0, self.seed, self.token]]
+        self.event_log_flushed = 0
         self.players: Dict[int, Player] = {}
+        # Living players, overall and split by faction, in join order. Kept in
+        # step by _refile() wherever is_alive or a role changes.
+        self.living: Dict[int, Player] = {}
+        self.living_light: Dict[int, Player] = {}
+        self.living_shadow: Dict[int, Player] = {}
         self.ship = Ship()
         self.phase = GamePhase.LOBBY
         self.current_day = 0
@@ -122,7 +223,8 @@ class CosmicVoyage:
         self.monster_id: Optional[int] = None
         self.pending_actions: Dict[int, str] = {}
         self.game_start_time: Optional[datetime] = None
-        self.recent_messages: List[Tuple[datetime, int]] = []
+        # (monotonic time, message id) of bot messages in the group, oldest first
+        self.recent_messages: Deque[Tuple[float, int]] = deque(maxlen=RECENT_MESSAGE_CAP)
         self.spectators: Set[int] = set()
         self.votes: Dict[int, int] = {}
         self.voted: Set[int] = set()
@@ -133,6 +235,67 @@ class CosmicVoyage:
         self.shadow_saboteur_uses = 0
         self.active_random_event: Optional[Dict] = None
         self.upgrade_contribution: Dict[str, int] = {key: 0 for key in SHIP_UPGRADES}
+        self.awaiting_target: Set[int] = set()
+        # Step of the day loop the next scheduled job picks up (see game_logic),
+        # and the wall-clock deadline of the actions/voting window
+        self.stage: Optional[str] = None
+        self.stage_deadline: Optional[float] = None
+        # (status_image_key, png bytes, Telegram file_id) of the last status image
+        self.status_image_cache: Optional[Tuple[tuple, bytes, Optional[str]]] = None
+        # Pending deadlines on the timer wheel by name ('lobby', 'reminder', 'day'),
+        # so rescheduling and cancelling go straight to the handle
+        self.timers: Dict[str, Timer] = {}
+        # Caption last sent to the lobby message, so unchanged lobbies skip the edit
+        self.lobby_caption: Optional[str] = None
+
+    # Plain attributes copied as-is by to_dict/from_dict
+    _SNAPSHOT_FIELDS = (
+        'current_day', 'lobby_message_id', 'lobby_extensions', 'monster_revealed',
+        'betrayer_caught', 'potion_delivered', 'betrayer_id', 'monster_id',
+        'captain_id', 'lobby_reminder_sent', 'devil_hunter_boost_used',
+        'villain_boost_active', 'shadow_saboteur_uses', 'active_random_event',
+        'upgrade_contribution', 'stage', 'stage_deadline',
+    )
+
+    def to_dict(self) -> Dict:
+        """JSON-safe snapshot of the game, used for persistence across restarts.
+
+        Sets are written sorted, so equal games give equal snapshots.
+        """
+        data = {name: getattr(self, name) for name in self._SNAPSHOT_FIELDS}
+        data.update({
+            'chat_id': self.chat_id,
+            'seed': self.seed,
+            'token': self.token,
+            'phase': self.phase.value,
+            'players': [p.to_dict() for p in self.players.values()],
+            'ship': self.ship.to_dict(),
+            'pending_actions': list(self.pending_actions.items()),
+            'game_start_time': self.game_start_time.isoformat() if self.game_start_time else None,
+            'spectators': sorted(self.spectators),
+            'votes': list(self.votes.items()),
+            'voted': sorted(self.voted),
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CosmicVoyage':
+        game = cls(data['chat_id'], seed=data.get('seed'), token=data.get('token'))
+        game.event_log_flushed = len(game.event_log)
+        for name in cls._SNAPSHOT_FIELDS:
+            if name in data:
+                setattr(game, name, data[name])
+        game.phase = GamePhase(data['phase'])
+        game.players = {p['user_id']: Player.from_dict(p) for p in data['players']}
+        game._rebuild_living()
+        game.ship = Ship.from_dict(data['ship'])
+        game.pending_actions = dict(data.get('pending_actions', ()))
+        if data.get('game_start_time'):
+            game.game_start_time = datetime.fromisoformat(data['game_start_time'])
+        game.spectators = set(data.get('spectators', ()))
+        game.votes = dict(data.get('votes', ()))
+        game.voted = set(data.get('voted', ()))
+        return game
 
     def add_player(self, user_id: int, username: str) -> bool:
         """Add a player to the game"""
@@ -140,18 +303,22 @@ class CosmicVoyage:
             return False
         if user_id not in self.players:
             self.players[user_id] = Player(user_id, username)
+            self._refile(self.players[user_id])
+            self.log_event("join", user_id, username)
             return True
         return False
 
     def remove_player(self, user_id: int) -> bool:
         """Remove a player from the game"""
         if user_id in self.players:
-            del self.players[user_id]
+            self._refile(self.players.pop(user_id))
+            self.log_event("leave", user_id)
             return True
         return False
     
     def assign_secret_objectives(self):
         """Assign a secret objective to each player."""
+        self.log_event("objectives")
         for player in self.players.values():
             if player.role in SECRET_OBJECTIVES:
                 player.secret_objective = SECRET_OBJECTIVES[player.role]
@@ -165,7 +332,7 @@ class CosmicVoyage:
             return
 
         player_list = list(self.players.values())
-        random.shuffle(player_list)
+        self.rng.shuffle(player_list)
     
         # Better role distribution
         if player_count == 4:
@@ -245,14 +412,20 @@ class CosmicVoyage:
             while len(roles_to_assign) < player_count:
                 roles_to_assign.append(Role.CREW_MEMBER)
 
-        random.shuffle(roles_to_assign)
+        self.rng.shuffle(roles_to_assign)
+        self.apply_roles([(player.user_id, roles_to_assign[i].name) for i, player in enumerate(player_list)])
+
+    def apply_roles(self, assignments: List[Tuple[int, str]]):
+        """Give each (user_id, Role name) its role and set up role-derived state"""
+        self.log_event("roles", assignments)
     
         # Track betrayers
         betrayer_count = 0
 
         # Assign to players
-        for i, player in enumerate(player_list):
-            player.role = roles_to_assign[i]
+        for user_id, role_name in assignments:
+            player = self.players[user_id]
+            player.role = Role[role_name]
             if player.role == Role.BETRAYER:
                 if betrayer_count == 0:
                     self.betrayer_id = player.user_id
@@ -261,19 +434,43 @@ class CosmicVoyage:
             if player.role == Role.CAPTAIN:
                 player.rally_uses = 1
                 self.captain_id = player.user_id
+        self._rebuild_living()
+
+    def _refile(self, player: Player):
+        """Update the living/faction views after a player's is_alive or role changed"""
+        uid = player.user_id
+        if not player.is_alive or self.players.get(uid) is not player:
+            self.living.pop(uid, None)
+            self.living_light.pop(uid, None)
+            self.living_shadow.pop(uid, None)
+            return
+        self.living.setdefault(uid, player)
+        if player.role in SHADOW_ROLES:
+            self.living_light.pop(uid, None)
+            self.living_shadow.setdefault(uid, player)
+        else:
+            self.living_shadow.pop(uid, None)
+            self.living_light.setdefault(uid, player)
+
+    def _rebuild_living(self):
+        self.living.clear()
+        self.living_light.clear()
+        self.living_shadow.clear()
+        for player in self.players.values():
+            self._refile(player)
 
     def get_living_players(self) -> List[Player]:
         """Get all living players"""
-        return [p for p in self.players.values() if p.is_alive]
+        return list(self.living.values())
+
+    def get_living_faction(self, shadow: bool) -> List[Player]:
+        """Living players of the shadow side, or of the light side"""
+        return list((self.living_shadow if shadow else self.living_light).values())
 
     def check_win_condition(self) -> Optional[str]:
         """Check win conditions"""
-        living = self.get_living_players()
-        
-        negative_roles = [Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER]
-        
-        angels_alive = [p for p in living if p.role not in negative_roles]
-        demons_alive = [p for p in living if p.role in negative_roles]
+        angels_alive = len(self.living_light)
+        demons_alive = len(self.living_shadow)
         
         # Don't check win conditions before game starts
         if self.current_day < 1:
@@ -297,12 +494,66 @@ class CosmicVoyage:
         
         return None
 
+    def apply_immediate_action(self, player: Player, action: str):
+        """Effects that take hold as soon as an action is chosen, not at day's end"""
+        if action == "dodge":
+            self.set_player_stat(player, 'has_dodge', True)
+        elif action == "boost_allies" and player.role == Role.EPIC_MONSTER:
+            self.set_flag('villain_boost_active', True)
+        elif action == "boost" and player.role == Role.DEVIL_HUNTER:
+            self.set_flag('devil_hunter_boost_used', True)
+
+    def begin_action_collection(self):
+        """Reset pending actions for a new day"""
+        self.log_event("collect")
+        self.pending_actions.clear()
+        self.awaiting_target.clear()
+
+    def submit_action(self, user_id: int, action: str, awaiting_target: bool = False):
+        """Record a player's action.
+
+        Actions still waiting for a target selection don't count towards
+        actions_complete.
+        """
+        self.pending_actions[user_id] = action
+        if not awaiting_target:
+            player = self.players.get(user_id)
+            self.log_event("action", user_id, action, player.pending_target if player else None)
+        if awaiting_target:
+            self.awaiting_target.add(user_id)
+            return
+        self.awaiting_target.discard(user_id)
+
+    @property
+    def actions_complete(self) -> bool:
+        """Every living player has acted (targets included)"""
+        return not self.awaiting_target and len(self.pending_actions) >= len(self.living)
+
+    @property
+    def votes_complete(self) -> bool:
+        """Every living player has voted"""
+        return len(self.voted) >= len(self.living)
+
+    def set_stage(self, stage: Optional[str], deadline: Optional[float] = None):
+        """Record the day loop's next step so a restarted bot resumes there"""
+        self.log_event("stage", stage, deadline)
+        self.stage = stage
+        self.stage_deadline = deadline
+
     def add_message(self, message_id: int):
         """Track recent messages for cleanup"""
-        now = datetime.now()
-        self.recent_messages.append((now, message_id))
-        self.recent_messages = [(ts, mid) for ts, mid in self.recent_messages 
-                                if now - ts < timedelta(minutes=15)]
+        now = time.monotonic()
+        recent = self.recent_messages
+        recent.append((now, message_id))  # maxlen drops the oldest past the cap
+        while now - recent[0][0] >= RECENT_MESSAGE_WINDOW:
+            recent.popleft()
+
+    def take_recent_messages(self) -> List[int]:
+        """Hand over the tracked message ids for deletion and stop tracking them"""
+        cutoff = time.monotonic() - RECENT_MESSAGE_WINDOW
+        message_ids = [mid for ts, mid in self.recent_messages if ts > cutoff]
+        self.recent_messages.clear()
+        return message_ids
 
     def apply_captain_damage_reduction(self, amount: int) -> int:
         """Apply captain's 10% damage reduction if alive"""
@@ -310,14 +561,152 @@ class CosmicVoyage:
                         if p.role == Role.CAPTAIN and p.is_alive), None)
         return int(amount * 0.9) if captain else amount  # FIXED: Changed from 0.8
 
-    def earn_coins(self):
+    def earn_coins(self, amount: int = 10):
         """Give coins to all living players"""
+        self.log_event("income", amount)
         for player in self.get_living_players():
-            player.coins += 10
+            player.coins += amount
+
+    # --- Recorded state changes -------------------------------------------
+    # Everything that mutates a running game goes through log_event so that
+    # eventlog.replay() can rebuild it. Random outcomes are recorded, not
+    # re-rolled, so replay never depends on RNG call order.
+
+    def log_event(self, kind: str, *fields):
+        """Append a compact ``[kind, day, *fields]`` record to the event log"""
+        self.event_log.append([kind, self.current_day, *fields])
+
+    def launch(self, ship_max_hp: int, ship_hp: int, started: Optional[datetime] = None):
+        """Leave the lobby: size the ship, note the start time and begin day 1"""
+        self.ship.max_hp = ship_max_hp
+        self.ship.hp = ship_hp
+        self.current_day = 1
+        self.phase = GamePhase.HEALING
+        self.game_start_time = started or datetime.now()
+        self.log_event("launch", ship_max_hp, ship_hp, self.game_start_time.isoformat())
+
+    def start_day(self, phase: GamePhase):
+        self.phase = phase
+        self.log_event("day", phase.value)
+
+    def end_day(self):
+        """Clear per-day player and game state once the day's actions resolved"""
+        self.log_event("dusk")
+        for player in self.players.values():
+            player.pending_target = None
+            player.basic_attack_used_today = False
+        self.active_random_event = None
+        self.villain_boost_active = False
+
+    def advance_day(self):
+        self.log_event("next")
+        self.current_day += 1
+
+    def damage_player(self, player: Player, amount: int, is_collateral: bool = False) -> int:
+        """Damage a player through their reductions/dodge; returns damage dealt"""
+        shields = player.shields
+        dealt = player.take_damage(amount, is_collateral, self.current_day, rng=self.rng)
+        self.log_event("damage", player.user_id, dealt, shields - player.shields, is_collateral)
+        if not player.is_alive:
+            self._refile(player)
+        return dealt
+
+    def heal_player(self, player: Player, amount: int):
+        self.log_event("heal", player.user_id, amount)
+        player.heal(amount)
+
+    def boost_hp(self, player: Player, amount: int):
+        """Raise HP without the usual cap (secret objective reward)"""
+        self.log_event("hp", player.user_id, amount)
+        player.hp += amount
+
+    def kill_player(self, player: Player, cause: str):
+        self.log_event("death", player.user_id, cause)
+        player.is_alive = False
+        self._refile(player)
+
+    def damage_ship(self, amount: int, hazard: Optional[str] = None) -> int:
+        """Damage the ship; ``hazard`` names environmental damage in the log"""
+        dealt = self.ship.take_damage(amount)
+        if hazard:
+            self.log_event("hazard", hazard, dealt)
+        else:
+            self.log_event("ship", -dealt)
+        return dealt
+
+    def repair_ship(self, amount: int):
+        self.log_event("ship", amount)
+        self.ship.repair(amount)
+
+    def add_spectator(self, user_id: int):
+        if user_id not in self.spectators:
+            self.log_event("spectate", user_id)
+            self.spectators.add(user_id)
+
+    def remove_spectator(self, user_id: int):
+        if user_id in self.spectators:
+            self.log_event("unspectate", user_id)
+            self.spectators.discard(user_id)
+
+    def give_coins(self, player: Player, amount: int):
+        self.log_event("coins", player.user_id, amount)
+        player.coins += amount
+
+    def give_shields(self, player: Player, amount: int):
+        self.log_event("shields", player.user_id, amount)
+        player.shields += amount
+
+    def grant_relic(self, player: Player, relic: str):
+        self.log_event("relic", player.user_id, relic, 1)
+        player.add_relic(relic)
+
+    def consume_relic(self, player: Player, relic: str):
+        self.log_event("relic", player.user_id, relic, -1)
+        player.remove_relic(relic)
+
+    def give_potion(self, player: Player):
+        self.log_event("potion", player.user_id)
+        player.has_potion = True
+
+    def transform_monster(self, player: Player):
+        """Reveal the Betrayer as the Epic Monster"""
+        self.log_event("transform", player.user_id)
+        player.role = Role.EPIC_MONSTER
+        self._refile(player)
+        self.monster_revealed = True
+
+    def deliver_potion(self, player: Player):
+        self.log_event("deliver", player.user_id)
+        self.potion_delivered = True
+
+    def contribute_upgrade(self, upgrade_key: str, amount: int) -> int:
+        """Add coins to an upgrade fund, installing it once funded; returns the fund total"""
+        self.log_event("upgrade", upgrade_key, amount)
+        self.upgrade_contribution[upgrade_key] += amount
+        total = self.upgrade_contribution[upgrade_key]
+        if total >= SHIP_UPGRADES[upgrade_key]['cost']:
+            self.ship.add_upgrade(upgrade_key)
+        return total
+
+    def set_player_stat(self, player: Player, name: str, value):
+        """Set a bookkeeping field on a player (uses left, objective progress, flags)"""
+        self.log_event("set", player.user_id, name,
+                       sorted(value) if isinstance(value, (set, frozenset)) else value)
+        setattr(player, name, value)
+
+    def set_flag(self, name: str, value):
+        """Set a game-level flag (boosts, random event, saboteur uses)"""
+        self.log_event("flag", name, value)
+        setattr(self, name, value)
+
+    def finish(self, winner: str):
+        self.log_event("end", winner)
+        self.phase = GamePhase.ENDED
 
     def start_voting(self):
         """Initialize voting phase"""
         self.phase = GamePhase.VOTING
+        self.log_event("voting")
         self.votes = {uid: 0 for uid in self.players if self.players[uid].is_alive}
         self.voted = set()
 
@@ -327,6 +716,7 @@ class CosmicVoyage:
             not self.players.get(voter_id) or 
             not self.players[voter_id].is_alive):
             return False
+        self.log_event("vote", voter_id, target_id)
         self.votes[target_id] = self.votes.get(target_id, 0) + 1
         self.voted.add(voter_id)
         return True
@@ -342,39 +732,244 @@ class CosmicVoyage:
         
         eliminated = [uid for uid, count in self.votes.items() if count == max_votes]
         if eliminated:
-            target_id = random.choice(eliminated)
+            target_id = self.rng.choice(eliminated)
             if target_id in self.players:
-                target = self.players[target_id]
-                if target_id == self.betrayer_id and not self.monster_revealed:
-                    target.role = Role.EPIC_MONSTER
-                    self.monster_revealed = True
-                    self.betrayer_caught = True
-                    return target_id
-                else:
-                    target.is_alive = False
-                    return target_id
+                self.eliminate(target_id)
+                return target_id
         return None
 
+    def eliminate(self, target_id: int):
+        """Apply a vote-out: the hidden Betrayer transforms, anyone else dies"""
+        self.log_event("eliminate", target_id)
+        target = self.players[target_id]
+        if target_id == self.betrayer_id and not self.monster_revealed:
+            target.role = Role.EPIC_MONSTER
+            self.monster_revealed = True
+            self.betrayer_caught = True
+        else:
+            target.is_alive = False
+        self._refile(target)
+
+
+class LockStats:
+    """Contention counters shared by all game locks"""
+
+    __slots__ = ('acquired', 'contended', 'wait_total', 'wait_max')
+
+    def __init__(self):
+        self.acquired = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        avg = self.wait_total / self.contended if self.contended else 0.0
+        return {"acquired": self.acquired, "contended": self.contended,
+                "avg_wait_ms": avg * 1000, "max_wait_ms": self.wait_max * 1000}
+
+
+class GameLock:
+    """Serialises every state change of one game.
+
+    An asyncio.Lock the holding task may re-enter, so code that holds it can
+    call helpers that take it again. Holders change the game and release it
+    before any Telegram call. Acquisitions that have to wait are counted in
+    the shared LockStats.
+    """
+
+    __slots__ = ('_lock', '_owner', '_depth', '_waiting', 'stats')
+
+    def __init__(self, stats: LockStats):
+        self._lock = asyncio.Lock()
+        self._owner: Optional[asyncio.Task] = None
+        self._depth = 0
+        self._waiting = 0  # tasks blocked in __aenter__
+        self.stats = stats
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    @property
+    def idle(self) -> bool:
+        """Neither held nor waited on, so nothing would notice it replaced"""
+        return not self._lock.locked() and not self._waiting
+
+    async def __aenter__(self):
+        task = asyncio.current_task()
+        if self._owner is task:
+            self._depth += 1
+            return self
+        if self._lock.locked():
+            started = time.monotonic()
+            self._waiting += 1
+            try:
+                await self._lock.acquire()
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - started
+            self.stats.contended += 1
+            self.stats.wait_total += waited
+            self.stats.wait_max = max(self.stats.wait_max, waited)
+        else:
+            await self._lock.acquire()
+        self.stats.acquired += 1
+        self._owner = task
+        self._depth = 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._depth -= 1
+        if not self._depth:
+            self._owner = None
+            self._lock.release()
+
+
+# lock() sweeps out idle locks of chats without a game once there are this
+# many locks (or twice as many as games, whichever is more)
+LOCK_PRUNE_THRESHOLD = 256
+
 
 class GameManager:
     """Manages multiple game instances"""
     
-    def __init__(self):
+    def __init__(self, store=None):
         self.games: Dict[int, CosmicVoyage] = {}
+        # One lock per chat; handlers and the day loop take it around every
+        # change to that chat's game (see lock())
+        self.locks: Dict[int, GameLock] = {}
+        self.lock_stats = LockStats()
+        self.user_games: Dict[int, int] = {}  # user_id -> chat_id of their active game
+        self.store = store  # optional persistence.GameStore
+        # Called as (user_id, chat_id, indexed) whenever a user enters or leaves
+        # the index; shard workers use it to keep the front's routing index
+        self.index_listener: Optional[Callable[[int, int, bool], None]] = None
+
+    def save_game(self, game: CosmicVoyage):
+        """Queue a snapshot and the new events of a game to the store (no-op without one)"""
+        if self.store and game.phase != GamePhase.ENDED:
+            self.store.save(game)
+
+    def restore_games(self, owns: Optional[Callable[[int], bool]] = None) -> List[CosmicVoyage]:
+        """Load persisted games into memory and rebuild the user index.
+
+        ``owns`` limits the restore to the chats it accepts (a shard's partition).
+        """
+        if not self.store:
+            return []
+        restored = []
+        for game in self.store.load_all():
+            if game.phase == GamePhase.ENDED or (owns and not owns(game.chat_id)):
+                continue
+            self.games[game.chat_id] = game
+            for user_id in game.players:
+                self._index_user(user_id, game.chat_id)
+            restored.append(game)
+        return restored
 
-    def create_game(self, chat_id: int) -> Optional[CosmicVoyage]:
-        """Create a new game for a chat"""
+    def create_game(self, chat_id: int, seed: Optional[int] = None) -> Optional[CosmicVoyage]:
+        """Create a new game for a chat (``seed`` fixes its RNG, e.g. for simulations)"""
         if chat_id in self.games and self.games[chat_id].phase != GamePhase.ENDED:
             return None
-        game = CosmicVoyage(chat_id)
+        if chat_id in self.games:
+            # An ended game end_game has not removed yet: forget it here, or
+            # its stored events would be replayed into the new game
+            self._unindex_players(self.games[chat_id])
+            if self.store:
+                self.store.delete(chat_id)
+        game = CosmicVoyage(chat_id, seed=seed)
         self.games[chat_id] = game
+        self.save_game(game)
         return game
 
+    def lock(self, chat_id: int) -> GameLock:
+        """The lock serialising changes to a chat's game; other chats never wait on it"""
+        lock = self.locks.get(chat_id)
+        if lock is None:
+            if len(self.locks) >= max(LOCK_PRUNE_THRESHOLD, 2 * len(self.games)):
+                self._prune_locks()
+            lock = self.locks[chat_id] = GameLock(self.lock_stats)
+        return lock
+
+    def _prune_locks(self):
+        """Drop the locks of chats without a game that nobody holds or waits on.
+
+        A lock that is held or waited on must stay: replacing it would let
+        the next caller of lock() run alongside its holder.
+        """
+        for chat_id in [cid for cid, lock in self.locks.items()
+                        if lock.idle and cid not in self.games]:
+            del self.locks[chat_id]
+
     def get_game(self, chat_id: int) -> Optional[CosmicVoyage]:
         """Get game for a chat"""
         return self.games.get(chat_id)
 
+    def get_user_game(self, user_id: int) -> Optional[CosmicVoyage]:
+        """Get the game a user is currently playing in (O(1) reverse lookup)"""
+        chat_id = self.user_games.get(user_id)
+        if chat_id is None:
+            return None
+        game = self.games.get(chat_id)
+        if not game or user_id not in game.players:
+            # Stale entry - drop it so the next lookup is clean
+            self._unindex_user(user_id)
+            return None
+        return game
+
+    def add_player(self, chat_id: int, user_id: int, username: str) -> bool:
+        """Add a player to a chat's game and index them.
+
+        Fails if the user is already playing in a different chat, so DM
+        callbacks can always be routed to exactly one game.
+        """
+        game = self.games.get(chat_id)
+        if not game:
+            return False
+        other = self.get_user_game(user_id)
+        if other and other.chat_id != chat_id:
+            return False
+        if game.add_player(user_id, username):
+            self._index_user(user_id, chat_id)
+            self.save_game(game)
+            return True
+        return False
+
+    def remove_player(self, chat_id: int, user_id: int) -> bool:
+        """Remove a player from a chat's game and drop them from the index"""
+        game = self.games.get(chat_id)
+        if not game or not game.remove_player(user_id):
+            return False
+        if self.user_games.get(user_id) == chat_id:
+            self._unindex_user(user_id)
+        self.save_game(game)
+        return True
+
     def end_game(self, chat_id: int):
-        """End and remove a game"""
+        """End and remove a game.
+
+        Its lock stays (the caller may hold it, others may wait on it and find
+        the game gone); lock() prunes it once idle.
+        """
         if chat_id in self.games:
-            del self.games[chat_id]
\ No newline at end of file
+            game = self.games.pop(chat_id)
+            self._unindex_players(game)
+            for timer in game.timers.values():
+                timer.cancel()
+        if self.store:
+            self.store.delete(chat_id)
+
+    def _unindex_players(self, game: CosmicVoyage):
+        """Drop a game's players from the user index"""
+        for user_id in game.players:
+            if self.user_games.get(user_id) == game.chat_id:
+                self._unindex_user(user_id)
+
+    def _index_user(self, user_id: int, chat_id: int):
+        self.user_games[user_id] = chat_id
+        if self.index_listener:
+            self.index_listener(user_id, chat_id, True)
+
+    def _unindex_user(self, user_id: int):
+        chat_id = self.user_games.pop(user_id, None)
+        if chat_id is not None and self.index_listener:
+            self.index_listener(user_id, chat_id, False)
@@ -0,0 +1,293 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import (
+    OUTBOX_GLOBAL_RATE, OUTBOX_GROUP_RATE, OUTBOX_GROUP_BURST,
+    OUTBOX_PRIVATE_RATE, OUTBOX_PRIVATE_BURST, OUTBOX_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Send priorities - lower goes first. Pass one as ``rate_limit_args`` to any
+# bot method to override the endpoint default.
+PRIORITY_PROMPT = 0      # day action prompts and vote requests
+PRIORITY_GAME = 1        # regular group game messages
+PRIORITY_SPECTATOR = 2   # spectator copies of major events
+PRIORITY_COSMETIC = 3    # caption/text edits and deletes
+
+PRIORITY_NAMES = {
+    PRIORITY_PROMPT: "prompt",
+    PRIORITY_GAME: "game",
+    PRIORITY_SPECTATOR: "spectator",
+    PRIORITY_COSMETIC: "cosmetic",
+}
+
+
+def _default_priority(endpoint: str) -> int:
+    if endpoint.startswith(("edit", "delete")):
+        return PRIORITY_COSMETIC
+    return PRIORITY_GAME
+
+
+def _is_throttled(endpoint: str) -> bool:
+    """Only message-producing calls count against Telegram's flood limits"""
+    return endpoint.startswith(("send", "edit", "delete", "copy", "forward"))
+
+
+def _posts_message(endpoint: str) -> bool:
+    """Calls that post a new message, which is what the per-chat limits count"""
+    return endpoint.startswith(("send", "copy", "forward"))
+
+
+class TokenBucket:
+    """Classic token bucket; ``delay()`` takes a token or says how long to wait"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def is_full(self) -> bool:
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+
+class _LatencyStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> Dict[str, float]:
+        avg = self.total / self.count if self.count else 0.0
+        return {"count": self.count, "avg_ms": avg * 1000, "max_ms": self.max * 1000}
+
+
+class _ChatGate:
+    """A chat's token bucket and its waiting posts, best priority first"""
+
+    __slots__ = ("bucket", "waiting", "drainer")
+
+    def __init__(self, rate: float, burst: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self.drainer: Optional[asyncio.Task] = None
+
+    @property
+    def idle(self) -> bool:
+        return self.drainer is None and self.bucket.is_full
+
+
+class OutboundQueue(BaseRateLimiter[int]):
+    """Central flow control for every Bot API call the application makes.
+
+    Installed through ``ApplicationBuilder.rate_limiter`` so all sends - the
+    wrappers in utils.py and direct ``context.bot`` calls alike - pass through
+    it. A request posting a message first waits its turn at its chat's gate:
+    the chat's token bucket (groups and private chats have separate limits)
+    lets the waiting posts through best priority first, so a prompt overtakes
+    a spectator copy queued earlier in the same chat. Edits and deletes post
+    nothing and skip the gate. Every request then joins a priority heap that
+    a single dispatcher drains at the global rate. A RetryAfter from Telegram
+    pauses the dispatcher and the request is retried.
+    """
+
+    _PRUNE_THRESHOLD = 5000
+
+    def __init__(self,
+                 global_rate: float = OUTBOX_GLOBAL_RATE,
+                 group_rate: float = OUTBOX_GROUP_RATE,
+                 group_burst: float = OUTBOX_GROUP_BURST,
+                 private_rate: float = OUTBOX_PRIVATE_RATE,
+                 private_burst: float = OUTBOX_PRIVATE_BURST,
+                 max_retries: int = OUTBOX_MAX_RETRIES):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.group_limits = (group_rate, group_burst)
+        self.private_limits = (private_rate, private_burst)
+        self.max_retries = max_retries
+
+        self._chats: Dict[int, _ChatGate] = {}
+        self._heap: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+        self.sent = 0
+        self.retries = 0
+        self.failures = 0
+        self.queue_latency: Dict[int, _LatencyStats] = {p: _LatencyStats() for p in PRIORITY_NAMES}
+
+    async def initialize(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for gate in self._chats.values():
+            if gate.drainer:
+                gate.drainer.cancel()
+            for _, _, future in gate.waiting:
+                future.cancel()
+        self._chats.clear()
+        for _, _, future in self._heap:
+            future.cancel()
+        self._heap.clear()
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict, List[Dict]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict, List[Dict]]:
+        if not _is_throttled(endpoint):
+            return await callback(*args, **kwargs)
+
+        priority = rate_limit_args if rate_limit_args is not None else _default_priority(endpoint)
+        chat_id = data.get("chat_id")
+
+        for attempt in range(self.max_retries + 1):
+            enqueued = time.monotonic()
+            await self._acquire(chat_id, priority, _posts_message(endpoint))
+            self.queue_latency.setdefault(priority, _LatencyStats()).add(time.monotonic() - enqueued)
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") \
+                    else float(e.retry_after)
+                self.retries += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                logger.warning(f"Flood limit hit on {endpoint} for chat {chat_id}, "
+                               f"retrying in {retry_after}s (attempt {attempt + 1})")
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    raise
+                continue
+            except Exception:
+                self.failures += 1
+                raise
+            self.sent += 1
+            return result
+
+    async def _acquire(self, chat_id: Optional[Union[int, str]], priority: int, posts: bool = True):
+        """Wait for the chat's gate (posts only), then for a global slot in priority order"""
+        if posts and isinstance(chat_id, int):
+            await self._wait_turn(self._gate(chat_id), priority)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future))
+        self._wakeup.set()
+        await future
+
+    def _gate(self, chat_id: int) -> _ChatGate:
+        gate = self._chats.get(chat_id)
+        if gate is None:
+            self._prune_chats()
+            rate, burst = self.group_limits if chat_id < 0 else self.private_limits
+            gate = self._chats[chat_id] = _ChatGate(rate, burst)
+        return gate
+
+    async def _wait_turn(self, gate: _ChatGate, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(gate.waiting, (priority, next(self._seq), future))
+        if gate.drainer is None:
+            gate.drainer = asyncio.create_task(self._drain_chat(gate))
+        await future
+
+    async def _drain_chat(self, gate: _ChatGate):
+        """Let the chat's waiting posts through, best priority first, as its bucket allows"""
+        try:
+            while True:
+                # Drop waiters cancelled while queued before spending a token on them
+                while gate.waiting and gate.waiting[0][2].done():
+                    heapq.heappop(gate.waiting)
+                if not gate.waiting:
+                    return
+                delay = gate.bucket.delay()
+                if delay > 0:
+                    # Posts queued meanwhile still compete for this token
+                    await asyncio.sleep(delay)
+                    continue
+                _, _, future = heapq.heappop(gate.waiting)
+                if not future.done():
+                    future.set_result(None)
+                # Let the released request reach the global heap before the next one
+                await asyncio.sleep(0)
+        finally:
+            gate.drainer = None
+
+    def _prune_chats(self):
+        if len(self._chats) < self._PRUNE_THRESHOLD:
+            return
+        for chat_id in [cid for cid, gate in self._chats.items() if gate.idle]:
+            del self._chats[chat_id]
+
+    async def _dispatch_loop(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            delay = self.global_bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            # The heap may have been drained by cancellations while we slept
+            while self._heap:
+                _, _, future = heapq.heappop(self._heap)
+                if not future.done():
+                    future.set_result(None)
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and per-priority queueing latency"""
+        return {
+            "depth": len(self._heap),
+            "sent": self.sent,
+            "retries": self.retries,
+            "failures": self.failures,
+            "paused": max(0.0, self._paused_until - time.monotonic()),
+            "latency": {PRIORITY_NAMES.get(p, str(p)): s.as_dict() for p, s in self.queue_latency.items()},
+        }
@@ -0,0 +1,152 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from models import CosmicVoyage
+
+logger = logging.getLogger(__name__)
+
+
+class GameStore:
+    """SQLite-backed snapshots of running games, one row per chat.
+
+    Snapshots are compact JSON of CosmicVoyage.to_dict(). Alongside them each
+    game's event log is appended to the ``events`` table, which lets a game
+    be rebuilt with eventlog.replay() when its snapshot is missing or
+    unreadable. The connection is opened lazily so importing the bot never
+    touches the disk.
+
+    save() and delete() only serialise on the caller's thread and queue the
+    result. One writer thread commits whatever has queued up, every game at
+    once, so the event loop never waits on SQLite and a burst of changes to a
+    game costs one snapshot write.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        # chat_id -> queued write: {'delete': clear the chat first, 'snapshot': latest
+        # JSON or None, 'events': [(seq, JSON record)]}
+        self._pending: Dict[int, Dict] = {}
+        self._pending_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-db")
+        self._flush_queued = False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Opened by whichever thread comes first; reads happen at startup, writes on the writer
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            # Shard workers share the file; wait out each other's write locks
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                "chat_id INTEGER PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "chat_id INTEGER NOT NULL, seq INTEGER NOT NULL, record TEXT NOT NULL, "
+                "PRIMARY KEY (chat_id, seq)) WITHOUT ROWID"
+            )
+        return self._conn
+
+    @staticmethod
+    def dumps(game: CosmicVoyage) -> str:
+        return json.dumps(game.to_dict(), separators=(',', ':'), ensure_ascii=False)
+
+    def save(self, game: CosmicVoyage):
+        """Queue a game's snapshot and the events recorded since its last save"""
+        start = game.event_log_flushed
+        events = [(start + i, json.dumps(record, separators=(',', ':'), ensure_ascii=False))
+                  for i, record in enumerate(game.event_log[start:])]
+        game.event_log_flushed = start + len(events)
+        snapshot = self.dumps(game)
+        with self._pending_lock:
+            write = self._pending.setdefault(game.chat_id, {'delete': False, 'snapshot': None, 'events': []})
+            write['snapshot'] = snapshot
+            write['events'].extend(events)
+            self._queue_flush()
+
+    def delete(self, chat_id: int):
+        """Queue forgetting a finished game"""
+        with self._pending_lock:
+            self._pending[chat_id] = {'delete': True, 'snapshot': None, 'events': []}
+            self._queue_flush()
+
+    def _queue_flush(self):
+        # Under _pending_lock; one queued flush picks up everything saved before it runs
+        if not self._flush_queued:
+            self._flush_queued = True
+            self._writer.submit(self.flush)
+
+    def flush(self):
+        """Commit every queued write in one transaction (normally run by the writer thread)"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._flush_queued = False
+        if not pending:
+            return
+        try:
+            with self.conn:
+                for chat_id, write in pending.items():
+                    if write['delete']:
+                        self.conn.execute("DELETE FROM games WHERE chat_id = ?", (chat_id,))
+                        self.conn.execute("DELETE FROM events WHERE chat_id = ?", (chat_id,))
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO events (chat_id, seq, record) VALUES (?, ?, ?)",
+                        [(chat_id, seq, record) for seq, record in write['events']]
+                    )
+                    if write['snapshot'] is not None:
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO games (chat_id, data, updated_at) VALUES (?, ?, ?)",
+                            (chat_id, write['snapshot'], time.time())
+                        )
+        except Exception as e:
+            logger.error(f"Could not write state of {len(pending)} game(s): {e}")
+
+    def load_events(self, chat_id: int) -> List[list]:
+        """A game's event log in order"""
+        return [json.loads(record) for (record,) in self.conn.execute(
+            "SELECT record FROM events WHERE chat_id = ? ORDER BY seq", (chat_id,))]
+
+    def load_all(self) -> List[CosmicVoyage]:
+        """Rebuild every stored game from its snapshot, falling back to its event log"""
+        from eventlog import replay
+
+        games = []
+        snapshots = dict(self.conn.execute("SELECT chat_id, data FROM games").fetchall())
+        logged = [chat_id for (chat_id,) in self.conn.execute("SELECT DISTINCT chat_id FROM events")]
+        for chat_id in snapshots.keys() | set(logged):
+            game = None
+            if chat_id in snapshots:
+                try:
+                    game = CosmicVoyage.from_dict(json.loads(snapshots[chat_id]))
+                    game.event_log = self.load_events(chat_id) or game.event_log
+                    game.event_log_flushed = len(game.event_log)
+                    game.rng = random.Random(f"{game.seed}:{len(game.event_log)}")
+                except Exception as e:
+                    logger.error(f"Could not restore snapshot of game {chat_id}: {e}")
+            if game is None:
+                try:
+                    game = replay(chat_id, self.load_events(chat_id))
+                    logger.info(f"Rebuilt game {chat_id} from {len(game.event_log)} events")
+                except Exception as e:
+                    logger.error(f"Could not replay game {chat_id}: {e}")
+                    continue
+            games.append(game)
+        return games
+
+    def close(self):
+        """Finish the queued writes and close the database"""
+        self._writer.shutdown(wait=True)
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
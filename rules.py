@@ -0,0 +1,375 @@
+"""Game rules, free of Telegram I/O.
+
+resolve_day() applies every pending action, hazard and monster attack to a
+CosmicVoyage synchronously and returns what should be announced. The caller
+(game_logic.action_deadline_callback, or the simulator) sends the notifications
+afterwards in one batch, so a slow Bot API call can no longer stall the
+resolution of a day.
+
+Actions are resolved through the ACTIONS registry: a new action or role
+plugs in with ``@register_action`` instead of another branch in a chain.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from config import (
+    Role, GamePhase, HEAL_SELF_AMOUNT, REPAIR_SHIP_AMOUNT, DIVINE_INTERVENTION_PROB,
+    DIVINE_HEAL_AMOUNT, RANDOM_EVENTS, RANDOM_EVENT_CHANCE,
+    DEFAULT_WEAPON, PREMIUM_WEAPONS, RELIC_EFFECTS
+)
+from models import CosmicVoyage, Player
+
+FALSE_INTEL_TIPS = [
+    'Someone saw a crew member near the engine room...',
+    'Strange noises were heard from the cargo bay...',
+    'A player was acting suspiciously...',
+]
+
+
+@dataclass
+class DayResult:
+    """Outcome of resolve_day: the group summary lines and DMs to send"""
+    events: List[str] = field(default_factory=list)
+    # (chat_id, text, send kwargs) - the message format broadcast_messages takes
+    notifications: List[Tuple[int, str, Dict]] = field(default_factory=list)
+    monster_attacked: bool = False
+
+
+def starting_ship_hp(player_count: int) -> Tuple[int, int]:
+    """(max HP, starting HP) of the ship for a crew size"""
+    if player_count <= 4:
+        return 80, 56  # Half of max
+    elif player_count <= 6:
+        return 100, 70  # Half of max
+    elif player_count <= 10:
+        return 120, 84  # Half of max
+    return 140, 98  # Half of max
+
+
+def day_phase(day: int) -> Tuple[GamePhase, str]:
+    """The game phase and its display name for a given day"""
+    if day <= 3:
+        return GamePhase.HEALING, "Healing Phase"
+    elif day <= 9:
+        return GamePhase.VOYAGE, "Cosmic Voyage"
+    elif day == 10:
+        return GamePhase.POTION_QUEST, "Potion Quest"
+    elif day <= 12:
+        return GamePhase.SHOWDOWN, "Monster Showdown"
+    return GamePhase.DELIVERY, "Final Delivery"
+
+
+def resolve_collateral_deaths(game: CosmicVoyage) -> List[Player]:
+    """Kill players whose collateral damage went untreated for 4 days"""
+    died = []
+    for player in list(game.players.values()):
+        if player.collateral_damage > 0 and game.current_day - player.collateral_day >= 4:
+            game.kill_player(player, "collateral")
+            game.add_spectator(player.user_id)
+            died.append(player)
+    return died
+
+
+def roll_divine_intervention(game: CosmicVoyage) -> bool:
+    """From day 4, occasionally heal every living hero"""
+    if game.rng.random() < DIVINE_INTERVENTION_PROB and game.current_day > 3:
+        for p in game.get_living_faction(shadow=False):
+            game.heal_player(p, DIVINE_HEAL_AMOUNT)
+        return True
+    return False
+
+
+def roll_random_event(game: CosmicVoyage) -> bool:
+    """Maybe pick tomorrow's random event"""
+    if game.rng.random() < RANDOM_EVENT_CHANCE:
+        event_key = game.rng.choice(list(RANDOM_EVENTS.keys()))
+        game.set_flag('active_random_event', RANDOM_EVENTS[event_key])
+        return True
+    return False
+
+
+def apply_daily_upgrades(game: CosmicVoyage):
+    """End-of-day effects of installed ship upgrades"""
+    if "auto_repair_system" in game.ship.upgrades:
+        game.repair_ship(5)
+
+
+def distribute_potion(game: CosmicVoyage) -> Optional[Player]:
+    """Potion day: hand the potion to a random hero and reveal the monster"""
+    positive_players = game.get_living_faction(shadow=False)
+    
+    if not positive_players:
+        return None
+    
+    potion_bearer = game.rng.choice(positive_players)
+    game.give_potion(potion_bearer)
+    
+    if game.betrayer_id in game.players and game.players[game.betrayer_id].is_alive and not game.monster_revealed:
+        game.transform_monster(game.players[game.betrayer_id])
+    return potion_bearer
+
+
+@dataclass
+class DayContext:
+    """What an action handler can see and append to while a day resolves"""
+    game: CosmicVoyage
+    result: DayResult
+    villain_multiplier: float = 1.0
+
+
+@dataclass(frozen=True)
+class ActionSpec:
+    """A registered action: its handler and who may use it"""
+    name: str
+    resolve: Callable[[DayContext, Player, Optional[Player]], None]
+    roles: Optional[FrozenSet[Role]] = None  # None = any role
+    needs_target: bool = False
+
+
+ACTIONS: Dict[str, ActionSpec] = {}
+
+# Objective id -> the action whose every use advances it by one. Objectives
+# with richer progress (healing distinct players, sabotage damage) are
+# advanced by their action handlers.
+OBJECTIVE_ACTIONS = {
+    "find_relics": "relic",
+    "double_rally": "rally",
+}
+
+
+def register_action(name: str, roles: Optional[Iterable[Role]] = None, needs_target: bool = False):
+    """Register ``fn(day, player, target)`` as the handler for an action type.
+
+    Handlers only run for living players whose role is in ``roles``; with
+    ``needs_target`` they are skipped unless a target was chosen.
+    """
+    def decorator(fn):
+        ACTIONS[name] = ActionSpec(name, fn, frozenset(roles) if roles else None, needs_target)
+        return fn
+    return decorator
+
+
+def _announce_kill(day: DayContext, target: Player, message: str):
+    if not target.is_alive:
+        day.result.events.append(message)
+        day.game.add_spectator(target.user_id)
+
+
+@register_action("basic_attack", needs_target=True)
+def _basic_attack(day, player, target):
+    if target.is_alive:
+        damage = DEFAULT_WEAPON["damage"] + player.damage_bonus
+        day.game.damage_player(target, damage)
+        day.result.events.append(f"⚔️ {player.username} attacked {target.username} with Basic Strike! (-{damage} HP)")
+        _announce_kill(day, target, f"💀 {target.username} has been slain!")
+
+
+@register_action("weapon_attack", needs_target=True)
+def _weapon_attack(day, player, target):
+    game = day.game
+    weapon_name = player.selected_weapon
+    if weapon_name is None:
+        return
+    game.set_player_stat(player, 'selected_weapon', None)
+    if player.weapons and player.weapons.get(weapon_name, 0) > 0:
+        damage = PREMIUM_WEAPONS[weapon_name]["damage"] + player.damage_bonus
+        game.damage_player(target, damage)
+        game.set_player_stat(player, 'weapons', {**player.weapons, weapon_name: player.weapons[weapon_name] - 1})
+        day.result.events.append(f"🗡️ {player.username} attacked {target.username} with {weapon_name}! (-{damage} HP)")
+        _announce_kill(day, target, f"💀 {target.username} has been eliminated!")
+
+
+@register_action("heal")
+def _heal(day, player, target):
+    game = day.game
+    if target and player.role == Role.HEALER:
+        game.heal_player(target, HEAL_SELF_AMOUNT)
+        day.result.events.append(f"🩹  {player.username} healed {target.username} (+{HEAL_SELF_AMOUNT} HP)")
+        game.set_player_stat(player, 'healed_targets', player.healed_targets | {target.user_id})
+        if not player.objective_completed and _objective_id(player) == "heal_three":
+            game.set_player_stat(player, 'objective_progress', len(player.healed_targets))
+    else:
+        game.heal_player(player, HEAL_SELF_AMOUNT)
+        day.result.events.append(f"🩹  {player.username} healed themselves (+{HEAL_SELF_AMOUNT} HP)")
+
+
+@register_action("repair", roles=[Role.HEALER, Role.CAPTAIN])
+def _repair(day, player, target):
+    day.game.repair_ship(REPAIR_SHIP_AMOUNT)
+    day.result.events.append(f"🔧 {player.username} repaired the ship (+{REPAIR_SHIP_AMOUNT} HP)")
+
+
+@register_action("protect", roles=[Role.DRAGON_RIDER])
+def _protect(day, player, target):
+    # The protection itself is read by resolve_monster_attack
+    day.result.events.append(f"🐉 {player.username} is protecting the team")
+
+
+@register_action("relic", roles=[Role.EXPLORER])
+def _relic(day, player, target):
+    available_relics = [r for r in RELIC_EFFECTS.keys() if r not in player.relics]
+    if available_relics:
+        found_relic = day.game.rng.choice(available_relics)
+        day.game.grant_relic(player, found_relic)
+        day.result.events.append(f"🪶 {player.username} found the {found_relic}")
+
+
+@register_action("rally", roles=[Role.CAPTAIN])
+def _rally(day, player, target):
+    game = day.game
+    if player.rally_uses > 0:
+        for p in game.get_living_players():
+            game.heal_player(p, 10)
+        game.set_player_stat(player, 'rally_uses', player.rally_uses - 1)
+        day.result.events.append(f"🎖 {player.username} rallied the team! +10 HP to all")
+
+
+@register_action("sabotage", roles=[Role.BETRAYER])
+def _sabotage(day, player, target):
+    game = day.game
+    damage = int(game.rng.randint(12, 22) * day.villain_multiplier)
+    damage = game.apply_captain_damage_reduction(damage)
+    game.damage_ship(damage)
+    day.result.events.append(f"🔪 Sabotage! Ship took {damage} damage (anonymous)")
+    if not player.objective_completed and _objective_id(player) == "sabotage_50":
+        game.set_player_stat(player, 'objective_progress', player.objective_progress + damage)
+
+
+@register_action("deliver")
+def _deliver(day, player, target):
+    if player.has_potion:
+        day.game.deliver_potion(player)
+        day.result.events.append(f"⚡ **{player.username} delivered the Cosmic Potion!** The team wins!")
+
+
+@register_action("block", roles=[Role.SHADOW_SABOTEUR], needs_target=True)
+def _block(day, player, target):
+    game = day.game
+    game.set_player_stat(target, 'action_blocked', True)
+    game.set_flag('shadow_saboteur_uses', game.shadow_saboteur_uses + 1)
+    day.result.events.append("🚫 Someone's action was blocked (anonymous)")
+
+
+@register_action("frame_job", roles=[Role.BETRAYER], needs_target=True)
+def _frame_job(day, player, target):
+    if player.frame_job_uses > 0 and target.role != Role.BETRAYER:
+        day.game.set_player_stat(player, 'frame_job_uses', player.frame_job_uses - 1)
+        day.result.events.append("🎭 Someone's action caused minor damage! (Suspicious)")
+        day.game.damage_ship(5)
+
+
+@register_action("false_intel", roles=[Role.BETRAYER], needs_target=True)
+def _false_intel(day, player, target):
+    if player.false_intel_uses > 0 and target.role != Role.BETRAYER:
+        day.game.set_player_stat(player, 'false_intel_uses', player.false_intel_uses - 1)
+        day.result.notifications.append(
+            (target.user_id, f"🤫 Anonymous tip: {day.game.rng.choice(FALSE_INTEL_TIPS)}", {})
+        )
+
+
+def _objective_id(player: Player) -> Optional[str]:
+    return player.secret_objective.get('id') if player.secret_objective else None
+
+
+def _check_objective(game: CosmicVoyage, player: Player, result: DayResult):
+    """Complete a player's secret objective and hand out its reward once reached"""
+    obj = player.secret_objective
+    progress = game.current_day if obj.get('track') == 'day' else player.objective_progress
+    if progress < obj['target_count']:
+        return
+
+    game.set_player_stat(player, 'objective_completed', True)
+    reward_msg = f"🎯 **Secret Mission Complete!** You completed: '{obj['desc']}'.\n"
+    if obj['reward_type'] == 'coins':
+        game.give_coins(player, obj['value'])
+        reward_msg += f"💰 You have been awarded {obj['value']} coins!"
+    elif obj['reward_type'] == 'item':
+        game.give_shields(player, 1)
+        reward_msg += "🛡️ You have received a free Shield!"
+    elif obj['reward_type'] == 'hp_boost':
+        game.boost_hp(player, obj['value'])
+        reward_msg += f"❤️ Your HP has been boosted by {obj['value']}!"
+    result.notifications.append((player.user_id, reward_msg, {}))
+
+
+def resolve_day(game: CosmicVoyage) -> DayResult:
+    """Resolve the day's pending actions, objectives, hazards and monster attack.
+
+    Mutates ``game`` through its recording helpers and never awaits. Each
+    action is one lookup in ACTIONS.
+    """
+    result = DayResult()
+    day = DayContext(game, result)
+    if game.active_random_event and game.active_random_event['name'] == "Traitor's Moon":
+        day.villain_multiplier = 2.0
+
+    # Process player actions
+    for player in game.get_living_players():
+        action = game.pending_actions.get(player.user_id, "skip")
+        
+        if not player.objective_completed and OBJECTIVE_ACTIONS.get(_objective_id(player)) == action:
+            game.set_player_stat(player, 'objective_progress', player.objective_progress + 1)
+
+        spec = ACTIONS.get(action)
+        if spec and (spec.roles is None or player.role in spec.roles):
+            target = game.players.get(player.pending_target) if player.pending_target else None
+            if target or not spec.needs_target:
+                spec.resolve(day, player, target)
+        player.pending_target = None
+
+    # SECRET OBJECTIVE COMPLETION CHECK
+    for player in game.get_living_players():
+        if not player.objective_completed and player.secret_objective:
+            _check_objective(game, player, result)
+    
+    # Random hazards
+    if game.phase == GamePhase.VOYAGE and game.rng.random() < 0.5:
+        hazard = game.rng.choice(["Cosmic Storm", "Meteor Shower", "Solar Flare", "Dimensional Rift"])
+        damage = game.apply_captain_damage_reduction(game.rng.randint(8, 18))
+        game.damage_ship(damage, hazard=hazard)
+        result.events.append(f"🌪️ {hazard} hit the ship! (-{damage} HP)")
+    
+    # Monster attack
+    if game.monster_revealed and game.monster_id and game.players[game.monster_id].is_alive:
+        result.monster_attacked = resolve_monster_attack(game, result.events)
+    
+    # Daily coins
+    game.earn_coins()
+
+    # Reset the active random event and per-player day state
+    game.end_day()
+    return result
+
+
+def resolve_monster_attack(game: CosmicVoyage, events: List[str]) -> bool:
+    """Monster hits the ship and two random crew; returns False if it can't attack"""
+    monster = game.players.get(game.monster_id)
+    if not monster or not monster.is_alive:
+        return False
+    
+    devil_boost = 1.5 if game.devil_hunter_boost_used else 1.0
+    villain_boost = 1.5 if game.villain_boost_active else 1.0
+    total_boost = devil_boost * villain_boost
+    
+    ship_damage = game.apply_captain_damage_reduction(int(game.rng.randint(20, 35) * total_boost))
+    game.damage_ship(ship_damage)
+    events.append(f"👹 Monster attacked the ship! (-{ship_damage} HP)")
+    
+    targets = [p for p in game.get_living_players() if p.user_id != game.monster_id]
+    num_targets = min(len(targets), 2)
+    
+    if num_targets > 0:
+        for target in game.rng.sample(targets, num_targets):
+            is_dragon_protected = any(
+                p.role == Role.DRAGON_RIDER and p.is_alive and 
+                game.pending_actions.get(p.user_id) == "protect" 
+                for p in game.players.values()
+            )
+            
+            damage = int(game.rng.randint(25, 40) * total_boost)
+            if is_dragon_protected:
+                damage = int(damage * 0.6)
+            
+            game.damage_player(target, damage, is_collateral=True)
+            events.append(f"👹 {target.username} took {damage} collateral damage!")
+    return True
@@ -0,0 +1,207 @@
+"""Sharded deployment: one routing front process and N game worker processes.
+
+With ``SHARD_WORKERS`` above 1 the main process still receives updates (by
+polling or webhook) but runs no game handlers. ShardRouter forwards each
+update to the worker that owns its chat. Group updates go by chat id.
+Private ones (DM buttons, /myrole, ...) go through a user -> chat index of
+active players, falling back to the user id. Each worker is a complete
+bot without an updater: its own Application, OutboundQueue and
+GameManager, holding only its partition of the games. It restores that
+partition from the shared state DB on start.
+
+Workers report their user index changes back over a queue so the front can
+route DMs. The front also enforces the one-game-per-user rule across
+shards, which a worker can only check for its own chats. A /join or Join
+button press goes through only if the index has the user in no other game.
+It then reserves the user for that chat until the worker reports the join,
+or for JOIN_RESERVATION seconds if the join fails. So two joins on two
+shards at the same moment cannot both succeed.
+
+All IPC is local multiprocessing queues, so the deployment runs on one box.
+``python bench.py shards`` measures update throughput by worker count.
+"""
+import asyncio
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+
+logger = logging.getLogger(__name__)
+
+# Seconds a forwarded join holds its user for the chat until the worker reports it
+JOIN_RESERVATION = 10.0
+
+
+def shard_for(chat_id: int, workers: int) -> int:
+    """The worker that owns a chat"""
+    return chat_id % workers
+
+
+class ShardRouter:
+    """Starts the workers and routes updates to them from the front process"""
+
+    def __init__(self, workers: int, target: Optional[Callable] = None, args: tuple = ()):
+        self.workers = workers
+        # Worker entry point, called as target(index, workers, inbox, index_queue, *args)
+        self.target = target or worker_main
+        self.args = args
+        self._mp = multiprocessing.get_context("spawn")
+        self.inboxes = [self._mp.Queue() for _ in range(workers)]
+        self.index_queue = self._mp.Queue()
+        self.user_chats: Dict[int, int] = {}  # user_id -> chat_id of their game, from the workers
+        # user_id -> (chat_id, expiry) of joins forwarded but not yet reported, oldest first
+        self.joining: Dict[int, Tuple[int, float]] = {}
+        self.refused_joins = 0
+        self.routed: List[int] = [0] * workers
+        self.processes: List[multiprocessing.Process] = []
+        self._index_thread: Optional[threading.Thread] = None
+
+    def start(self):
+        for index, inbox in enumerate(self.inboxes):
+            process = self._mp.Process(
+                target=self.target, name=f"shard-{index}", daemon=True,
+                args=(index, self.workers, inbox, self.index_queue, *self.args),
+            )
+            process.start()
+            self.processes.append(process)
+        logger.info(f"Started {self.workers} shard workers")
+
+    def shard_of(self, update: Update) -> int:
+        chat = update.effective_chat
+        if chat is not None and chat.type != chat.PRIVATE:
+            key = chat.id
+        elif update.effective_user is not None:
+            user_id = update.effective_user.id
+            key = self.user_chats.get(user_id, user_id)
+        else:
+            key = chat.id if chat is not None else update.update_id
+        return shard_for(key, self.workers)
+
+    def dispatch(self, update: Update) -> int:
+        """Send an update to its worker and return the worker's index"""
+        shard = self.shard_of(update)
+        self.inboxes[shard].put(update.to_dict())
+        self.routed[shard] += 1
+        return shard
+
+    @staticmethod
+    def join_target(update: Update) -> Optional[int]:
+        """The chat a /join command or Join button asks to join; None for any other update"""
+        from callbacks import JOIN, decode
+
+        chat = update.effective_chat
+        if chat is None or chat.type == chat.PRIVATE or update.effective_user is None:
+            return None
+        message = update.message
+        if message is not None and message.text:
+            if message.text.split()[0].split('@')[0] == '/join':
+                return chat.id
+        query = update.callback_query
+        if query is not None:
+            press = decode(query.data)
+            if press is not None and press.kind is JOIN:
+                return chat.id
+        return None
+
+    def admit_join(self, user_id: int, chat_id: int) -> bool:
+        """Whether ``user_id`` may join ``chat_id``'s game; if so, reserve them for it"""
+        now = time.monotonic()
+        while self.joining:
+            oldest = next(iter(self.joining))
+            if self.joining[oldest][1] > now:
+                break
+            self.joining.pop(oldest, None)
+        current = self.user_chats.get(user_id)
+        pending = self.joining.get(user_id)
+        if (current is not None and current != chat_id) or (pending and pending[0] != chat_id):
+            return False
+        self.joining.pop(user_id, None)
+        self.joining[user_id] = (chat_id, now + JOIN_RESERVATION)
+        return True
+
+    async def _forward(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = self.join_target(update)
+        if chat_id is not None and not self.admit_join(update.effective_user.id, chat_id):
+            self.refused_joins += 1
+            if update.callback_query:
+                await update.callback_query.answer("You're already playing in another chat!", show_alert=True)
+            else:
+                await update.message.reply_text("❌ You're already playing in another chat!")
+            return
+        self.dispatch(update)
+
+    def install(self, application: Application):
+        """Make ``application`` forward every update instead of handling it"""
+        application.add_handler(TypeHandler(Update, self._forward))
+
+    def watch_index(self):
+        """Apply the workers' user index changes in a background thread"""
+        self._index_thread = threading.Thread(target=self._apply_index, name="shard-index", daemon=True)
+        self._index_thread.start()
+
+    def _apply_index(self):
+        while True:
+            item = self.index_queue.get()
+            if item is None:
+                return
+            user_id, chat_id, indexed = item
+            if indexed:
+                self.user_chats[user_id] = chat_id
+                self.joining.pop(user_id, None)
+            elif self.user_chats.get(user_id) == chat_id:
+                # Only drop the entry this worker made; the user may already be in a game elsewhere
+                del self.user_chats[user_id]
+
+    def stop(self, timeout: float = 10.0):
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.index_queue.put(None)
+        logger.info(f"Shard workers stopped (routed {self.routed}, refused {self.refused_joins} cross-shard joins)")
+
+
+def worker_main(index: int, workers: int, inbox, index_queue):
+    """Entry point of a game worker process"""
+    # Ctrl+C reaches the whole process group; let the front shut workers down in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_run_worker(index, workers, inbox, index_queue))
+
+
+async def _run_worker(index: int, workers: int, inbox, index_queue):
+    from config import OUTBOX_GLOBAL_RATE
+    from context import game_manager, timer_wheel
+    from main import build_application, register_handlers, rearm_restored_games
+    from outbox import OutboundQueue
+
+    # Chats never span workers, so only the bot-wide send budget is split
+    application = build_application(OutboundQueue(global_rate=OUTBOX_GLOBAL_RATE / workers), updater=False)
+    register_handlers(application)
+    game_manager.index_listener = lambda user_id, chat_id, indexed: index_queue.put((user_id, chat_id, indexed))
+
+    await application.initialize()
+    await application.start()
+    timer_wheel.start()
+    rearm_restored_games(application, owns=lambda chat_id: shard_for(chat_id, workers) == index)
+    logger.info(f"Shard {index}/{workers} ready with {len(game_manager.games)} game(s)")
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            data = await loop.run_in_executor(None, inbox.get)
+            if data is None:
+                break
+            await application.update_queue.put(Update.de_json(data, application.bot))
+    finally:
+        await timer_wheel.stop()
+        await application.stop()
+        await application.shutdown()
+        if game_manager.store:
+            game_manager.store.close()
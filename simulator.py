@@ -0,0 +1,283 @@
+"""Headless Cosmic Voyage simulator.
+
+Plays complete games against a fake bot, with scripted or random player
+policies standing in for the DM buttons. Each game runs through the live
+bot's own code: game_logic.start_game and the day's stage callbacks
+(day_start_callback, open_actions_callback, action_deadline_callback,
+vote_deadline_callback), on the shared game manager. Instead of waiting for
+the game's 'day' timer the simulator cancels it and runs the step for the
+recorded stage at once, as hurry_stage does when everyone has answered, so
+nothing waits or talks to Telegram. Each dawn still renders the status image
+as the bot does, and that dominates the time per game ("dawn" below).
+
+    python simulator.py --games 200 --players 4 10 21 --policy scripted
+
+Reports games per second, the time spent in each phase and win rates by
+player count - a load test for the engine and a balance check for the rules.
+Simulated games are never persisted, so run it without STATE_DB_PATH.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from config import (
+    SHADOW_ROLES, MIN_PLAYERS, MAX_PLAYERS, GamePhase,
+    STAGE_DAWN, STAGE_BRIEFING, STAGE_ACTIONS, STAGE_VOTING
+)
+from models import CosmicVoyage, Player
+
+
+# Actions whose button opens a second menu rather than queueing an action
+_MENU_ACTIONS = {"premium_weapon", "use_relic"}
+_TARGETED_ACTIONS = {"heal", "block", "frame_job", "false_intel"}
+
+PHASES = ("setup", "dawn", "briefing", "actions", "resolve", "voting", "tally")
+
+
+class FakeBot:
+    """Stands in for telegram.Bot; every call takes ``latency`` seconds and is counted.
+
+    ``prompted`` collects the chats sent a keyboard - the players asked for an
+    action or a vote.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.prompted = set()
+        self._next_id = 0
+
+    @property
+    def sent(self) -> int:
+        return sum(self.calls.values())
+
+    async def _call(self, endpoint: str, chat_id) -> SimpleNamespace:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls[endpoint] += 1
+        self._next_id += 1
+        return SimpleNamespace(message_id=self._next_id, chat_id=chat_id,
+                               photo=[SimpleNamespace(file_id=f"photo-{self._next_id}")])
+
+    async def send_message(self, chat_id, text, reply_markup=None, **kwargs):
+        if reply_markup is not None:
+            self.prompted.add(chat_id)
+        return await self._call("send_message", chat_id)
+
+    async def send_animation(self, chat_id, animation, **kwargs):
+        return await self._call("send_animation", chat_id)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        return await self._call("send_photo", chat_id)
+
+
+def available_actions(player: Player, game: CosmicVoyage) -> List[str]:
+    """The actions on a player's DM keyboard today, in button order"""
+    from utils import action_buttons
+
+    actions = [action for row in action_buttons(player, game) for _, action in row
+               if action not in _MENU_ACTIONS]
+    return actions or ["skip"]
+
+
+def pick_target(action: str, player: Player, game: CosmicVoyage, rng: random.Random) -> Optional[int]:
+    """Choose a target the way the DM target menus allow"""
+    if action == "basic_attack":
+        candidates = game.get_living_faction(shadow=True)
+    elif action in _TARGETED_ACTIONS:
+        candidates = [p for p in game.get_living_players() if p.user_id != player.user_id]
+    else:
+        return None
+    return rng.choice(candidates).user_id if candidates else None
+
+
+def random_policy(player: Player, game: CosmicVoyage, rng: random.Random) -> str:
+    """Press a random button"""
+    return rng.choice(available_actions(player, game))
+
+
+_SCRIPTED_PREFERENCE = (
+    "monster_attack", "sabotage", "block", "boost", "boost_allies",
+    "protect", "protect_potion", "relic", "predict", "basic_attack", "dodge",
+)
+
+
+def scripted_policy(player: Player, game: CosmicVoyage, rng: random.Random) -> str:
+    """A sensible player: deliver, patch up what is hurt, otherwise use the role"""
+    actions = available_actions(player, game)
+    if "deliver" in actions:
+        return "deliver"
+    if "rally" in actions and len([p for p in game.get_living_players() if p.hp < 60]) >= 3:
+        return "rally"
+    if "repair" in actions and game.ship.hp < game.ship.max_hp * 0.6:
+        return "repair"
+    if "heal" in actions and player.hp < 50:
+        return "heal"
+    for action in _SCRIPTED_PREFERENCE:
+        if action in actions:
+            return action
+    return actions[0]
+
+
+def random_vote(player: Player, game: CosmicVoyage, rng: random.Random) -> Optional[int]:
+    candidates = [p.user_id for p in game.get_living_players() if p.user_id != player.user_id]
+    return rng.choice(candidates) if candidates else None
+
+
+def scripted_vote(player: Player, game: CosmicVoyage, rng: random.Random) -> Optional[int]:
+    """Villains pile onto one hero; heroes guess"""
+    others = [p for p in game.get_living_players() if p.user_id != player.user_id]
+    if player.role in SHADOW_ROLES:
+        heroes = [p for p in others if p.role not in SHADOW_ROLES]
+        if heroes:
+            return min(heroes, key=lambda p: p.user_id).user_id
+    return rng.choice(others).user_id if others else None
+
+
+POLICIES: Dict[str, tuple] = {
+    "random": (random_policy, random_vote),
+    "scripted": (scripted_policy, scripted_vote),
+}
+
+
+class Simulator:
+    """Plays games through the bot's day loop and accumulates timings and results"""
+
+    def __init__(self, policy: str = "random", seed: int = 0, latency: float = 0.0):
+        from context import game_manager
+
+        if game_manager.store:
+            raise RuntimeError("STATE_DB_PATH is set: simulated games would be saved with the real ones")
+        self.game_manager = game_manager
+        self.choose_action, self.choose_vote = POLICIES[policy]
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.bot = FakeBot(latency)
+        # What the stage callbacks use of a CallbackContext: the bot, and the
+        # application they pass on to set_game_timer
+        self.context = SimpleNamespace(bot=self.bot, application=None)
+        self.phase_time: Dict[str, float] = defaultdict(float)
+        self.days = 0
+        self.games = 0
+        self.results: Dict[int, Counter] = defaultdict(Counter)
+
+    def _timed(self, phase: str, started: float) -> float:
+        now = time.perf_counter()
+        self.phase_time[phase] += now - started
+        return now
+
+    def _act(self, game: CosmicVoyage):
+        """The prompted players press their action (and target) buttons"""
+        for user_id in sorted(self.bot.prompted):
+            player = game.players.get(user_id)
+            if not player or not player.is_alive:
+                continue
+            action = self.choose_action(player, game, self.rng)
+            player.pending_target = pick_target(action, player, game, self.rng)
+            if action == "basic_attack":
+                game.set_player_stat(player, 'basic_attack_used_today', True)
+            game.submit_action(user_id, action)
+            game.apply_immediate_action(player, action)
+
+    def _vote(self, game: CosmicVoyage):
+        """The prompted players press a vote button"""
+        for user_id in sorted(self.bot.prompted):
+            player = game.players.get(user_id)
+            if not player or not player.is_alive:
+                continue
+            target = self.choose_vote(player, game, self.rng)
+            if target is not None:
+                game.process_vote(user_id, target)
+
+    async def play(self, players: int) -> str:
+        """Play one full game and return the winner ('team' or 'monster')"""
+        from game_logic import (
+            start_game, day_start_callback, open_actions_callback,
+            action_deadline_callback, vote_deadline_callback
+        )
+        from utils import cancel_game_timers
+
+        # The step run at each recorded stage, as resume_game_callback picks it
+        steps = {
+            STAGE_DAWN: (day_start_callback, "dawn"),
+            STAGE_BRIEFING: (open_actions_callback, "briefing"),
+            STAGE_ACTIONS: (action_deadline_callback, "resolve"),
+            STAGE_VOTING: (vote_deadline_callback, "tally"),
+        }
+
+        chat_id = -(self.games + 1)
+        t = time.perf_counter()
+        game = self.game_manager.create_game(chat_id, seed=self.seed * 1_000_003 + self.games)
+        for uid in range(1, players + 1):
+            self.game_manager.add_player(chat_id, uid, f"sim_{uid}")
+        await start_game(self.context, chat_id)
+        t = self._timed("setup", t)
+
+        while game.phase != GamePhase.ENDED:
+            # Run the next step now rather than when the 'day' timer is due
+            cancel_game_timers(game, 'day')
+            if game.stage == STAGE_ACTIONS:
+                self._act(game)
+                t = self._timed("actions", t)
+            elif game.stage == STAGE_VOTING:
+                self._vote(game)
+                t = self._timed("voting", t)
+            elif game.stage == STAGE_DAWN:
+                self.days += 1
+            callback, phase = steps[game.stage]
+            self.bot.prompted.clear()
+            await callback(self.context, chat_id)
+            t = self._timed(phase, t)
+
+        # Only the day limit ends a game without a win condition holding
+        winner = game.check_win_condition() or 'monster'
+        self.games += 1
+        self.results[players][winner] += 1
+        self.results[players]["days"] += game.current_day
+        return winner
+
+    async def run(self, games: int, player_counts: List[int]):
+        for i in range(games):
+            await self.play(player_counts[i % len(player_counts)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, nargs="+", default=[4, 10, 21],
+                        help=f"player counts to cycle through ({MIN_PLAYERS}-{MAX_PLAYERS})")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake bot round trip, seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("game_logic").setLevel(logging.WARNING)
+
+    sim = Simulator(args.policy, args.seed, args.latency)
+    start = time.perf_counter()
+    asyncio.run(sim.run(args.games, args.players))
+    elapsed = time.perf_counter() - start
+
+    print(f"{sim.games} games ({args.policy} policy) in {elapsed:.2f}s: "
+          f"{sim.games / elapsed:,.0f} games/s, {sim.days / elapsed:,.0f} days/s, "
+          f"{sim.bot.sent / sim.games:.1f} DMs/game")
+    print("\nphase      total s   us/game-day")
+    for phase in PHASES:
+        total = sim.phase_time[phase]
+        print(f"{phase:<9} {total:8.3f}  {total / max(sim.days, 1) * 1e6:11.1f}")
+    print("\nplayers   games   team win   monster win   avg days")
+    for players in sorted(sim.results):
+        r = sim.results[players]
+        n = r["team"] + r["monster"]
+        print(f"{players:>7} {n:>7} {r['team'] / n:>9.1%} {r['monster'] / n:>12.1%} "
+              f"{r['days'] / n:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
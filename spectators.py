@@ -0,0 +1,125 @@
+"""Spectator copies of a game's major events.
+
+Major group messages (see send_message_wrapper) are published to the game's
+feed instead of being DMed to each spectator inline. A background drain per
+game sends them concurrently through the outbound queue at spectator
+priority, so the game's own messages never wait on spectators and each
+spectator still gets events in order.
+
+A spectator who has blocked the bot (Forbidden) is dropped at once. Any other
+failure is treated as transient: the spectator stays until it has failed
+``max_failures`` times in a row. With ``digest`` on, events are held and sent
+as one DM per spectator when the day closes (``flush``), instead of one DM
+per event.
+"""
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, List
+
+from telegram.error import Forbidden
+from telegram.ext import ContextTypes
+
+from config import BROADCAST_CONCURRENCY
+from models import CosmicVoyage
+from outbox import PRIORITY_SPECTATOR
+
+logger = logging.getLogger(__name__)
+
+# Telegram's limit for one message's text
+MESSAGE_LIMIT = 4096
+
+
+def _digest_chunks(texts: List[str], limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Join event texts into as few messages as fit under ``limit``"""
+    chunks: List[str] = []
+    for text in texts:
+        text = text[:limit]
+        if chunks and len(chunks[-1]) + 2 + len(text) <= limit:
+            chunks[-1] += "\n\n" + text
+        else:
+            chunks.append(text)
+    return chunks
+
+
+class SpectatorRelay:
+    """Per-game spectator feeds with background, rate-limited delivery"""
+
+    def __init__(self, digest: bool = False, concurrency: int = BROADCAST_CONCURRENCY,
+                 max_failures: int = 3):
+        self.digest = digest
+        self.concurrency = concurrency
+        self.max_failures = max_failures
+        self.pending: Dict[int, List[str]] = {}  # chat_id -> event texts not yet sent
+        self.failures: Dict[int, int] = {}       # spectator -> consecutive transient failures
+        self.stats: Counter = Counter()           # sent, blocked, failed, dropped, digests
+        self._drains: Dict[int, asyncio.Task] = {}
+
+    def publish(self, context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage, text: str):
+        """Queue a major event for the game's spectators"""
+        if not game.spectators or not text:
+            return
+        self.pending.setdefault(game.chat_id, []).append(text)
+        if not self.digest:
+            self._kick(context, game)
+
+    def flush(self, context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage):
+        """Send whatever the game has queued (the day's digest)"""
+        if self.pending.get(game.chat_id):
+            self._kick(context, game)
+
+    def _kick(self, context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage):
+        # A running drain picks up anything queued behind it
+        if game.chat_id not in self._drains:
+            self._drains[game.chat_id] = asyncio.create_task(self._drain(context, game))
+
+    async def _drain(self, context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage):
+        try:
+            while self.pending.get(game.chat_id):
+                texts = self.pending.pop(game.chat_id)
+                if self.digest:
+                    texts = _digest_chunks(texts)
+                    self.stats["digests"] += 1
+                try:
+                    await self._deliver(context, game, texts)
+                except Exception as e:
+                    logger.error(f"Spectator delivery failed for {game.chat_id}: {e}")
+        finally:
+            # No await since the last pending check, so nothing can be stranded behind this drain
+            del self._drains[game.chat_id]
+
+    async def _deliver(self, context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage, texts: List[str]):
+        from context import game_manager
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        dropped = []
+
+        async def deliver(spectator: int):
+            async with semaphore:
+                for text in texts:
+                    try:
+                        await context.bot.send_message(spectator, text, rate_limit_args=PRIORITY_SPECTATOR)
+                    except Forbidden:
+                        self.stats["blocked"] += 1
+                        dropped.append(spectator)
+                        return
+                    except Exception as e:
+                        self.stats["failed"] += 1
+                        self.failures[spectator] = self.failures.get(spectator, 0) + 1
+                        if self.failures[spectator] >= self.max_failures:
+                            logger.warning(f"Dropping spectator {spectator} of {game.chat_id} after {e}")
+                            dropped.append(spectator)
+                        return
+                    self.stats["sent"] += 1
+                self.failures.pop(spectator, None)
+
+        await asyncio.gather(*(deliver(spectator) for spectator in list(game.spectators)))
+        if dropped:
+            # A finished game has no lock left to take, nor spectators to drop
+            if game_manager.get_game(game.chat_id) is game:
+                async with game_manager.lock(game.chat_id):
+                    for spectator in dropped:
+                        game.remove_spectator(spectator)
+            for spectator in dropped:
+                self.failures.pop(spectator, None)
+            self.stats["dropped"] += len(dropped)
@@ -0,0 +1,124 @@
+"""Button callback_data codec and the router's stale/duplicate refusals"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from callbacks import (
+    ACTION, HELP, JOIN, VOTE, CallbackRouter, decode, decode_int, encode_int, game_token
+)
+from config import STAGE_ACTIONS
+from context import game_manager
+
+
+class FakeQuery:
+    def __init__(self, user_id: int, data: str):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.data = data
+        self.answers = []
+
+    async def answer(self, text=None, show_alert=False):
+        self.answers.append(text)
+
+
+def press(router: CallbackRouter, user_id: int, data: str):
+    query = FakeQuery(user_id, data)
+    accepted = asyncio.run(router.accept(SimpleNamespace(callback_query=query)))
+    return accepted, query
+
+
+async def on_press(update, context, *args):
+    pass
+
+
+@pytest.fixture
+def game():
+    chat_id, user_id = -900001, 900001
+    game = game_manager.create_game(chat_id, seed=1)
+    game_manager.add_player(chat_id, user_id, "tester")
+    game.launch(100, 70)
+    game.current_day = 3
+    game.set_stage(STAGE_ACTIONS)
+    yield game
+    game_manager.end_game(chat_id)
+
+
+@pytest.fixture
+def router():
+    router = CallbackRouter()
+    router.on(ACTION)(on_press)
+    router.on(VOTE)(on_press)
+    router.on(JOIN)(on_press)
+    return router
+
+
+@pytest.mark.parametrize("value", [0, 1, 35, 36, 2 ** 40, 7_123_456_789, -1001234567890])
+def test_int_round_trip(value):
+    assert decode_int(encode_int(value)) == value
+
+
+def test_button_round_trip(game):
+    data = VOTE.data(900001, game=game)
+    assert data == f"v.{game_token(game)}.3.{encode_int(900001)}"
+    assert decode(data) == (VOTE, game_token(game), 3, (900001,))
+    assert decode(ACTION.data("repair", game=game)).args == ("repair",)
+    assert decode(HELP.data("roles")).args == ("roles",)
+
+
+def test_longest_button_fits_telegram_limit():
+    game = SimpleNamespace(token=2 ** 40 - 1, current_day=10)
+    assert len(VOTE.data(-(2 ** 52), game=game).encode()) <= 64
+
+
+@pytest.mark.parametrize("data", [None, "", "zz", "v", "v.abc", "v.abc.3", "a.abc.3.zz", "h.!"])
+def test_malformed_data_is_not_decoded(data):
+    assert decode(data) is None
+
+
+def test_current_press_is_routed(game, router):
+    accepted, query = press(router, 900001, ACTION.data("repair", game=game))
+    assert accepted == (on_press, ("repair",))
+    assert router.stats["routed"] == 1
+    assert query.answers == []
+
+
+def test_double_tap_is_dropped(game, router):
+    data = ACTION.data("repair", game=game)
+    press(router, 900001, data)
+    accepted, query = press(router, 900001, data)
+    assert accepted is None
+    assert router.stats["duplicate"] == 1
+    assert query.answers == [None]
+
+
+def test_repeat_after_the_window_is_routed(game):
+    router = CallbackRouter(duplicate_window=0)
+    router.on(ACTION)(on_press)
+    data = ACTION.data("repair", game=game)
+    press(router, 900001, data)
+    accepted, _ = press(router, 900001, data)
+    assert accepted is not None
+
+
+@pytest.mark.parametrize("data", [
+    lambda game: ACTION.data("repair", game=game, day=2),        # yesterday's prompt
+    lambda game: VOTE.data(900001, game=game),                   # wrong stage of the day
+    lambda game: ACTION.data("repair", token=encode_int(game.token + 1), day=3),  # another game
+])
+def test_stale_press_is_refused(game, router, data):
+    accepted, query = press(router, 900001, data(game))
+    assert accepted is None
+    assert router.stats["stale"] == 1
+    assert query.answers == ["⌛ This button has expired."]
+
+
+def test_press_from_someone_not_playing_is_stale(game, router):
+    accepted, _ = press(router, 900002, ACTION.data("repair", game=game))
+    assert accepted is None
+    assert router.stats["stale"] == 1
+
+
+def test_unregistered_or_unknown_op_is_refused(router):
+    assert press(router, 900001, HELP.data("roles"))[0] is None
+    assert press(router, 900001, "q.1")[0] is None
+    assert router.stats["unknown"] == 2
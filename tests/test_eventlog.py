@@ -0,0 +1,59 @@
+"""Replaying a game's event log rebuilds the live game exactly"""
+import asyncio
+import json
+
+import pytest
+
+from eventlog import replay
+from models import CosmicVoyage
+from simulator import Simulator
+
+
+@pytest.fixture(scope="module")
+def finished_games():
+    """Games played to the end through the bot's day loop, kept as they finished"""
+    sim = Simulator("random", seed=11)
+    manager = sim.game_manager
+    games = []
+    end_game = manager.end_game
+
+    def keep(chat_id):
+        games.append(manager.games[chat_id])
+        end_game(chat_id)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(manager, "end_game", keep)
+        asyncio.run(sim.run(12, [4, 10, 21]))
+    return games
+
+
+def test_replay_matches_live_game(finished_games):
+    assert len(finished_games) == 12
+    for game in finished_games:
+        assert replay(game.chat_id, game.event_log).to_dict() == game.to_dict()
+
+
+def test_replay_from_stored_records(finished_games):
+    # The store keeps the records as JSON
+    for game in finished_games:
+        records = json.loads(json.dumps(game.event_log))
+        assert replay(game.chat_id, records).to_dict() == game.to_dict()
+
+
+def test_replay_of_a_prefix_is_the_game_at_that_point():
+    game = CosmicVoyage(-1, seed=5)
+    for uid in range(1, 5):
+        game.add_player(uid, f"p{uid}")
+    lobby = game.to_dict()
+    cut = len(game.event_log)
+    game.launch(100, 70)
+    game.assign_roles()
+
+    assert replay(-1, game.event_log[:cut]).to_dict() == lobby
+    assert replay(-1, game.event_log).to_dict() == game.to_dict()
+
+
+def test_snapshot_round_trip(finished_games):
+    for game in finished_games:
+        data = json.loads(json.dumps(game.to_dict()))
+        assert CosmicVoyage.from_dict(data).to_dict() == game.to_dict()
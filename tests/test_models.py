@@ -0,0 +1,120 @@
+"""GameLock re-entrancy and contention accounting, and GameManager's lock lifetime"""
+import asyncio
+
+import models
+from models import GameLock, GameManager, LockStats
+
+
+def test_holder_can_reenter():
+    async def run():
+        lock = GameLock(LockStats())
+        async with lock:
+            async with lock:
+                assert lock.locked()
+            assert lock.locked()  # still held by the outer block
+        assert not lock.locked()
+        return lock.stats
+
+    stats = asyncio.run(run())
+    assert stats.acquired == 1
+    assert stats.contended == 0
+
+
+def test_other_tasks_wait_for_the_outermost_release():
+    order = []
+
+    async def holder(lock, inside):
+        async with lock:
+            async with lock:
+                inside.set()
+                await asyncio.sleep(0.01)
+                order.append("inner done")
+            await asyncio.sleep(0.01)
+            order.append("outer done")
+
+    async def waiter(lock, inside):
+        await inside.wait()
+        async with lock:
+            order.append("waiter")
+
+    async def run():
+        lock = GameLock(LockStats())
+        inside = asyncio.Event()
+        await asyncio.gather(holder(lock, inside), waiter(lock, inside))
+        return lock.stats
+
+    stats = asyncio.run(run())
+    assert order == ["inner done", "outer done", "waiter"]
+    assert stats.acquired == 2
+    assert stats.contended == 1
+    assert stats.wait_max > 0
+
+
+def test_lock_is_released_when_the_block_raises():
+    async def run():
+        lock = GameLock(LockStats())
+        try:
+            async with lock:
+                async with lock:
+                    raise ValueError
+        except ValueError:
+            pass
+        assert not lock.locked()
+        async with lock:  # and can be taken again
+            pass
+
+    asyncio.run(run())
+
+
+def test_ending_a_game_keeps_its_lock_for_those_waiting():
+    manager = GameManager()
+    chat_id = -1
+    manager.create_game(chat_id)
+    seen = []
+
+    async def ender(started):
+        async with manager.lock(chat_id):
+            started.set()
+            await asyncio.sleep(0.01)  # the waiter queues up meanwhile
+            manager.end_game(chat_id)
+            # A /newgame now must wait for the same lock, not get a fresh one
+            newgame = asyncio.create_task(new_game())
+            await asyncio.sleep(0.01)
+            assert not newgame.done()
+            seen.append("ended")
+        await newgame
+
+    async def waiter(started):
+        await started.wait()
+        async with manager.lock(chat_id):
+            seen.append(("waiter", manager.get_game(chat_id)))
+
+    async def new_game():
+        async with manager.lock(chat_id):
+            manager.create_game(chat_id)
+            seen.append("new game")
+
+    async def run():
+        started = asyncio.Event()
+        await asyncio.gather(ender(started), waiter(started))
+
+    asyncio.run(run())
+    assert seen == ["ended", ("waiter", None), "new game"]
+    assert list(manager.locks) == [chat_id]
+
+
+def test_only_idle_locks_of_chats_without_a_game_are_pruned(monkeypatch):
+    monkeypatch.setattr(models, "LOCK_PRUNE_THRESHOLD", 3)
+    manager = GameManager()
+    manager.create_game(-1)
+
+    async def run():
+        playing = manager.lock(-1)
+        held = manager.lock(-2)
+        idle = manager.lock(-3)
+        async with held:
+            manager.lock(-4)  # the fourth lock triggers a sweep
+            assert manager.locks == {-1: playing, -2: held, -4: manager.locks[-4]}
+        assert idle not in manager.locks.values()
+
+    asyncio.run(run())
@@ -0,0 +1,115 @@
+"""OutboundQueue ordering inside a chat, the edit/delete exemption and RetryAfter pauses"""
+import asyncio
+import time
+
+from telegram.error import RetryAfter
+
+from outbox import PRIORITY_COSMETIC, PRIORITY_GAME, PRIORITY_PROMPT, OutboundQueue
+
+GROUP = -100
+
+
+def make_queue(**limits) -> OutboundQueue:
+    # Fast limits keep the tests short: one group post per 50ms after the first
+    settings = dict(global_rate=1000, group_rate=20, group_burst=1,
+                    private_rate=20, private_burst=1, max_retries=2)
+    settings.update(limits)
+    return OutboundQueue(**settings)
+
+
+async def run_with(queue: OutboundQueue, scenario):
+    await queue.initialize()
+    try:
+        return await scenario(queue)
+    finally:
+        await queue.shutdown()
+
+
+def request(queue: OutboundQueue, log: list, name: str, endpoint: str = "sendMessage",
+            chat_id: int = GROUP, priority=None, callback=None):
+    async def call():
+        log.append(name)
+        return name
+    return asyncio.create_task(queue.process_request(
+        callback or call, (), {}, endpoint, {"chat_id": chat_id}, priority))
+
+
+def test_prompt_overtakes_cosmetic_post_in_the_same_chat():
+    async def scenario(queue):
+        log = []
+        await request(queue, log, "first")  # spends the group's burst
+        cosmetic = request(queue, log, "cosmetic", priority=PRIORITY_COSMETIC)
+        game = request(queue, log, "game", priority=PRIORITY_GAME)
+        await asyncio.sleep(0)
+        prompt = request(queue, log, "prompt", priority=PRIORITY_PROMPT)
+        await asyncio.gather(cosmetic, game, prompt)
+        return log
+
+    assert asyncio.run(run_with(make_queue(), scenario)) == ["first", "prompt", "game", "cosmetic"]
+
+
+def test_edits_and_deletes_skip_the_group_budget():
+    async def scenario(queue):
+        log = []
+        await request(queue, log, "post")
+        started = time.monotonic()
+        await asyncio.gather(*(request(queue, log, f"delete{i}", "deleteMessage") for i in range(5)),
+                             request(queue, log, "edit", "editMessageText"))
+        return time.monotonic() - started
+
+    # Five posts would need a quarter of a second of group budget
+    assert asyncio.run(run_with(make_queue(), scenario)) < 0.04
+
+
+def test_chats_do_not_wait_on_each_other():
+    async def scenario(queue):
+        log = []
+        await request(queue, log, "busy")
+        started = time.monotonic()
+        await request(queue, log, "other", chat_id=GROUP - 1)
+        return time.monotonic() - started
+
+    assert asyncio.run(run_with(make_queue(), scenario)) < 0.04
+
+
+def test_retry_after_pauses_then_resumes():
+    async def scenario(queue):
+        log = []
+        attempts = []
+
+        async def flooded():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RetryAfter(0.2)
+            return "ok"
+
+        started = time.monotonic()
+        flood = request(queue, log, "flood", chat_id=1, callback=flooded)
+        await asyncio.sleep(0.05)
+        # Queued during the pause: held back until it is over
+        other = request(queue, log, "other", chat_id=2)
+        await asyncio.sleep(0.05)
+        assert not other.done()
+        assert await flood == "ok"
+        await other
+        return started, attempts, log, queue
+
+    started, attempts, log, queue = asyncio.run(run_with(make_queue(), scenario))
+    assert len(attempts) == 2
+    assert attempts[1] - started >= 0.2
+    assert log == ["other"]
+    assert queue.retries == 1 and queue.sent == 2 and queue.failures == 0
+
+
+def test_retry_after_gives_up_after_max_retries():
+    async def scenario(queue):
+        async def always_flooded():
+            raise RetryAfter(0.01)
+        try:
+            await request(queue, [], "flood", chat_id=1, callback=always_flooded)
+        except RetryAfter:
+            return queue
+        raise AssertionError("RetryAfter was swallowed")
+
+    queue = asyncio.run(run_with(make_queue(max_retries=1), scenario))
+    assert queue.retries == 2 and queue.failures == 1
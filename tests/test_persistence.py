@@ -0,0 +1,88 @@
+"""GameStore snapshots and event logs survive a restart"""
+import json
+import sqlite3
+
+import pytest
+
+from models import GameManager
+from persistence import GameStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "state.db")
+
+
+def start_game(manager: GameManager, chat_id: int, players: int = 4):
+    game = manager.create_game(chat_id, seed=chat_id)
+    for uid in range(1, players + 1):
+        manager.add_player(chat_id, chat_id * 100 - uid, f"p{uid}")
+    game.launch(100, 70)
+    game.assign_roles()
+    game.assign_secret_objectives()
+    manager.save_game(game)
+    return game
+
+
+def reopen(db_path) -> dict:
+    store = GameStore(db_path)
+    try:
+        return {game.chat_id: game for game in store.load_all()}
+    finally:
+        store.close()
+
+
+def test_save_and_load_round_trip(db_path):
+    manager = GameManager(store=GameStore(db_path))
+    games = [start_game(manager, -1), start_game(manager, -2, players=6)]
+    manager.store.close()
+
+    loaded = reopen(db_path)
+    assert sorted(loaded) == [-2, -1]
+    for game in games:
+        assert loaded[game.chat_id].to_dict() == game.to_dict()
+        assert loaded[game.chat_id].event_log == json.loads(json.dumps(game.event_log))
+
+
+def test_unreadable_snapshot_falls_back_to_replay(db_path):
+    manager = GameManager(store=GameStore(db_path))
+    game = start_game(manager, -1)
+    manager.store.close()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE games SET data = '{' WHERE chat_id = -1")
+
+    assert reopen(db_path)[-1].to_dict() == game.to_dict()
+
+
+def test_missing_snapshot_falls_back_to_replay(db_path):
+    manager = GameManager(store=GameStore(db_path))
+    game = start_game(manager, -1)
+    manager.store.close()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM games")
+
+    assert reopen(db_path)[-1].to_dict() == game.to_dict()
+
+
+def test_ended_game_is_forgotten(db_path):
+    manager = GameManager(store=GameStore(db_path))
+    start_game(manager, -1)
+    kept = start_game(manager, -2)
+    manager.end_game(-1)
+    manager.store.close()
+
+    assert list(reopen(db_path)) == [kept.chat_id]
+
+
+def test_new_game_replacing_an_ended_one_starts_a_clean_log(db_path):
+    manager = GameManager(store=GameStore(db_path))
+    old = start_game(manager, -1, players=6)
+    manager.store.flush()
+    old.finish('team')  # won, but end_game has not run yet
+    new = manager.create_game(-1, seed=2)
+    manager.add_player(-1, 7, "newcomer")
+    manager.store.close()
+
+    loaded = reopen(db_path)[-1]
+    assert loaded.event_log == json.loads(json.dumps(new.event_log))
+    assert loaded.to_dict() == new.to_dict()
@@ -0,0 +1,80 @@
+"""rules.resolve_day is deterministic for a seed and applies the actions it is given"""
+import random
+from datetime import datetime
+
+import pytest
+
+from config import REPAIR_SHIP_AMOUNT, GamePhase, Role
+from models import CosmicVoyage
+from rules import day_phase, resolve_day, starting_ship_hp
+from simulator import pick_target, scripted_policy
+
+
+def launched_game(seed: int, players: int) -> CosmicVoyage:
+    # The token and start time are not the seed's to decide; pin them too
+    game = CosmicVoyage(-1, seed=seed, token=1)
+    for uid in range(1, players + 1):
+        game.add_player(uid, f"p{uid}")
+    game.launch(*starting_ship_hp(players), started=datetime(2026, 1, 1))
+    game.assign_roles()
+    game.assign_secret_objectives()
+    return game
+
+
+def play_days(seed: int, players: int, days: int):
+    """Resolve ``days`` days with every player acting; returns each day's result"""
+    game = launched_game(seed, players)
+    choices = random.Random(seed)
+    results = []
+    for _ in range(days):
+        game.start_day(day_phase(game.current_day)[0])
+        game.begin_action_collection()
+        for player in game.get_living_players():
+            action = scripted_policy(player, game, choices)
+            player.pending_target = pick_target(action, player, game, choices)
+            game.submit_action(player.user_id, action)
+        results.append(resolve_day(game))
+        game.advance_day()
+    return game, results
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3, 42])
+@pytest.mark.parametrize("players", [4, 10, 21])
+def test_same_seed_same_day(seed, players):
+    game_a, results_a = play_days(seed, players, 6)
+    game_b, results_b = play_days(seed, players, 6)
+    assert results_a == results_b
+    assert game_a.to_dict() == game_b.to_dict()
+
+
+def test_seed_changes_the_outcome():
+    outcomes = {str(play_days(seed, 10, 6)[0].to_dict()) for seed in range(5)}
+    assert len(outcomes) > 1
+
+
+def test_repair_mends_the_ship():
+    game = launched_game(seed=7, players=4)
+    captain = next(p for p in game.players.values() if p.role == Role.CAPTAIN)
+    game.start_day(GamePhase.HEALING)  # no hazards before the voyage phase
+    game.begin_action_collection()
+    game.submit_action(captain.user_id, "repair")
+    hp = game.ship.hp
+
+    result = resolve_day(game)
+
+    assert game.ship.hp == min(game.ship.max_hp, hp + REPAIR_SHIP_AMOUNT)
+    assert any(captain.username in event and "repaired" in event for event in result.events)
+    assert not result.monster_attacked
+
+
+def test_actions_outside_the_role_do_nothing():
+    game = launched_game(seed=7, players=4)
+    crew = next(p for p in game.players.values() if p.role not in (Role.CAPTAIN, Role.HEALER))
+    game.start_day(GamePhase.HEALING)
+    game.begin_action_collection()
+    game.submit_action(crew.user_id, "repair")
+    hp = game.ship.hp
+
+    resolve_day(game)
+
+    assert game.ship.hp == hp
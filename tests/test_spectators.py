@@ -0,0 +1,139 @@
+"""SpectatorRelay digests, failure handling, and the digest at /endgame"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import Forbidden, NetworkError
+
+import handlers
+from context import game_manager
+from spectators import SpectatorRelay
+
+CHAT = -900201
+
+
+class FakeBot:
+    def __init__(self, blocked=(), flaky=()):
+        self.sent = []
+        self.blocked = set(blocked)
+        self.flaky = set(flaky)  # fail while listed
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id in self.blocked:
+            raise Forbidden("bot was blocked by the user")
+        if chat_id in self.flaky:
+            raise NetworkError("timed out")
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+@pytest.fixture
+def game():
+    game = game_manager.create_game(CHAT)
+    for spectator in (1, 2):
+        game.add_spectator(spectator)
+    yield game
+    if game_manager.get_game(CHAT) is game:
+        game_manager.end_game(CHAT)
+
+
+async def settle(relay: SpectatorRelay):
+    while relay._drains:
+        await asyncio.gather(*relay._drains.values())
+
+
+def test_digest_waits_for_flush_and_sends_one_dm(game):
+    async def run():
+        relay = SpectatorRelay(digest=True)
+        context = SimpleNamespace(bot=FakeBot())
+        for i in range(3):
+            relay.publish(context, game, f"event {i}")
+        await asyncio.sleep(0)
+        assert context.bot.sent == []
+        relay.flush(context, game)
+        await settle(relay)
+        return context.bot.sent, relay
+
+    sent, relay = asyncio.run(run())
+    assert sorted(sent) == [(1, "event 0\n\nevent 1\n\nevent 2"), (2, "event 0\n\nevent 1\n\nevent 2")]
+    assert relay.pending == {}
+    assert relay.stats["digests"] == 1
+
+
+def test_without_digest_events_go_out_at_once(game):
+    async def run():
+        relay = SpectatorRelay()
+        context = SimpleNamespace(bot=FakeBot())
+        relay.publish(context, game, "event")
+        await settle(relay)
+        return context.bot.sent
+
+    assert sorted(asyncio.run(run())) == [(1, "event"), (2, "event")]
+
+
+def test_blocked_spectator_is_dropped_at_once(game):
+    async def run():
+        relay = SpectatorRelay(max_failures=3)
+        context = SimpleNamespace(bot=FakeBot(blocked={1}))
+        relay.publish(context, game, "event")
+        await settle(relay)
+        return context.bot.sent, relay
+
+    sent, relay = asyncio.run(run())
+    assert sent == [(2, "event")]
+    assert game.spectators == {2}
+    assert relay.stats["blocked"] == 1 and relay.stats["dropped"] == 1
+
+
+def test_transient_failures_are_retried_until_the_limit(game):
+    async def run():
+        relay = SpectatorRelay(max_failures=3)
+        bot = FakeBot(flaky={1})
+        context = SimpleNamespace(bot=bot)
+        for i in range(2):
+            relay.publish(context, game, f"event {i}")
+            await settle(relay)
+        assert game.spectators == {1, 2}  # two failures: still there
+        bot.flaky.clear()
+        relay.publish(context, game, "event 2")
+        await settle(relay)
+        assert (1, "event 2") in bot.sent
+        assert 1 not in relay.failures  # a success resets the count
+
+        bot.flaky.add(1)
+        for i in range(3):
+            relay.publish(context, game, f"event {3 + i}")
+            await settle(relay)
+        return relay
+
+    relay = asyncio.run(run())
+    assert game.spectators == {2}
+    assert relay.stats["failed"] == 5 and relay.stats["dropped"] == 1
+
+
+def test_endgame_command_sends_the_digest_before_the_game_goes(game, monkeypatch):
+    relay = SpectatorRelay(digest=True)
+    monkeypatch.setattr(handlers, "spectator_relay", relay)
+    bot = FakeBot()
+
+    async def get_chat_member(chat_id, user_id):
+        return SimpleNamespace(status="creator")
+
+    async def reply_text(text, **kwargs):
+        pass
+
+    bot.get_chat_member = get_chat_member
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=CHAT),
+                             effective_user=SimpleNamespace(id=5),
+                             message=SimpleNamespace(reply_text=reply_text))
+
+    async def run():
+        context = SimpleNamespace(bot=bot)
+        relay.publish(context, game, "last event")
+        await handlers.endgame_command(update, context)
+        await settle(relay)
+
+    asyncio.run(run())
+    assert game_manager.get_game(CHAT) is None
+    assert sorted(bot.sent) == [(1, "last event"), (2, "last event")]
+    assert relay.pending == {}
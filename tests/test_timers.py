@@ -0,0 +1,91 @@
+"""TimerWheel scheduling, cancellation and cascading, on a hand-driven clock"""
+import pytest
+
+from timers import TimerWheel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def noop(*args):
+    pass
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def wheel(clock):
+    # Small wheels (ticks of 1s: 4, 16 and 64 ticks) make every level reachable
+    return TimerWheel(tick=1.0, sizes=(4, 4, 4), clock=clock)
+
+
+def test_timer_falls_due_at_its_deadline(wheel):
+    timer = wheel.call_later(3, noop, "a")
+    assert wheel.advance(2) == []
+    assert wheel.advance(3) == [timer]
+    assert timer.args == ("a",)
+    assert not timer.active
+    assert len(wheel) == 0
+
+
+def test_due_timers_come_out_in_deadline_order(wheel):
+    late = wheel.call_later(3, noop)
+    early = wheel.call_later(1, noop)
+    same = wheel.call_later(1, noop)
+    assert wheel.advance(5) == [early, same, late]
+
+
+def test_zero_delay_fires_on_the_next_tick(wheel):
+    timer = wheel.call_later(0, noop)
+    assert wheel.advance(0) == []
+    assert wheel.advance(1) == [timer]
+
+
+def test_cancelled_timer_never_fires(wheel):
+    keep = wheel.call_later(2, noop)
+    drop = wheel.call_later(2, noop)
+    drop.cancel()
+    drop.cancel()  # a second cancel is harmless
+    assert not drop.active
+    assert len(wheel) == 1
+    assert wheel.advance(10) == [keep]
+
+
+def test_reschedule_moves_the_deadline(wheel, clock):
+    timer = wheel.call_later(10, noop, 1)
+    clock.now = 1
+    moved = wheel.reschedule(timer, 1)
+    assert not timer.active
+    assert moved.args == (1,)
+    assert wheel.advance(2) == [moved]
+
+
+@pytest.mark.parametrize("delay", [5, 15, 17, 40, 63])
+def test_outer_wheels_cascade_down_on_time(wheel, delay):
+    timer = wheel.call_later(delay, noop)
+    assert wheel.advance(delay - 1) == []
+    assert timer.active
+    assert wheel.advance(delay) == [timer]
+
+
+def test_timer_beyond_the_outer_wheel_is_parked_and_replaced(wheel):
+    timer = wheel.call_later(200, noop)
+    assert wheel.advance(199) == []
+    assert timer.active
+    assert wheel.advance(200) == [timer]
+
+
+def test_cascading_keeps_cancellation(wheel):
+    timer = wheel.call_later(40, noop)
+    wheel.advance(20)  # cascaded into an inner wheel by now
+    timer.cancel()
+    assert wheel.advance(100) == []
+    assert len(wheel) == 0
@@ -0,0 +1,67 @@
+"""Message cleanup: batch deletes, and the capped single-delete fallback"""
+import asyncio
+from types import SimpleNamespace
+
+from utils import DELETE_BATCH_SIZE, SINGLE_DELETE_LIMIT, cleanup_messages, delete_messages
+from context import game_manager
+
+
+class SingleDeleteBot:
+    """A bot without deleteMessages, as in python-telegram-bot 20.7"""
+
+    def __init__(self, gone=()):
+        self.deleted = []
+        self.gone = set(gone)
+
+    async def delete_message(self, chat_id, message_id, **kwargs):
+        if message_id in self.gone:
+            raise RuntimeError("message to delete not found")
+        self.deleted.append(message_id)
+        return True
+
+
+class BatchDeleteBot:
+    def __init__(self):
+        self.batches = []
+
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        self.batches.append(list(message_ids))
+        return True
+
+
+def test_batch_deletes_take_every_message():
+    bot = BatchDeleteBot()
+    ids = list(range(1, 2 * DELETE_BATCH_SIZE + 2))
+    deleted = asyncio.run(delete_messages(SimpleNamespace(bot=bot), -1, ids))
+    assert deleted == len(ids)
+    assert [len(batch) for batch in bot.batches] == [DELETE_BATCH_SIZE, DELETE_BATCH_SIZE, 1]
+
+
+def test_single_delete_fallback_takes_only_the_newest():
+    bot = SingleDeleteBot(gone={199})
+    deleted = asyncio.run(delete_messages(SimpleNamespace(bot=bot), -1, list(range(1, 201))))
+    assert deleted == SINGLE_DELETE_LIMIT - 1
+    assert sorted(bot.deleted) == [mid for mid in range(201 - SINGLE_DELETE_LIMIT, 201) if mid != 199]
+
+
+def test_single_delete_fallback_stops_when_told():
+    bot = SingleDeleteBot()
+    deleted = asyncio.run(delete_messages(SimpleNamespace(bot=bot), -1, [1, 2, 3, 4],
+                                          concurrency=1, give_up=lambda: len(bot.deleted) >= 2))
+    assert deleted == 2
+    assert bot.deleted == [1, 2]
+
+
+def test_cleanup_leaves_a_new_game_alone():
+    chat_id = -900101
+    bot = SingleDeleteBot()
+    context = SimpleNamespace(bot=bot)
+    asyncio.run(cleanup_messages(context, chat_id, [1, 2, 3]))
+    assert bot.deleted == [1, 2, 3]
+
+    game_manager.create_game(chat_id)
+    try:
+        asyncio.run(cleanup_messages(context, chat_id, [4, 5]))
+    finally:
+        game_manager.end_game(chat_id)
+    assert bot.deleted == [1, 2, 3]
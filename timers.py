@@ -0,0 +1,142 @@
+"""Hierarchical timer wheel for per-game deadlines.
+
+Lobby timers, lobby reminders and the day loop's steps are all one-shot
+deadlines seconds to minutes away. A TimerWheel keeps them in three wheels of
+slots (by default 256 x 0.1 s, 64 x 25.6 s and 64 x 27 min): scheduling drops
+a timer into the slot of its deadline, and cancelling removes it from that
+slot, both O(1) through the Timer handle the caller keeps. Each tick fires
+one slot of the innermost wheel; outer slots cascade inwards as their time
+comes, so no deadline is ever scanned more than once per level.
+
+Callbacks are coroutine functions, run as tasks on the wheel's event loop.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    """Handle for one scheduled callback"""
+
+    __slots__ = ('deadline', 'tick', 'callback', 'args', '_slot')
+
+    def __init__(self, deadline: float, tick: int, callback: Callable[..., Coroutine], args: tuple):
+        self.deadline = deadline  # on the wheel's clock
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self._slot: Optional[Dict['Timer', None]] = None
+
+    @property
+    def active(self) -> bool:
+        return self._slot is not None
+
+    def cancel(self):
+        if self._slot is not None:
+            del self._slot[self]
+            self._slot = None
+
+
+class TimerWheel:
+    def __init__(self, tick: float = 0.1, sizes=(256, 64, 64), clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self.sizes = sizes
+        # Ticks covered by one slot of each wheel: 1, 256, 256 * 64
+        self.spans = [1]
+        for size in sizes[:-1]:
+            self.spans.append(self.spans[-1] * size)
+        self.wheels: List[List[Dict[Timer, None]]] = [[{} for _ in range(size)] for size in sizes]
+        self.current = int(clock() / tick)
+        self.fired = 0
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return sum(len(slot) for wheel in self.wheels for slot in wheel)
+
+    def call_later(self, delay: float, callback: Callable[..., Coroutine], *args: Any) -> Timer:
+        """Run ``callback(*args)`` in ``delay`` seconds; keep the Timer to cancel it"""
+        deadline = self.clock() + delay
+        timer = Timer(deadline, max(int(deadline / self.tick), self.current + 1), callback, args)
+        self._place(timer)
+        return timer
+
+    def reschedule(self, timer: Timer, delay: float) -> Timer:
+        """Cancel ``timer`` and schedule its callback again ``delay`` seconds from now"""
+        timer.cancel()
+        return self.call_later(delay, timer.callback, *timer.args)
+
+    def _place(self, timer: Timer):
+        ahead = timer.tick - self.current
+        for level, size in enumerate(self.sizes):
+            span = self.spans[level]
+            if ahead < span * size or level == len(self.sizes) - 1:
+                if ahead >= span * size:
+                    # Past the outermost wheel: park in its last slot and re-place on cascade
+                    index = (self.current // span + size - 1) % size
+                else:
+                    index = (timer.tick // span) % size
+                slot = self.wheels[level][index]
+                slot[timer] = None
+                timer._slot = slot
+                return
+
+    def advance(self, now: Optional[float] = None) -> List[Timer]:
+        """Move the wheel up to ``now`` and return the timers that fell due, in order"""
+        target = int((self.clock() if now is None else now) / self.tick)
+        due = []
+        while self.current < target:
+            self.current += 1
+            # Cascade outer wheels from the outside in when the inner one wraps
+            for level in range(len(self.sizes) - 1, 0, -1):
+                if self.current % self.spans[level] == 0:
+                    index = (self.current // self.spans[level]) % self.sizes[level]
+                    slot = self.wheels[level][index]
+                    if slot:
+                        timers = list(slot)
+                        slot.clear()
+                        for timer in timers:
+                            self._place(timer)
+            slot = self.wheels[0][self.current % self.sizes[0]]
+            if slot:
+                for timer in slot:
+                    timer._slot = None
+                due.extend(slot)
+                slot.clear()
+        return due
+
+    def _fire(self, timer: Timer):
+        task = asyncio.create_task(timer.callback(*timer.args))
+        self._running.add(task)
+        task.add_done_callback(self._finished)
+        self.fired += 1
+
+    def _finished(self, task: asyncio.Task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Timer callback failed: {task.exception()!r}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            for timer in self.advance():
+                self._fire(timer)
+
+    def start(self):
+        """Start ticking on the running event loop"""
+        self.current = int(self.clock() / self.tick)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
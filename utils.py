@@ -1,16 +1,24 @@
+import asyncio
 import logging
 import io
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from PIL import Image, ImageDraw, ImageFont
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
+from telegram.error import Forbidden
+from telegram.ext import Application, ContextTypes
 
 from config import (
     Role, GIFS, BLOCK, INITIAL_PLAYER_HP, RELIC_EFFECTS, 
-    SHOP_ITEMS, BOT_OWNER_ID, CO_OWNER_ID, HELP_TEXTS, MAX_PLAYERS, MIN_PLAYERS,SHIP_UPGRADES
+    SHOP_ITEMS, BOT_OWNER_ID, CO_OWNER_ID, HELP_TEXTS, MAX_PLAYERS, MIN_PLAYERS,SHIP_UPGRADES,
+    BROADCAST_CONCURRENCY, RENDER_WORKERS, SHADOW_ROLES
 )
 from models import CosmicVoyage, Player
+from outbox import PRIORITY_COSMETIC, PRIORITY_PROMPT
+from callbacks import ACTION, BUY, EXTEND, HELP, JOIN, LEAVE, RELIC, TARGET, UPGRADE, VOTE, game_token
+from timers import Timer
 
 logger = logging.getLogger(__name__)
 
@@ -111,157 +119,193 @@ def get_role_description(role: Role) -> str:
     return descriptions.get(role, "Unknown role - please report this issue.")
 
 
+LOBBY_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("✅ Join Game", callback_data=JOIN.data()),
+        InlineKeyboardButton("❌ Leave Game", callback_data=LEAVE.data())
+    ],
+    [InlineKeyboardButton("⏳ Extend Timer (+60s)", callback_data=EXTEND.data())]
+])
+
+
 def create_lobby_keyboard() -> InlineKeyboardMarkup:
     """Create keyboard for lobby"""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("✅ Join Game", callback_data="join_game"),
-            InlineKeyboardButton("❌ Leave Game", callback_data="leave_game")
-        ],
-        [InlineKeyboardButton("⏳ Extend Timer (+60s)", callback_data="extend_lobby")]
-    ])
+    return LOBBY_KEYBOARD
+
+
+def _action_layout(player: Player, game) -> tuple:
+    """The inputs that decide a player's action keyboard, as a cache key for _action_rows"""
+    relics = sum(1 for r in player.relics if RELIC_EFFECTS.get(r, {}).get("type") == "one_time")
+    if player.role in SHADOW_ROLES:
+        return (player.role, False, 0, 0, False, relics, game.monster_revealed, game.current_day >= 2,
+                player.frame_job_uses > 0, player.false_intel_uses > 0, game.devil_hunter_boost_used)
+    weapons = sum(1 for uses in player.weapons.values() if uses > 0) if player.weapons else 0
+    rally_uses = player.rally_uses if player.role == Role.CAPTAIN else 0
+    return (player.role, player.basic_attack_used_today, rally_uses, weapons,
+            player.has_potion and game.current_day >= 10, relics, False, False, False, False, False)
 
 
-# utils.py - Better action keyboard
+def action_buttons(player: Player, game) -> Tuple[Tuple[Tuple[str, str], ...], ...]:
+    """Rows of (label, action) on the player's action keyboard today"""
+    return _action_rows(*_action_layout(player, game))
 
-# utils.py - create_action_keyboard update
 
 def create_action_keyboard(player: Player, game) -> InlineKeyboardMarkup:
-    """Action keyboard with basic attack"""
+    """Action keyboard with basic attack.
+
+    Layouts are cached apart from any game, and markups are immutable, so each
+    one is built once per game day and shared by every player that needs it.
+    The buttons carry the game and day, so they stop working once the day's
+    actions close.
+    """
+    return _action_keyboard(game_token(game), game.current_day, action_buttons(player, game))
+
+
+@lru_cache(maxsize=4096)
+def _action_keyboard(token: str, day: int, rows: tuple) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(label, callback_data=ACTION.data(action, token=token, day=day))
+         for label, action in row]
+        for row in rows
+    ])
+
+
+@lru_cache(maxsize=512)
+def _action_rows(role: Role, attack_used: bool, rally_uses: int, weapons: int, can_deliver: bool,
+                 relics: int, monster_revealed: bool, after_day_one: bool, can_frame: bool,
+                 can_false_intel: bool, boost_used: bool) -> tuple:
     keyboard = []
-    negative_roles = [Role.BETRAYER, Role.EPIC_MONSTER, Role.SHADOW_SABOTEUR, Role.DEVIL_HUNTER]
-    
+    skip_shown = False
     # HERO ACTIONS
-    if player.role not in negative_roles:
+    if role not in SHADOW_ROLES:
         
         # BASIC ATTACK (Daily, unlimited) - ALWAYS SHOW FIRST
-        if not player.basic_attack_used_today:
+        if not attack_used:
             keyboard.append([
-                InlineKeyboardButton("⚔️ Basic Attack (8 dmg)", callback_data="action_basic_attack")
+                ("⚔️ Basic Attack (8 dmg)", "basic_attack")
             ])
         
         # Role-specific actions
-        if player.role == Role.CAPTAIN:
+        if role == Role.CAPTAIN:
             keyboard.append([
-                InlineKeyboardButton("🔧 Repair Ship", callback_data="action_repair"),
-                InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal")
+                ("🔧 Repair Ship", "repair"),
+                ("🩹 Heal Self", "heal")
             ])
-            if player.rally_uses > 0:
+            if rally_uses > 0:
                 keyboard.append([
-                    InlineKeyboardButton(f"🎖️ Rally Team ({player.rally_uses})", callback_data="action_rally")
+                    (f"🎖️ Rally Team ({rally_uses})", "rally")
                 ])
         
-        elif player.role == Role.HEALER:
+        elif role == Role.HEALER:
             keyboard.append([
-                InlineKeyboardButton("🩹 Heal Player", callback_data="action_heal"),
-                InlineKeyboardButton("🔧 Repair Ship", callback_data="action_repair")
+                ("🩹 Heal Player", "heal"),
+                ("🔧 Repair Ship", "repair")
             ])
         
-        elif player.role == Role.ORACLE:
+        elif role == Role.ORACLE:
             keyboard.append([
-                InlineKeyboardButton("🔮 Predict Danger", callback_data="action_predict"),
-                InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal")
+                ("🔮 Predict Danger", "predict"),
+                ("🩹 Heal Self", "heal")
             ])
         
-        elif player.role == Role.DRAGON_RIDER:
+        elif role == Role.DRAGON_RIDER:
             keyboard.append([
-                InlineKeyboardButton("🐉 Protect Team", callback_data="action_protect"),
-                InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal")
+                ("🐉 Protect Team", "protect"),
+                ("🩹 Heal Self", "heal")
             ])
         
-        elif player.role == Role.ANGEL_GUARDIAN:
+        elif role == Role.ANGEL_GUARDIAN:
             keyboard.append([
-                InlineKeyboardButton("👼 Protect Potion", callback_data="action_protect_potion"),
-                InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal")
+                ("👼 Protect Potion", "protect_potion"),
+                ("🩹 Heal Self", "heal")
             ])
         
-        elif player.role == Role.EXPLORER:
+        elif role == Role.EXPLORER:
             keyboard.append([
-                InlineKeyboardButton("🪶 Search Relic", callback_data="action_relic"),
-                InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal")
+                ("🪶 Search Relic", "relic"),
+                ("🩹 Heal Self", "heal")
             ])
         
         else:  # CREW MEMBER
             keyboard.append([
-                InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal"),
-                InlineKeyboardButton("💨 Dodge", callback_data="action_dodge")
+                ("🩹 Heal Self", "heal"),
+                ("💨 Dodge", "dodge")
             ])
         
         # PREMIUM WEAPON ATTACK
-        if player.weapons:
-            available_weapons = [w for w, uses in player.weapons.items() if uses > 0]
-            if available_weapons:
-                keyboard.append([
-                    InlineKeyboardButton(f"🗡️ Premium Weapon ({len(available_weapons)})", callback_data="action_premium_weapon")
-                ])
+        if weapons:
+            keyboard.append([
+                (f"🗡️ Premium Weapon ({weapons})", "premium_weapon")
+            ])
         
         # POTION DELIVERY
-        if player.has_potion and game.current_day >= 10:
+        if can_deliver:
             keyboard.insert(0, [
-                InlineKeyboardButton("⚡ DELIVER POTION (WIN!) ⚡", callback_data="action_deliver")
+                ("⚡ DELIVER POTION (WIN!) ⚡", "deliver")
             ])
     
     # VILLAIN ACTIONS (unchanged)
     else:
-        if player.role == Role.BETRAYER and not game.monster_revealed:
+        if role == Role.BETRAYER and not monster_revealed:
             keyboard.append([
-                InlineKeyboardButton("🔪 Sabotage Ship", callback_data="action_sabotage"),
-                InlineKeyboardButton("🩹 Heal (Blend)", callback_data="action_heal")
+                ("🔪 Sabotage Ship", "sabotage"),
+                ("🩹 Heal (Blend)", "heal")
             ])
-            if player.frame_job_uses > 0:
-                keyboard.append([InlineKeyboardButton("🎭 Frame Job", callback_data="action_frame_job")])
-            if player.false_intel_uses > 0:
-                keyboard.append([InlineKeyboardButton("🤫 False Intel", callback_data="action_false_intel")])
+            if can_frame:
+                keyboard.append([("🎭 Frame Job", "frame_job")])
+            if can_false_intel:
+                keyboard.append([("🤫 False Intel", "false_intel")])
         
-        elif player.role == Role.EPIC_MONSTER or (player.role == Role.BETRAYER and game.monster_revealed):
-            if game.current_day >= 2:
+        elif role == Role.EPIC_MONSTER or (role == Role.BETRAYER and monster_revealed):
+            if after_day_one:
                 keyboard.append([
-                    InlineKeyboardButton("👹 Attack Ship", callback_data="action_monster_attack"),
-                    InlineKeyboardButton("📈 Boost Villains", callback_data="action_boost_allies")
+                    ("👹 Attack Ship", "monster_attack"),
+                    ("📈 Boost Villains", "boost_allies")
                 ])
             else:
                 keyboard.append([
-                    InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal"),
-                    InlineKeyboardButton("⏭️ Skip", callback_data="action_skip")
+                    ("🩹 Heal Self", "heal"),
+                    ("⏭️ Skip", "skip")
                 ])
+                skip_shown = True
         
-        elif player.role == Role.SHADOW_SABOTEUR:
-            if game.current_day >= 2:
+        elif role == Role.SHADOW_SABOTEUR:
+            if after_day_one:
                 keyboard.append([
-                    InlineKeyboardButton("🚫 Block Player", callback_data="action_block"),
-                    InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal")
+                    ("🚫 Block Player", "block"),
+                    ("🩹 Heal Self", "heal")
                 ])
             else:
                 keyboard.append([
-                    InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal"),
-                    InlineKeyboardButton("⏭️ Skip", callback_data="action_skip")
+                    ("🩹 Heal Self", "heal"),
+                    ("⏭️ Skip", "skip")
                 ])
+                skip_shown = True
         
-        elif player.role == Role.DEVIL_HUNTER:
-            if game.current_day >= 2:
-                if not game.devil_hunter_boost_used:
-                    keyboard.append([InlineKeyboardButton("😈 Boost Monster", callback_data="action_boost")])
+        elif role == Role.DEVIL_HUNTER:
+            if after_day_one:
+                if not boost_used:
+                    keyboard.append([("😈 Boost Monster", "boost")])
                 keyboard.append([
-                    InlineKeyboardButton("🔪 Sabotage", callback_data="action_sabotage"),
-                    InlineKeyboardButton("🩹 Heal", callback_data="action_heal")
+                    ("🔪 Sabotage", "sabotage"),
+                    ("🩹 Heal", "heal")
                 ])
             else:
                 keyboard.append([
-                    InlineKeyboardButton("🩹 Heal Self", callback_data="action_heal"),
-                    InlineKeyboardButton("⏭️ Skip", callback_data="action_skip")
+                    ("🩹 Heal Self", "heal"),
+                    ("⏭️ Skip", "skip")
                 ])
+                skip_shown = True
     
     # RELICS
-    if player.relics:
-        one_time = [r for r in player.relics if RELIC_EFFECTS.get(r, {}).get("type") == "one_time"]
-        if one_time:
-            keyboard.append([InlineKeyboardButton(f"💎 Use Relic ({len(one_time)})", callback_data="action_use_relic")])
+    if relics:
+        keyboard.append([(f"💎 Use Relic ({relics})", "use_relic")])
     
     # SKIP
-    if not any(btn.callback_data == "action_skip" for row in keyboard for btn in row):
-        keyboard.append([InlineKeyboardButton("⏭️ Skip Turn", callback_data="action_skip")])
+    if not skip_shown:
+        keyboard.append([("⏭️ Skip Turn", "skip")])
     
-    return InlineKeyboardMarkup(keyboard)
+    return tuple(tuple(row) for row in keyboard)
 
 
 def get_timer_emoji(seconds_remaining: int) -> str:
@@ -283,25 +327,28 @@ def generate_hp_bar(current: int, maximum: int, length: int = 20) -> str:
     return f"{bar} {percentage}%"
 
 
-def create_relic_keyboard(player: Player) -> InlineKeyboardMarkup:
+def create_relic_keyboard(player: Player, game: CosmicVoyage) -> InlineKeyboardMarkup:
     """Create keyboard for relic selection"""
     relics = [relic for relic in player.relics if RELIC_EFFECTS.get(relic, {}).get("type") == "one_time"]
-    keyboard = [[InlineKeyboardButton(relic, callback_data=f"use_relic_{relic}")] for relic in relics]
+    keyboard = [[InlineKeyboardButton(relic, callback_data=RELIC.data(relic, game=game))] for relic in relics]
     return InlineKeyboardMarkup(keyboard)
 
 
+HELP_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🎭 Roles", callback_data=HELP.data("roles")),
+        InlineKeyboardButton("📅 Flow", callback_data=HELP.data("flow"))
+    ],
+    [
+        InlineKeyboardButton("🎯 Objective", callback_data=HELP.data("objective")),
+        InlineKeyboardButton("💡 Tips", callback_data=HELP.data("tips"))
+    ]
+])
+
+
 def create_help_keyboard() -> InlineKeyboardMarkup:
     """Create help section keyboard"""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("🎭 Roles", callback_data="help_roles"),
-            InlineKeyboardButton("📅 Flow", callback_data="help_flow")
-        ],
-        [
-            InlineKeyboardButton("🎯 Objective", callback_data="help_objective"),
-            InlineKeyboardButton("💡 Tips", callback_data="help_tips")
-        ]
-    ])
+    return HELP_KEYBOARD
 
 def create_upgrades_keyboard(game: CosmicVoyage) -> InlineKeyboardMarkup:
     """Create keyboard for ship upgrades shop."""
@@ -312,19 +359,19 @@ def create_upgrades_keyboard(game: CosmicVoyage) -> InlineKeyboardMarkup:
             contribution = game.upgrade_contribution.get(key, 0)
             remaining = cost - contribution
             keyboard.append([
-                InlineKeyboardButton(f"{upgrade['name']} ({remaining}/{cost} coins)", callback_data=f"upgrade_{key}")
+                InlineKeyboardButton(f"{upgrade['name']} ({remaining}/{cost} coins)", callback_data=UPGRADE.data(key, game=game))
             ])
     return InlineKeyboardMarkup(keyboard)
 
+SHOP_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton(f"{key} - {item['cost']} coins", callback_data=BUY.data(key))]
+    for key, item in SHOP_ITEMS.items()
+])
+
+
 def create_shop_keyboard() -> InlineKeyboardMarkup:
     """Create shop keyboard"""
-    keyboard = []
-    for key, item in SHOP_ITEMS.items():
-        keyboard.append([
-            InlineKeyboardButton(f"{key} - {item['cost']} coins", 
-                               callback_data=f"buy_{key.replace(' ', '_')}")
-        ])
-    return InlineKeyboardMarkup(keyboard)
+    return SHOP_KEYBOARD
 
 
 def create_vote_keyboard(game: CosmicVoyage) -> InlineKeyboardMarkup:
@@ -333,7 +380,7 @@ def create_vote_keyboard(game: CosmicVoyage) -> InlineKeyboardMarkup:
     for player in game.get_living_players():
         keyboard.append([
             InlineKeyboardButton(f"{player.username} (HP: {player.hp})", 
-                               callback_data=f"vote_{player.user_id}")
+                               callback_data=VOTE.data(player.user_id, game=game))
         ])
     return InlineKeyboardMarkup(keyboard)
 
@@ -344,7 +391,7 @@ def create_target_keyboard(game: CosmicVoyage, exclude_id: int) -> InlineKeyboar
     for player in game.get_living_players():
         if player.user_id != exclude_id:
             keyboard.append([
-                InlineKeyboardButton(player.username, callback_data=f"target_{player.user_id}")
+                InlineKeyboardButton(player.username, callback_data=TARGET.data(player.user_id, game=game))
             ])
     return InlineKeyboardMarkup(keyboard)
 
@@ -365,113 +412,182 @@ def get_day_gif(day: int) -> str:
     return GIFS['day_gifs'][(day - 1) % len(GIFS['day_gifs'])]
 
 
-def generate_status_image(game: CosmicVoyage) -> Optional[io.BytesIO]:
-    """Generate status image showing game state"""
-    try:
-        width, height = 800, 600
-        img = Image.new('RGB', (width, height), color=(10, 20, 40))
-        draw = ImageDraw.Draw(img)
-        
-        # Try to load fonts with fallbacks
+STATUS_IMAGE_SIZE = (800, 600)
+_STATUS_ROW_START = 190
+_STATUS_ROW_HEIGHT = 35
+_STATUS_MAX_ROWS = (STATUS_IMAGE_SIZE[1] - 50 - _STATUS_ROW_START) // _STATUS_ROW_HEIGHT + 1
+_HP_BAR_X, _HP_BAR_WIDTH = 350, 200
+_SHIP_BAR_WIDTH = 400
+
+
+def _load_fonts():
+    """Resolve status image fonts once; returns (title, header, normal)"""
+    candidates = [
+        ("DejaVuSans-Bold.ttf", "DejaVuSans-Bold.ttf", "DejaVuSans.ttf"),
+        ("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",) * 3,
+        ("/System/Library/Fonts/Helvetica.ttc",) * 3,
+        ("C:\\Windows\\Fonts\\arial.ttf",) * 3,
+    ]
+    for title_path, header_path, normal_path in candidates:
         try:
-            title_font = ImageFont.truetype("DejaVuSans-Bold.ttf", 28)
-            header_font = ImageFont.truetype("DejaVuSans-Bold.ttf", 22)
-            normal_font = ImageFont.truetype("DejaVuSans.ttf", 18)
+            return (ImageFont.truetype(title_path, 28),
+                    ImageFont.truetype(header_path, 22),
+                    ImageFont.truetype(normal_path, 18))
         except IOError:
-            # Try common font paths
-            font_paths = [
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                "/System/Library/Fonts/Helvetica.ttc",
-                "C:\\Windows\\Fonts\\arial.ttf"
-            ]
-            fonts_loaded = False
-            for font_path in font_paths:
-                try:
-                    title_font = ImageFont.truetype(font_path, 28)
-                    header_font = ImageFont.truetype(font_path, 22)
-                    normal_font = ImageFont.truetype(font_path, 18)
-                    fonts_loaded = True
-                    break
-                except IOError:
-                    continue
-            
-            if not fonts_loaded:
-                logger.warning("Could not load any fonts, using default")
-                title_font = ImageFont.load_default()
-                header_font = ImageFont.load_default()
-                normal_font = ImageFont.load_default()
-
-        # Title
-        draw.text((width//2, 20), f"COSMIC VOYAGE - DAY {game.current_day}", 
-                 fill=(255, 215, 0), font=title_font, anchor="mm")
-        
-        # Ship Status
-        draw.text((20, 70), "🚢 SHIP STATUS", fill=(100, 200, 255), font=header_font)
-        ship_hp_text = f"HP: {game.ship.hp}/{game.ship.max_hp}"
-        draw.text((250, 70), ship_hp_text, fill=(255, 255, 255), font=normal_font)
-        
-        # Ship HP Bar
-        bar_width = 400
-        fill_width = (game.ship.hp / game.ship.max_hp) * bar_width if game.ship.max_hp > 0 else 0
-        draw.rectangle([(20, 100), (20 + bar_width, 120)], outline=(70, 130, 200))
-        draw.rectangle([(20, 100), (20 + fill_width, 120)], fill=(0, 200, 100))
-        
-        # Players Status
-        y_offset = 150
-        draw.text((20, y_offset), "👥 PLAYERS STATUS", fill=(100, 200, 255), font=header_font)
-        y_offset += 40
-        
-        for player in game.players.values():
-            if y_offset > height - 50:
-                break
-                
-            status_emoji = "✅" if player.is_alive else "💀"
-            username = player.username[:15] + "..." if len(player.username) > 15 else player.username
-            
-            draw.text((20, y_offset), f"{status_emoji} {username}", 
-                     fill=(255, 255, 255) if player.is_alive else (150, 150, 150), font=normal_font)
-            
-            hp_text = f"HP: {player.hp}/{INITIAL_PLAYER_HP}"
-            draw.text((250, y_offset), hp_text, 
-                     fill=(255, 100, 100) if player.hp < 30 else (100, 255, 100), font=normal_font)
-            
-            # HP Bar
-            hp_bar_width = 200
-            hp_fill = (player.hp / INITIAL_PLAYER_HP) * hp_bar_width if INITIAL_PLAYER_HP > 0 else 0
-            bar_x = 350
-            
-            draw.rectangle([(bar_x, y_offset + 5), (bar_x + hp_bar_width, y_offset + 20)], 
-                         outline=(100, 100, 100), fill=(50, 50, 50))
-            
-            if player.hp > 0:
-                hp_color = (255, 50, 50) if player.hp < 30 else (50, 200, 50)
-                draw.rectangle([(bar_x, y_offset + 5), (bar_x + hp_fill, y_offset + 20)], fill=hp_color)
-            
-            y_offset += 35
-
-        # Game Phase
-        phase_text = f"Phase: {game.phase.value.upper()}"
-        draw.text((20, height - 40), phase_text, fill=(200, 200, 100), font=normal_font)
+            continue
+    logger.warning("Could not load any fonts, using default")
+    default = ImageFont.load_default()
+    return default, default, default
+
+
+TITLE_FONT, HEADER_FONT, NORMAL_FONT = _load_fonts()
+
+
+@lru_cache(maxsize=2048)
+def _text_mask(text: str, font, anchor: Optional[str]):
+    """Rasterise a text label once; returns (mask, bbox) relative to the anchor point"""
+    bbox = font.getbbox(text, anchor=anchor)
+    mask = Image.new('L', (max(1, bbox[2] - bbox[0]), max(1, bbox[3] - bbox[1])))
+    ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), text, fill=255, font=font, anchor=anchor)
+    return mask, bbox
+
+
+def _draw_label(img: Image.Image, xy, text: str, fill, font, anchor: Optional[str] = None):
+    """Paste a cached text label - names and HP values repeat across renders"""
+    mask, bbox = _text_mask(text, font, anchor)
+    x, y = int(xy[0] + bbox[0]), int(xy[1] + bbox[1])
+    img.paste(fill, (x, y, x + mask.width, y + mask.height), mask)
+
+
+@lru_cache(maxsize=_STATUS_MAX_ROWS + 1)
+def _status_base_canvas(rows: int) -> Image.Image:
+    """Background, headers and empty bar outlines for a status image with ``rows`` players"""
+    img = Image.new('RGB', STATUS_IMAGE_SIZE, color=(10, 20, 40))
+    draw = ImageDraw.Draw(img)
+    
+    draw.text((20, 70), "🚢 SHIP STATUS", fill=(100, 200, 255), font=HEADER_FONT)
+    draw.rectangle([(20, 100), (20 + _SHIP_BAR_WIDTH, 120)], outline=(70, 130, 200))
+    draw.text((20, 150), "👥 PLAYERS STATUS", fill=(100, 200, 255), font=HEADER_FONT)
+    
+    for row in range(rows):
+        y_offset = _STATUS_ROW_START + row * _STATUS_ROW_HEIGHT
+        draw.rectangle([(_HP_BAR_X, y_offset + 5), (_HP_BAR_X + _HP_BAR_WIDTH, y_offset + 20)], 
+                     outline=(100, 100, 100), fill=(50, 50, 50))
+    return img
+
+
+def status_image_key(game: CosmicVoyage) -> tuple:
+    """Everything the status image shows - doubles as the render cache key"""
+    return (
+        game.current_day,
+        game.phase.value,
+        game.ship.hp,
+        game.ship.max_hp,
+        tuple((p.username, p.hp, p.is_alive) for p in game.players.values()),
+    )
+
+
+def render_status_png(key: tuple) -> bytes:
+    """Render a status image from a status_image_key() snapshot.
+
+    Only touches the immutable key, so it is safe to run off the event loop.
+    """
+    day, phase, ship_hp, ship_max_hp, players = key
+    width, height = STATUS_IMAGE_SIZE
+    img = _status_base_canvas(min(len(players), _STATUS_MAX_ROWS)).copy()
+    draw = ImageDraw.Draw(img)
+
+    # Title
+    _draw_label(img, (width//2, 20), f"COSMIC VOYAGE - DAY {day}", 
+                fill=(255, 215, 0), font=TITLE_FONT, anchor="mm")
+    
+    # Ship Status
+    _draw_label(img, (250, 70), f"HP: {ship_hp}/{ship_max_hp}", fill=(255, 255, 255), font=NORMAL_FONT)
+    fill_width = (ship_hp / ship_max_hp) * _SHIP_BAR_WIDTH if ship_max_hp > 0 else 0
+    draw.rectangle([(20, 100), (20 + fill_width, 120)], fill=(0, 200, 100))
+    
+    # Players Status
+    y_offset = _STATUS_ROW_START
+    for username, hp, is_alive in players[:_STATUS_MAX_ROWS]:
+        status_emoji = "✅" if is_alive else "💀"
+        username = username[:15] + "..." if len(username) > 15 else username
         
-        # Alive count
-        alive_count = len(game.get_living_players())
-        alive_text = f"Alive: {alive_count}/{len(game.players)}"
-        draw.text((width - 150, height - 40), alive_text, fill=(200, 200, 100), font=normal_font)
+        _draw_label(img, (20, y_offset), f"{status_emoji} {username}", 
+                    fill=(255, 255, 255) if is_alive else (150, 150, 150), font=NORMAL_FONT)
+        _draw_label(img, (250, y_offset), f"HP: {hp}/{INITIAL_PLAYER_HP}", 
+                    fill=(255, 100, 100) if hp < 30 else (100, 255, 100), font=NORMAL_FONT)
         
-        buf = io.BytesIO()
-        img.save(buf, format='PNG', quality=95)
-        buf.seek(0)
-        return buf
+        if hp > 0:
+            hp_fill = (hp / INITIAL_PLAYER_HP) * _HP_BAR_WIDTH if INITIAL_PLAYER_HP > 0 else 0
+            hp_color = (255, 50, 50) if hp < 30 else (50, 200, 50)
+            draw.rectangle([(_HP_BAR_X, y_offset + 5), (_HP_BAR_X + hp_fill, y_offset + 20)], fill=hp_color)
         
+        y_offset += _STATUS_ROW_HEIGHT
+
+    # Game Phase
+    _draw_label(img, (20, height - 40), f"Phase: {phase.upper()}", fill=(200, 200, 100), font=NORMAL_FONT)
+    
+    # Alive count
+    alive_count = sum(1 for _, _, is_alive in players if is_alive)
+    _draw_label(img, (width - 150, height - 40), f"Alive: {alive_count}/{len(players)}", 
+                fill=(200, 200, 100), font=NORMAL_FONT)
+    
+    # Flat colours compress well even at the fastest zlib level
+    buf = io.BytesIO()
+    img.save(buf, format='PNG', compress_level=1)
+    return buf.getvalue()
+
+
+def generate_status_image(game: CosmicVoyage) -> Optional[io.BytesIO]:
+    """Generate status image showing game state"""
+    try:
+        return io.BytesIO(render_status_png(status_image_key(game)))
     except Exception as e:
         logger.error(f"Error generating status image: {e}")
         return None
 
 
+_render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="status-render")
+
+
+async def send_status_image(context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage,
+                            chat_id: int, **kwargs):
+    """Send the game's status image, rendering off the event loop.
+
+    The last render is memoised on the game keyed by status_image_key(), so
+    repeated /status calls between state changes resend the Telegram file_id
+    instead of rendering and uploading again.
+    """
+    key = status_image_key(game)
+    cached = game.status_image_cache
+    if cached and cached[0] == key:
+        photo = cached[2] or cached[1]
+        png = cached[1]
+    else:
+        try:
+            png = await asyncio.get_running_loop().run_in_executor(_render_pool, render_status_png, key)
+        except Exception as e:
+            logger.error(f"Error generating status image: {e}")
+            return None
+        photo = png
+    
+    try:
+        msg = await context.bot.send_photo(chat_id, photo=photo, **kwargs)
+    except Exception as e:
+        logger.error(f"Failed to send status image to {chat_id}: {e}")
+        game.status_image_cache = (key, png, None)
+        return None
+    
+    file_id = msg.photo[-1].file_id if msg.photo else None
+    game.status_image_cache = (key, png, file_id)
+    game.add_message(msg.message_id)
+    return msg
+
+
 async def send_message_wrapper(context: ContextTypes.DEFAULT_TYPE, chat_id: int, 
                                text: str, is_major: bool = False, **kwargs):
     """Wrapper for sending messages with game tracking"""
-    from context import game_manager
+    from context import game_manager, spectator_relay
     game = game_manager.get_game(chat_id)
     
     try:
@@ -481,11 +597,7 @@ async def send_message_wrapper(context: ContextTypes.DEFAULT_TYPE, chat_id: int,
         if game:
             game.add_message(msg.message_id)
             if is_major:
-                for spec in list(game.spectators):
-                    try:
-                        await context.bot.send_message(spec, text)
-                    except Exception:
-                        game.spectators.remove(spec)
+                spectator_relay.publish(context, game, text)
         return msg
     except Exception as e:
         logger.error(f"Error sending message to {chat_id}: {e}")
@@ -493,10 +605,148 @@ async def send_message_wrapper(context: ContextTypes.DEFAULT_TYPE, chat_id: int,
 
 
 
+async def broadcast_messages(context: ContextTypes.DEFAULT_TYPE,
+                             messages: Iterable[Tuple[int, str, Dict]],
+                             concurrency: int = BROADCAST_CONCURRENCY,
+                             priority: int = PRIORITY_PROMPT) -> Dict[int, bool]:
+    """Send DMs concurrently and report per-recipient delivery.
+
+    ``messages`` is an iterable of ``(chat_id, text, send_kwargs)``. Sends run
+    under a semaphore and go through the outbound queue at ``priority``;
+    several messages for the same chat are delivered in order, one at a time.
+    Returns ``{chat_id: delivered}`` where False means at least one message
+    to that chat failed (e.g. the user blocked the bot).
+    """
+    per_chat: Dict[int, list] = {}
+    for chat_id, text, kwargs in messages:
+        per_chat.setdefault(chat_id, []).append((text, kwargs))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results: Dict[int, bool] = {}
+
+    async def deliver(chat_id: int, queued: list):
+        ok = True
+        async with semaphore:
+            for text, kwargs in queued:
+                try:
+                    await context.bot.send_message(chat_id, text, rate_limit_args=priority, **kwargs)
+                except Forbidden:
+                    logger.warning(f"User {chat_id} has blocked the bot")
+                    ok = False
+                    break
+                except Exception as e:
+                    logger.error(f"Could not send message to {chat_id}: {e}")
+                    ok = False
+        results[chat_id] = ok
+
+    await asyncio.gather(*(deliver(chat_id, queued) for chat_id, queued in per_chat.items()))
+    return results
+
+
+# Telegram accepts at most this many ids per deleteMessages call
+DELETE_BATCH_SIZE = 100
+
+# Without deleteMessages only this many of the newest messages are deleted, one
+# call each; the chat's other traffic shares the global send rate with them
+SINGLE_DELETE_LIMIT = 20
+
+
+async def delete_messages(context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+                          message_ids: Iterable[int],
+                          concurrency: int = BROADCAST_CONCURRENCY,
+                          give_up: Optional[Callable[[], bool]] = None) -> int:
+    """Delete bot messages in a chat and return how many were removed.
+
+    Uses the batch ``deleteMessages`` call (100 ids per request) when the bot
+    supports it. Older python-telegram-bot versions (the pinned 20.7 among
+    them) fall back to single deletes of the newest SINGLE_DELETE_LIMIT
+    messages, and stop early once ``give_up()`` is true. The requests go out
+    at cosmetic priority, behind any other queued traffic. Messages that are
+    already gone or too old to delete are skipped silently.
+    """
+    message_ids = list(message_ids)
+    if not message_ids:
+        return 0
+
+    batch_delete = getattr(context.bot, "delete_messages", None)
+    if batch_delete is not None:
+        deleted = 0
+        for i in range(0, len(message_ids), DELETE_BATCH_SIZE):
+            batch = message_ids[i:i + DELETE_BATCH_SIZE]
+            try:
+                await batch_delete(chat_id, batch, rate_limit_args=PRIORITY_COSMETIC)
+                deleted += len(batch)
+            except Exception as e:
+                logger.warning(f"Could not delete messages in {chat_id}: {e}")
+        return deleted
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def delete(message_id: int) -> bool:
+        async with semaphore:
+            if give_up and give_up():
+                return False
+            try:
+                return await context.bot.delete_message(chat_id, message_id,
+                                                        rate_limit_args=PRIORITY_COSMETIC)
+            except Exception:
+                return False
+
+    return sum(await asyncio.gather(*(delete(mid) for mid in message_ids[-SINGLE_DELETE_LIMIT:])))
+
+
+def set_game_timer(application: Application, game: CosmicVoyage, name: str, delay: float, callback) -> Timer:
+    """Arm the game's ``name`` deadline on the timer wheel, replacing any earlier one.
+
+    ``callback(context, chat_id)`` runs ``delay`` seconds from now with a fresh
+    CallbackContext for ``application``. The handle is kept in ``game.timers``,
+    so replacing or cancelling it never searches the wheel.
+    """
+    from context import timer_wheel
+
+    cancel_game_timers(game, name)
+    timer = timer_wheel.call_later(delay, _run_game_timer, application, callback, game.chat_id)
+    game.timers[name] = timer
+    return timer
+
+
+def cancel_game_timers(game: CosmicVoyage, *names: str):
+    """Cancel the game's named deadlines (all of them if no names are given)"""
+    for name in names or list(game.timers):
+        timer = game.timers.pop(name, None)
+        if timer:
+            timer.cancel()
+
+
+async def _run_game_timer(application: Application, callback, chat_id: int):
+    await callback(application.context_types.context(application), chat_id)
+
+
+async def cleanup_messages(context: ContextTypes.DEFAULT_TYPE, chat_id: int, message_ids: List[int]):
+    """Timer callback: delete the game's leftover bot messages from the group"""
+    from context import game_manager
+
+    # The ended game is gone by now; a game in the chat is a new one, whose
+    # messages matter more than tidying up after the last
+    deleted = await delete_messages(context, chat_id, message_ids,
+                                    give_up=lambda: game_manager.get_game(chat_id) is not None)
+    logger.info(f"Cleaned up {deleted}/{len(message_ids)} messages in {chat_id}")
+
+
+def schedule_message_cleanup(context: ContextTypes.DEFAULT_TYPE, game: CosmicVoyage, delay: float):
+    """Queue deletion of the game's tracked group messages ``delay`` seconds from now"""
+    from context import timer_wheel
+
+    message_ids = game.take_recent_messages()
+    if message_ids:
+        # Outlives the game, so it is not one of game.timers
+        timer_wheel.call_later(delay, cleanup_messages, context, game.chat_id, message_ids)
+
+
 async def send_animation_wrapper(context: ContextTypes.DEFAULT_TYPE, chat_id: int, 
                                  animation: str, caption: str = "", is_major: bool = False, **kwargs):
     """Wrapper for sending animations with fallback"""
-    from context import game_manager
+    from context import game_manager, spectator_relay
     game = game_manager.get_game(chat_id)
     
     try:
@@ -506,11 +756,7 @@ async def send_animation_wrapper(context: ContextTypes.DEFAULT_TYPE, chat_id: in
         if game:
             game.add_message(msg.message_id)
             if is_major:
-                for spec in list(game.spectators):
-                    try:
-                        await context.bot.send_message(spec, caption)
-                    except Exception:
-                        game.spectators.remove(spec)
+                spectator_relay.publish(context, game, caption)
         return msg
     except Exception as e:
         logger.warning(f"Could not send GIF to {chat_id}. Error: {e}")
@@ -0,0 +1,81 @@
+"""Webhook front end for the bot.
+
+Telegram POSTs each update to ``WEBHOOK_PATH`` on a small aiohttp server. The
+server checks the ``X-Telegram-Bot-Api-Secret-Token`` header against the
+secret registered with setWebhook, decodes the update and puts it on the
+Application's update queue, then answers 200 straight away - handlers run
+behind the queue exactly as they do with long polling.
+
+Enabled with ``BOT_MODE=webhook`` (see main.py); ``python bench.py webhook``
+load-tests it locally.
+"""
+import hmac
+import json
+import logging
+import secrets
+from typing import Dict, Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def make_secret_token() -> str:
+    """A random secret in the alphabet setWebhook accepts (A-Z, a-z, 0-9, _ and -)"""
+    return secrets.token_urlsafe(32)
+
+
+class WebhookServer:
+    """aiohttp server feeding Telegram webhook updates into ``application.update_queue``"""
+
+    def __init__(self, application: Application, secret_token: str,
+                 host: str = "0.0.0.0", port: int = 8443, path: str = "/telegram"):
+        if not secret_token:
+            raise ValueError("A webhook secret token is required")
+        self.application = application
+        self.secret_token = secret_token.encode()
+        self.host = host
+        self.port = port
+        self.path = path
+        self.stats: Dict[str, int] = {"accepted": 0, "forbidden": 0, "malformed": 0}
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_post(path, self.handle_update)
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "").encode()
+        if not hmac.compare_digest(token, self.secret_token):
+            self.stats["forbidden"] += 1
+            return web.Response(status=403)
+
+        try:
+            data = json.loads(await request.read())
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            self.stats["malformed"] += 1
+            logger.warning(f"Rejected malformed webhook update: {e}")
+            return web.Response(status=400)
+
+        if update is None:
+            self.stats["malformed"] += 1
+            return web.Response(status=400)
+
+        await self.application.update_queue.put(update)
+        self.stats["accepted"] += 1
+        return web.Response()
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None